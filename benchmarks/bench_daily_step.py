@@ -0,0 +1,60 @@
+"""Benchmark the daily step disease model against the full multi-strain disease model.
+
+Builds the scenario given twice: once as configured, and once with ticks of a day and the daily
+step disease model, which does not simulate activities or movement.  Each is run for the same
+number of days without reporters, and the time taken per simulated day is printed together with
+the cumulative cases of each strain, as a check on how closely the daily model follows the full
+one.
+
+Usage:
+    python benchmarks/bench_daily_step.py [config] [days]
+"""
+
+import sys
+import time
+
+from ms_abmlux import build_model
+from ms_abmlux.config import Config
+from ms_abmlux.messagebus import MessageBus
+from ms_abmlux.sim_factory import SimulationFactory
+
+DAILY_STEP_MODEL = "daily_step_disease_model.DailyStepDiseaseModel"
+
+def run(config_filename, days, daily):
+    """Build and run the scenario, returning the build and run times, in seconds, and the
+    cumulative cases by strain at the end of the run"""
+
+    config = Config(config_filename)
+    config.conf['simulation_length_days'] = days
+    config.conf['reporters'] = {}
+    if daily:
+        config.conf['tick_length_s'] = 86400
+        config.conf['disease_model']['__type__'] = DAILY_STEP_MODEL
+
+    start = time.perf_counter()
+    sim_factory = SimulationFactory(config)
+    build_model(sim_factory)
+    built = time.perf_counter()
+    sim = sim_factory.new_sim(MessageBus())
+    sim.run()
+    finished = time.perf_counter()
+
+    cases = {strain.name: count
+             for strain, count in sim.disease_model.cumulative_cases_by_strain.items()}
+    return built - start, finished - built, cases
+
+def main():
+    """Run the scenario with each disease model and compare"""
+
+    config_filename = sys.argv[1] if len(sys.argv) > 1 else "Scenarios/Luxembourg/config.yaml"
+    days            = int(sys.argv[2]) if len(sys.argv) > 2 else 28
+
+    print(f"{config_filename}, {days} days")
+    print(f"{'model':>12} {'build (s)':>10} {'run (s)':>10} {'s/day':>8}  cumulative cases")
+    for name, daily in (("full", False), ("daily step", True)):
+        build_time, run_time, cases = run(config_filename, days, daily)
+        print(f"{name:>12} {build_time:>10.1f} {run_time:>10.1f} {run_time / days:>8.3f}  "
+              + ", ".join(f"{strain}: {count}" for strain, count in cases.items()))
+
+if __name__ == "__main__":
+    main()
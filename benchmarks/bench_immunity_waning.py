@@ -0,0 +1,101 @@
+"""Benchmark immunity waning in the multi-strain disease model.
+
+Compares the per-tick cost of finding agents whose immunity expires using the model's immunity
+loss queue against scanning every agent and strain, as get_health_transitions used to do.  The same
+number of agents gain immunity regardless of the number of strains, so the queue's cost should stay
+flat while the scan grows linearly with strain count.
+
+Usage:
+    python benchmarks/bench_immunity_waning.py [num_agents]
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+
+from ms_abmlux.agent import Agent
+from ms_abmlux.config import Config
+from ms_abmlux.sim_time import SimClock
+from ms_abmlux.world import World
+from ms_abmlux.random_tools import Random
+from ms_abmlux.disease_model.multi_strain_disease_model import MultiStrainDiseaseModel
+
+NUM_TICKS      = 1000
+PROPORTION_IMMUNE = 0.1
+
+def make_model(num_agents, num_strains, clock):
+    """Build a disease model over a world with no locations"""
+
+    world = World(None)
+    for _ in range(num_agents):
+        world.add_agent(Agent(40, "Luxembourg"))
+
+    names   = [f"Strain{i}" for i in range(num_strains)]
+    strains = {name: {"num_initial_cases": 0,
+                      "transmission_probability": {"INFECTED": 0.0},
+                      "disease_profile_list": ["SIS"],
+                      "disease_profile_distribution_by_age": {0: [1.0]},
+                      "step_size": 200,
+                      "durations_by_profile": {"SIS": ["None", ["C", [1]], "None"]}}
+               for name in names}
+    identity = {s1: {s2: float(s1 == s2) for s2 in names} for s1 in names}
+    config = Config(_dict={"__prng_seed__": 1, "no_transmission_locations": [],
+                           "reduced_transmission_locations": [],
+                           "reduced_transmission_factor": 1, "region": "Luxembourg",
+                           "health_states": ["SUSCEPTIBLE", "INFECTED", "DEAD"],
+                           "susceptible_state": "SUSCEPTIBLE", "infected_states": ["INFECTED"],
+                           "dead_state": "DEAD", "strains": strains,
+                           "mutation_matrix": identity, "immunity_matrix": identity})
+
+    model = MultiStrainDiseaseModel(config, world, clock)
+    model.sim = SimpleNamespace(clock=clock)
+    return model
+
+def scan(model, t):
+    """The previous implementation: check every agent and strain"""
+
+    for row in range(len(model.immune)):
+        for col in range(len(model.strains)):
+            if model.immunity_loss_times[row, col] == t:
+                model.immune[row, col] = False
+                model.immunity_loss_times[row, col] = -1
+
+def grant_immunity(model, prng):
+    """Give a fixed proportion of agents immunity to one strain, expiring within NUM_TICKS"""
+    # pylint: disable=protected-access
+    for agent in model.agent_index:
+        if prng.boolean(PROPORTION_IMMUNE):
+            strain = prng.random_choice(model.strains)
+            model._gain_immunity(agent, [strain], prng.random_randrange(NUM_TICKS))
+
+def time_per_tick(model, process):
+    """Return the mean time, in microseconds, taken by process over NUM_TICKS ticks"""
+
+    start = time.perf_counter()
+    for t in range(NUM_TICKS):
+        process(model, t)
+    return (time.perf_counter() - start) / NUM_TICKS * 1e6
+
+def main():
+    """Run the benchmark for increasing numbers of strains"""
+    # pylint: disable=protected-access
+
+    num_agents = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    clock = SimClock(600, 10, "1st March 2020")
+
+    print(f"{num_agents} agents, {NUM_TICKS} ticks, {PROPORTION_IMMUNE:.0%} of agents immune")
+    print(f"{'strains':>8} {'scan (us/tick)':>16} {'queue (us/tick)':>16}")
+    for num_strains in [1, 2, 4, 8, 16]:
+        model = make_model(num_agents, num_strains, clock)
+
+        grant_immunity(model, Random(1))
+        scan_us = time_per_tick(model, scan)
+
+        model.immunity_loss_queue.clear()
+        grant_immunity(model, Random(1))
+        queue_us = time_per_tick(model, lambda m, t: m._process_immunity_loss(t))
+
+        print(f"{num_strains:>8} {scan_us:>16.1f} {queue_us:>16.1f}")
+
+if __name__ == "__main__":
+    main()
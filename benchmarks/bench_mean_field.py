@@ -0,0 +1,83 @@
+"""Benchmark the mean-field approximation to the force of infection at large locations.
+
+Above the disease model's mean_field_threshold, the probability of infection at a location is
+taken to be 1 - exp(-f P), where P is the total infectiousness present, rather than the exact
+1 - prod(1 - f p).  The first table gives the relative bias of the approximation for locations of
+increasing size and prevalence, with infectiousness drawn from the values used in the Luxembourg
+scenario, and for a much more infectious disease.  The second compares the time taken per tick to
+evaluate every location exactly, from scratch, against reading the totals kept by the model.
+
+Usage:
+    python benchmarks/bench_mean_field.py [num_agents]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from ms_abmlux.disease_model.transmission import force_of_infection
+
+NUM_TICKS   = 100
+OCCUPANCIES = [100, 1000, 10000]
+PREVALENCES = [0.01, 0.05, 0.2]
+INFECTIOUSNESS = {"Luxembourg": [0.0001925, 0.00035], "100x": [0.01925, 0.035]}
+
+def relative_bias(rng, occupancy, prevalence, infectiousness_values):
+    """Return the mean relative bias of the mean-field probability of infection over random
+    locations of the size and prevalence given"""
+
+    biases = []
+    for _ in range(100):
+        num_infectious = max(1, rng.binomial(occupancy, prevalence))
+        infectiousness = rng.choice(infectiousness_values, num_infectious)
+        exact      = -np.expm1(np.sum(np.log1p(-infectiousness)))
+        mean_field = -np.expm1(-np.sum(infectiousness))
+        biases.append((mean_field - exact) / exact)
+    return np.mean(biases)
+
+def time_per_tick(num_agents):
+    """Return the time, in milliseconds, to evaluate the force of infection at every location
+    exactly and by the mean-field approximation, for locations of 1000 agents"""
+
+    rng = np.random.default_rng(1)
+    num_locations    = num_agents // 1000
+    agent_locations  = rng.integers(num_locations, size=num_agents)
+    infectiousness   = np.where(rng.random(num_agents) < 0.05, 0.00035, 0.0)
+    location_factors = np.ones(num_locations)
+    infectiousness_sums = np.bincount(agent_locations, weights=infectiousness,
+                                      minlength=num_locations)
+
+    start = time.perf_counter()
+    for _ in range(NUM_TICKS):
+        force_of_infection(np.flatnonzero(infectiousness > 0), agent_locations, infectiousness,
+                           location_factors)
+    exact = (time.perf_counter() - start) / NUM_TICKS * 1e3
+
+    start = time.perf_counter()
+    for _ in range(NUM_TICKS):
+        -np.expm1(-location_factors * infectiousness_sums)
+    mean_field = (time.perf_counter() - start) / NUM_TICKS * 1e3
+
+    return exact, mean_field
+
+def main():
+    """Report the bias and cost of the approximation"""
+
+    num_agents = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = np.random.default_rng(1)
+
+    print("Relative bias of mean-field probability of infection (negative: underestimate)")
+    print(f"{'infectiousness':>15} {'occupancy':>10} " +
+          " ".join(f"{f'{p:.0%} infected':>14}" for p in PREVALENCES))
+    for name, values in INFECTIOUSNESS.items():
+        for occupancy in OCCUPANCIES:
+            biases = [relative_bias(rng, occupancy, p, values) for p in PREVALENCES]
+            print(f"{name:>15} {occupancy:>10} " + " ".join(f"{b:>14.2e}" for b in biases))
+
+    exact, mean_field = time_per_tick(num_agents)
+    print(f"\n{num_agents} agents in locations of 1000, 5% infectious")
+    print(f"exact: {exact:.2f} ms/tick, mean-field: {mean_field:.3f} ms/tick")
+
+if __name__ == "__main__":
+    main()
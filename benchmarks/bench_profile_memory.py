@@ -0,0 +1,78 @@
+"""Benchmark the memory used to store disease profiles and durations.
+
+Builds the disease model from the Luxembourg scenario for a population of agents at the scale
+factors given, and compares the size of its profile catalogue and per-agent arrays against the
+dicts of lists previously filled for every agent and strain at start-up: disease_profile_dict,
+disease_durations_dict and disease_profile_index_dict.
+
+Usage:
+    python benchmarks/bench_profile_memory.py [scale_factor ...]
+"""
+
+import sys
+import tracemalloc
+from collections import defaultdict
+
+from ms_abmlux.agent import Agent
+from ms_abmlux.config import Config
+from ms_abmlux.sim_time import SimClock
+from ms_abmlux.world import World
+from ms_abmlux.disease_model.multi_strain_disease_model import MultiStrainDiseaseModel
+
+CONFIG_FILENAME = "Scenarios/Luxembourg/config.yaml"
+
+def make_world(config, scale_factor):
+    """Return a world with no locations, populated according to the age distribution of each
+    region in the config"""
+
+    world = World(None)
+    world.set_scale_factor(scale_factor)
+    for region, region_config in config['world_factory.regions'].items():
+        for age, count in enumerate(region_config['age_distribution']):
+            for _ in range(round(count * scale_factor)):
+                world.add_agent(Agent(age, region))
+    return world
+
+def dict_bytes(model, world):
+    """Return the bytes allocated when drawing every agent's profile for every strain and storing
+    them as dicts of lists"""
+
+    # pylint: disable=protected-access
+    tracemalloc.start()
+    disease_profile_dict       = defaultdict(dict)
+    disease_durations_dict     = defaultdict(dict)
+    disease_profile_index_dict = {}
+    for agent in world.agents:
+        for strain in model.strains:
+            profile_id, durations = model._sample_profile(agent, strain)
+            disease_profile_dict[agent][strain] = list(model.profile_catalogue[profile_id])
+            disease_durations_dict[agent][strain] = durations
+            disease_profile_index_dict[agent] = 0
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+def array_bytes(model):
+    """Return the bytes used by the model's profile catalogue and arrays"""
+
+    catalogue_bytes = sum(sys.getsizeof(profile) for profile in model.profile_catalogue)
+    return catalogue_bytes + model.disease_profiles.nbytes + model.disease_durations.nbytes \
+           + model.disease_phases.nbytes
+
+def main():
+    """Run the benchmark at each scale factor given"""
+
+    scale_factors = [float(s) for s in sys.argv[1:]] or [0.05, 1.0]
+    config = Config(CONFIG_FILENAME)
+    clock  = SimClock(config['tick_length_s'], config['simulation_length_days'], config['epoch'])
+
+    print(f"{'scale':>6} {'agents':>8} {'dicts (MB)':>12} {'arrays (MB)':>12} {'ratio':>7}")
+    for scale_factor in scale_factors:
+        world = make_world(config, scale_factor)
+        model = MultiStrainDiseaseModel(config.subconfig('disease_model'), world, clock)
+        dicts, arrays = dict_bytes(model, world), array_bytes(model)
+        print(f"{scale_factor:>6} {len(world.agents):>8} {dicts / 1e6:>12.1f} "
+              f"{arrays / 1e6:>12.1f} {dicts / arrays:>7.1f}")
+
+if __name__ == "__main__":
+    main()
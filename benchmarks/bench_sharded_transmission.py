@@ -0,0 +1,71 @@
+"""Benchmark sharded transmission in the multi-strain disease model.
+
+Times one tick of transmission over a synthetic population, with locations split into a fixed
+number of shards evaluated by 1, 2, 4 and 8 worker processes, and in this process alone.  Since
+each shard draws from its own random stream, every run should expose the same agents; this is
+checked as the benchmark runs.  Speedup is bounded by the number of cores available.
+
+Usage:
+    python benchmarks/bench_sharded_transmission.py [num_agents] [num_shards]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from ms_abmlux.disease_model.transmission import ShardedTransmission
+
+NUM_TICKS           = 50
+AGENTS_PER_LOCATION = 4
+PROPORTION_INFECTED = 0.02
+SUSCEPTIBLE_CODE    = 0
+INFECTED_CODE       = 1
+
+def make_state(num_agents):
+    """Return agents' locations, health codes and infectiousness, and location factors"""
+
+    rng = np.random.default_rng(1)
+    num_locations   = num_agents // AGENTS_PER_LOCATION
+    agent_locations = rng.integers(num_locations, size=num_agents).astype(np.intp)
+    infected        = rng.random(num_agents) < PROPORTION_INFECTED
+    health_codes    = np.where(infected, INFECTED_CODE, SUSCEPTIBLE_CODE).astype(np.int8)
+    infectiousness  = np.where(infected, 0.05, 0.0)
+    location_factors = np.ones(num_locations)
+    return agent_locations, health_codes, infectiousness, location_factors
+
+def run(num_agents, num_shards, num_workers):
+    """Return the mean time per tick, in milliseconds, and the agents exposed each tick"""
+
+    transmission = ShardedTransmission(num_shards, num_workers, 1, *make_state(num_agents),
+                                       SUSCEPTIBLE_CODE)
+    transmission.transmit() # Wait for the workers to start
+
+    exposures = []
+    start = time.perf_counter()
+    for _ in range(NUM_TICKS):
+        exposures.append(transmission.transmit()[0])
+    elapsed = (time.perf_counter() - start) / NUM_TICKS * 1e3
+
+    transmission.close()
+    return elapsed, exposures
+
+def main():
+    """Run the benchmark for increasing numbers of workers"""
+
+    num_agents = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    num_shards = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    print(f"{num_agents} agents, {num_shards} shards, {NUM_TICKS} ticks, "
+          f"{os.cpu_count()} cores")
+    print(f"{'workers':>8} {'ms/tick':>10} {'speedup':>8}")
+    baseline, expected = run(num_agents, num_shards, 0)
+    print(f"{'none':>8} {baseline:>10.1f} {1:>8.2f}")
+    for num_workers in [1, 2, 4, 8]:
+        elapsed, exposures = run(num_agents, num_shards, num_workers)
+        assert all(np.array_equal(a, b) for a, b in zip(exposures, expected))
+        print(f"{num_workers:>8} {elapsed:>10.1f} {baseline / elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
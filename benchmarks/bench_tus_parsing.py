@@ -0,0 +1,93 @@
+"""Benchmark the parsing of time use survey diaries into daily routines.
+
+Parses the TUS file given, with the activity mapping and tick length of the scenario config,
+using the simple activity model's vectorised parser and the per-diary loop it replaced, checks
+that both produce the same routines, and prints the time each takes.
+
+Usage:
+    python benchmarks/bench_tus_parsing.py [config] [tus file]
+
+The survey is not distributed with the scenario.  The small synthetic survey in
+tests/test_data/time_use_survey/TUS.csv may be given instead to check that the parsers agree, though
+it is too small for meaningful timings.
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from ms_abmlux.activity_model.activity_manager import ActivityManager
+from ms_abmlux.activity_model.diary import DiaryDay
+from ms_abmlux.activity_model.simple_activity_model import SimpleActivityModel, DAY_LENGTH_10MIN
+from ms_abmlux.config import Config
+from ms_abmlux.sim_time import SimClock
+
+#pylint: disable=protected-access
+
+def loop_parse_days(tus, activity_mapping, tick_length_s):
+    """Parse diaries one at a time, as the simple activity model used to"""
+
+    def map_func(tus_pri, tus_sec):
+        return activity_mapping(pd.Series([tus_pri]), pd.Series([tus_sec]))[0]
+
+    days  = []
+    clock = SimClock(tick_length_s, 1)
+    for date in tus['id_jour'].unique():
+        tus_date  = tus.loc[tus['id_jour'] == date]
+        durations = [y-x for x, y in
+                     list(zip(tus_date['heuredebmin'], tus_date['heuredebmin'][1:]))]
+
+        end_activity = map_func(tus_date.iloc[-1]['loc1_num_f'], tus_date.iloc[-1]['act1b_f'])
+        start_time = int(tus_date.iloc[0]['heuredebmin'])
+
+        identity, age, day, weight = [tus_date.iloc[0][x]
+                                      for x in ['id_ind', 'age', 'jours_f', 'poids_ind']]
+        daily_routine_tenmin = [end_activity] * start_time
+        for i, duration in enumerate(durations):
+            daily_routine_tenmin += [map_func(tus_date.iloc[i]['loc1_num_f'],
+                                              tus_date.iloc[i]['act1b_f'])] * int(duration)
+        daily_routine_tenmin += [end_activity] * int(DAY_LENGTH_10MIN - sum(durations) - start_time)
+
+        daily_routine = []
+        clock.reset()
+        for _ in clock:
+            daily_routine.append(daily_routine_tenmin[int(clock.seconds_elapsed() / (10 * 60))])
+
+        days.append(DiaryDay(identity, age, day, weight, daily_routine))
+
+    return days
+
+def main():
+    """Parse the diaries both ways and compare"""
+
+    config_filename = sys.argv[1] if len(sys.argv) > 1 else "Scenarios/Luxembourg/config.yaml"
+    config          = Config(config_filename)
+    tus_filename    = sys.argv[2] if len(sys.argv) > 2 else \
+                      config['activity_model']['time_use_filepath']
+
+    # Only the mapping function is needed from the model, so skip building its routines
+    model = SimpleActivityModel.__new__(SimpleActivityModel)
+    model.activity_manager = ActivityManager(config['activities'])
+    mapping = model._get_tus_code_mapping(config['activity_model']['activity_code_map'])
+    tick_length_s = config['activity_model']['tick_length_s']
+
+    tus = pd.read_csv(tus_filename).dropna()
+    print(f"{tus_filename}: {len(tus)} rows, {tus['id_jour'].nunique()} diaries, "
+          f"ticks of {tick_length_s}s")
+
+    start = time.perf_counter()
+    days  = model._parse_days(tus, mapping, tick_length_s)
+    vectorised_time = time.perf_counter() - start
+
+    start     = time.perf_counter()
+    loop_days = loop_parse_days(tus, mapping, tick_length_s)
+    loop_time = time.perf_counter() - start
+
+    assert [day.daily_routine.tolist() for day in days] \
+           == [day.daily_routine for day in loop_days]
+    print(f"{'loop':>12} {loop_time:>8.3f}s")
+    print(f"{'vectorised':>12} {vectorised_time:>8.3f}s  ({loop_time / vectorised_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,7 @@ import argparse
 
 from ms_abmlux.random_tools import Random
 from ms_abmlux.utils import instantiate_class, remove_dunder_keys
-from ms_abmlux.messagebus import MessageBus
+from ms_abmlux.messagebus import MessageBus, AsyncMessageBus
 from ms_abmlux.sim_time import SimClock
 from ms_abmlux.sim_factory import SimulationFactory
 
@@ -56,6 +56,9 @@ def build_model(sim_factory):
                                       sim_factory.map, sim_factory.activity_manager,
                                       world_factory_config)
     world = world_factory.get_world()
+    # Give every configured location type an int, including any the world does not contain
+    for location_type in config['locations']:
+        world.location_types.register(location_type)
     sim_factory.set_world(world)
 
     # ----------------------------------------[ Components ]----------------------------------------
@@ -145,6 +148,21 @@ def build_model(sim_factory):
         sim_factory.add_intervention(intervention_id, new_intervention)
         sim_factory.add_intervention_schedule(new_intervention, intervention_config['__schedule__'])
 
+def build_telemetry_bus(config):
+    """Creates the bus used to deliver telemetry to reporters.  By default this is synchronous,
+    but reporters may be driven from a background thread so that the simulation only pays for
+    queueing their data."""
+
+    telemetry_config = config["telemetry_bus"] if "telemetry_bus" in config else {}
+    if 'asynchronous' not in telemetry_config or not telemetry_config['asynchronous']:
+        return MessageBus()
+
+    # Publishing blocks once this many records are waiting to be delivered
+    max_queue_size = telemetry_config['max_queue_size'] \
+                     if 'max_queue_size' in telemetry_config else 10000
+    log.info("Delivering telemetry asynchronously (max queue size %i)", max_queue_size)
+    return AsyncMessageBus(max_queue_size)
+
 def build_reporters(telemetry_bus, config):
     """Instantiates reporters, which record data on the simulation for analysis"""
 
@@ -188,7 +206,7 @@ def main():
             sim_factory.to_file(sys.argv[2])
 
     # Build list from config
-    telemetry_bus = MessageBus()
+    telemetry_bus = build_telemetry_bus(sim_factory.config)
     build_reporters(telemetry_bus, sim_factory.config)
 
     # ############## Run ##############
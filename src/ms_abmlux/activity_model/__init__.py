@@ -5,8 +5,8 @@ from ms_abmlux.component import Component
 class ActivityModel(Component):
     """Represent activity initialization and transitions for agents in the simulation.
 
-    This usually happens by emitting request.agent.activity events in response to clock updates
-    from the simulation."""
+    This usually happens by emitting request.agent.activity or request.agents.activity events in
+    response to clock updates from the simulation."""
 
     def __init__(self, config, activity_manager):
 
@@ -36,7 +36,7 @@ class DiaryDay:
           weight (float):Statistical weight given to this routine
           daily_routine (list):List of activities performed during this routine.
                                Length of list should be however many ticks there
-                               are in a simulation day.
+                               are in a simulation day.  May be given as an array.
         """
         # Container class for data we don't control, so pylint can be quiet
         # pylint: disable=too-many-arguments
@@ -69,7 +69,7 @@ class DiaryWeek:
           weight (float):Statistical weight given to this routine
           weekly_routine (list):List of activities performed during this routine.
                                 Length of list should be however many ticks there
-                                are in a simulation week.
+                                are in a simulation week.  May be given as an array.
         """
         self.uuid           = uuid.uuid4().hex
         self.identity       = identity
@@ -0,0 +1,84 @@
+"""On-disk cache of weekly routines compiled from time use survey data.
+
+Compiled routines depend only on the survey file, the tick length, the mapping from survey codes to
+activities, the age brackets and the border worker routine, so they are stored in directories
+named by a hash of those inputs, holding one .npy file per array.  Any change to an input gives a
+new name, so stale entries are never read.  Arrays are memory-mapped when loaded, so that runs
+sharing a cache, such as the members of an ensemble, share the pages holding them rather than each
+parsing the survey.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import os.path as osp
+import shutil
+
+import numpy as np
+
+log = logging.getLogger("routine_cache")
+
+# Bumped whenever the arrays stored change, so that older cache entries are not read
+CACHE_FORMAT_VERSION = 3
+
+def routine_cache_key(tus_filename: str, tick_length_s: int, activity_code_map: dict,
+                      activities: list[str], age_bracket_length: int,
+                      border_worker_routine: list[int]) -> str:
+    """Return a hash of the contents of the time use survey file and the settings used to compile
+    routines from it, which identifies the compiled routines.
+
+    Parameters:
+        tus_filename: Path to the time use survey data
+        tick_length_s: The length of ticks in the routines, in seconds
+        activity_code_map: The mapping from survey codes to activities
+        activities: The names of activities, in the order of their ints
+        age_bracket_length: The length of age brackets, in years
+        border_worker_routine: The weekly routine of border workers, compiled with the others
+    """
+
+    digest = hashlib.sha256()
+    with open(tus_filename, "rb") as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps({"version":               CACHE_FORMAT_VERSION,
+                              "tick_length_s":         tick_length_s,
+                              "activity_code_map":     activity_code_map,
+                              "activities":            activities,
+                              "age_bracket_length":    age_bracket_length,
+                              "border_worker_routine": border_worker_routine},
+                             sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+def routine_cache_path(cache_dir: str, key: str) -> str:
+    """Return the path of the directory holding the cache entry with the key given"""
+
+    return osp.join(cache_dir, f"routines-{key}")
+
+def save_routines(path: str, arrays: dict[str, np.ndarray]) -> None:
+    """Write each of the arrays given to a .npy file named after it, in the directory given.
+
+    The directory is written under a temporary name and then renamed, so that runs starting at the
+    same time never read a partial entry.  If another run has saved the entry first, it is kept."""
+
+    log.info("Caching compiled routines in %s", path)
+    os.makedirs(osp.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(osp.join(temp_path, f"{name}.npy"), array, allow_pickle=False)
+
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        if not osp.isdir(path):
+            raise
+        shutil.rmtree(temp_path)
+
+def load_routines(path: str) -> dict[str, np.ndarray]:
+    """Return the arrays in the .npy files in the directory given, each memory-mapped read-only"""
+
+    log.info("Loading compiled routines from %s", path)
+    return {osp.basename(filename).removesuffix(".npy"): np.load(filename, mmap_mode="r")
+            for filename in sorted(glob.glob(osp.join(path, "*.npy")))}
@@ -0,0 +1,91 @@
+"""Weekly routines held as runs of ticks spent on a single activity.
+
+Activities change only a few dozen times a week, so storing one entry per run rather than per tick
+makes the memory used by routines independent of the tick length.
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger("routines")
+
+class RunLengthRoutines:
+    """A set of weekly routines, each a sequence of runs of ticks spent on one activity.
+
+    The runs of routine r are those from run_indptr[r] up to, but not including, run_indptr[r + 1].
+    Each starts at the tick of the week given in run_starts and continues until the next run
+    starts, or the week ends, performing the activity given in run_activities.  The first run of
+    every routine starts at tick 0, and consecutive runs have different activities."""
+
+    def __init__(self, run_indptr: np.ndarray, run_starts: np.ndarray,
+                 run_activities: np.ndarray, ticks_in_week: int):
+
+        self.run_indptr     = run_indptr
+        self.run_starts     = run_starts
+        self.run_activities = run_activities
+        self.ticks_in_week  = ticks_in_week
+
+        # The routine of each run, and a key ordering all runs by routine and then start, which
+        # is searched to find the run covering any tick of any routine
+        self.run_routines = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(run_indptr))
+        self.run_keys     = self.run_routines.astype(np.int64) * ticks_in_week + run_starts
+
+    def __len__(self):
+        return len(self.run_indptr) - 1
+
+    @classmethod
+    def encode(cls, routines: np.ndarray) -> "RunLengthRoutines":
+        """Return the run-length encoding of a matrix holding the activity of each routine, by row,
+        at each tick of the week, by column."""
+
+        starts_run = np.ones(routines.shape, dtype=bool)
+        starts_run[:, 1:] = routines[:, 1:] != routines[:, :-1]
+        run_routines, run_starts = np.nonzero(starts_run)
+
+        return cls(np.searchsorted(run_routines, np.arange(len(routines) + 1)),
+                   run_starts.astype(np.int32), routines[run_routines, run_starts],
+                   routines.shape[1])
+
+    def activities_at(self, routines: np.ndarray, ticks: np.ndarray) -> np.ndarray:
+        """Return the activity of each routine given at the corresponding tick of the week, found
+        by binary search of the runs.  Routines and ticks are broadcast against each other."""
+
+        runs = np.searchsorted(self.run_keys, np.asarray(routines) * self.ticks_in_week + ticks,
+                               side='right') - 1
+        return self.run_activities[runs]
+
+    def decode(self) -> np.ndarray:
+        """Return the matrix of the activity of each routine at each tick of the week"""
+
+        run_lengths = np.diff(np.append(self.run_keys, len(self) * self.ticks_in_week))
+        return np.repeat(self.run_activities, run_lengths).reshape(len(self), self.ticks_in_week)
+
+    def performs(self, activity: int) -> np.ndarray:
+        """Return whether each routine ever performs the activity given"""
+
+        performs = np.zeros(len(self), dtype=bool)
+        performs[self.run_routines[self.run_activities == activity]] = True
+        return performs
+
+    def changes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the ticks of the week at which routines change activity, the routines changing
+        and their new activities, in order of tick and then routine.
+
+        Every run but the first of a routine starts with a change.  Since routines repeat weekly,
+        the first run starts with a change only if the last run of the week differs from it."""
+
+        last_activities = self.run_activities[self.run_indptr[1:] - 1]
+        changing = (self.run_starts > 0) \
+                   | (self.run_activities != last_activities[self.run_routines])
+        ticks, routines = self.run_starts[changing], self.run_routines[changing]
+        order = np.lexsort((routines, ticks))
+
+        return ticks[order], routines[order], self.run_activities[changing][order]
+
+    def nbytes(self) -> int:
+        """Return the memory used by the arrays describing the runs, in bytes"""
+
+        return sum(array.nbytes for array in (self.run_indptr, self.run_starts,
+                                              self.run_activities, self.run_routines,
+                                              self.run_keys))
@@ -7,14 +7,15 @@ sequence of such numbers. Daily routines are then concatenated to produce, for e
 typical weekly routine. The week begins on Sunday and ends on Saturday."""
 
 import logging
+import os.path as osp
 
-from collections import defaultdict
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
-import ms_abmlux.utils as utils
 from ms_abmlux.activity_model import ActivityModel
-from ms_abmlux.sim_time import SimClock
+from ms_abmlux.activity_model.routines import RunLengthRoutines
+from ms_abmlux.activity_model.routine_cache import (routine_cache_key, routine_cache_path,
+                                                    load_routines, save_routines)
 from ms_abmlux.activity_model.diary import DiaryDay, DiaryWeek, DayOfWeek
 
 # Number of 10 minute chunks in a day. Used when parsing the input data at a 10 minute resolution
@@ -39,57 +40,40 @@ class SimpleActivityModel(ActivityModel):
         self.age_bracket_length       = config['age_bracket_length']
         self.work_activity_type_int   = activity_manager.as_int(config['work_activity_type'])
         self.school_activity_type_int = activity_manager.as_int(config['school_activity_type'])
-
-        self.weeks_changing_activity  = defaultdict(list)
-        self.agents_by_week           = defaultdict(list)
-        self.weeks_by_agent           = {}
-        self.weeks                    = []
+        self.routine_entropy          = config['__prng_seed__'] if '__prng_seed__' in config \
+                                        else np.random.SeedSequence().entropy
 
         """Determine a weekly routine for each agent and updates the world on which agents want to
         work and which agents want to go to school"""
 
-        # Construct weeks
-        self.weeks = self._create_weekly_routines()
-
-        # Group weeks according to age
-        weeks_by_age_bracket = defaultdict(dict)
-        for week in self.weeks:
-            weeks_by_age_bracket[week.age//self.age_bracket_length][week] = week.weight
-
-        # Assign a weekly routine to each resident agent by random selection
-        log.debug("Seeding week rountines and initial activities...")
-        min_age_bracket = min(weeks_by_age_bracket.keys())
-        max_age_bracket = max(weeks_by_age_bracket.keys())
-        for agent in world.agents:
-            if agent.region == config['region']:
-                age_bracket = agent.age//self.age_bracket_length
-                if age_bracket < min_age_bracket:
-                    age_bracket_key = min_age_bracket
-                elif age_bracket > max_age_bracket:
-                    age_bracket_key = max_age_bracket
-                else:
-                    age_bracket_key = age_bracket
-                weeks_sample = weeks_by_age_bracket[age_bracket_key]
-                selected_week = self.prng.multinoulli_dict(weeks_sample)
-                if self.work_activity_type_int in selected_week.weekly_routine:
-                    agent.work_behaviour_type = True
-                if self.school_activity_type_int in selected_week.weekly_routine:
-                    agent.school_behaviour_type = True
-                self.weeks_by_agent[agent] = selected_week
-                self.agents_by_week[selected_week].append(agent)
-
-        # Assign a weekly routine to each border worker
-        border_worker_week = DiaryWeek('border_worker', -1, -1, config['border_worker_routine'])
-        self.weeks.append(border_worker_week)
-        for agent in world.agents:
-            if agent.region != config['region']:
-                self.weeks_by_agent[agent] = border_worker_week
-                self.agents_by_week[border_worker_week].append(agent)
+        # Construct weeks.  Distinct routines are held once each, as runs of ticks spent on one
+        # activity, and weeks refer to them by index
+        routines      = self._load_weekly_routines()
+        self.routines = RunLengthRoutines(routines['run_indptr'], routines['run_starts'],
+                                          routines['run_activities'],
+                                          int(routines['ticks_in_week']))
+
+        # Assign a weekly routine to each resident agent by random selection among the weeks in
+        # the agent's age bracket, and the border worker routine to each border worker
+        log.debug("Seeding week routines and initial activities...")
+        residents = np.flatnonzero([agent.region == config['region'] for agent in world.agents])
+        self.routine_by_agent = np.full(len(world.agents), int(routines['border_worker_routine']),
+                                        dtype=np.intp)
+        self.routine_by_agent[residents] = self._draw_routines(
+            routines, np.array([world.agents[row].age for row in residents.tolist()]))
+
+        # Record which agents ever work or go to school
+        works   = self.routines.performs(self.work_activity_type_int)
+        schools = self.routines.performs(self.school_activity_type_int)
+        for row in residents[works[self.routine_by_agent[residents]]].tolist():
+            world.agents[row].work_behaviour_type = True
+        for row in residents[schools[self.routine_by_agent[residents]]].tolist():
+            world.agents[row].school_behaviour_type = True
 
         # Set initial activities
-        for agent in world.agents:
-            new_activity = self.weeks_by_agent[agent].weekly_routine[clock.epoch_week_offset]
-            agent.set_activity(new_activity)
+        for agent, activity in zip(world.agents,
+                                   self.activities_at(clock.epoch_week_offset).tolist()):
+            agent.set_activity(activity)
 
     def init_sim(self, sim):
         super().init_sim(sim)
@@ -99,25 +83,127 @@ class SimpleActivityModel(ActivityModel):
         # Hook into the simulation's messagebus
         self.bus.subscribe("notify.time.tick", self.send_activity_change_events, self)
 
-        # Precalculate, at each time of the week, which weeks change activities
-        for t_now in range(clock.ticks_in_week):
-            if t_now == 0:
-                t_previous = max(range(clock.ticks_in_week))
-            else:
-                t_previous = t_now - 1
-            for week in self.weeks:
-                if week.weekly_routine[t_now] != week.weekly_routine[t_previous]:
-                    self.weeks_changing_activity[t_now].append(week)
+        # Precalculate, at each time of the week, which routines change activities and what to,
+        # in compressed sparse row form: the routines changing at tick t of the week are
+        # change_routines[change_indptr[t]:change_indptr[t + 1]], with new activities at the same
+        # positions of change_activities
+        ticks, self.change_routines, self.change_activities = self.routines.changes()
+        self.change_indptr = np.searchsorted(ticks, np.arange(clock.ticks_in_week + 1))
+
+        # Likewise the agents following each routine: those following routine r are
+        # routine_agents[routine_indptr[r]:routine_indptr[r + 1]], in the order of the world's agents
+        agent_order = np.argsort(self.routine_by_agent, kind='stable')
+        self.routine_agents = np.empty(len(agent_order), dtype=object)
+        self.routine_agents[:] = [sim.world.agents[row] for row in agent_order.tolist()]
+        self.routine_indptr = np.searchsorted(self.routine_by_agent[agent_order],
+                                              np.arange(len(self.routines) + 1))
+
+    def activities_at(self, ticks_through_week: int) -> np.ndarray:
+        """Return the activity of each agent, in the order of the world's agents, at the tick of
+        the week given"""
+
+        return self.routines.activities_at(self.routine_by_agent, ticks_through_week)
 
     def send_activity_change_events(self, clock, t):
-        """Update activities for those agents with routines chaning at this time."""
+        """Update activities for those agents with routines changing at this time, requesting
+        every change in one request.agents.activity event."""
 
         ticks_through_week = clock.ticks_through_week()
-
-        for week in self.weeks_changing_activity[ticks_through_week]:
-            next_activity = week.weekly_routine[ticks_through_week]
-            for agent in self.agents_by_week[week]:
-                self.bus.publish("request.agent.activity", agent, next_activity)
+        changes  = slice(self.change_indptr[ticks_through_week],
+                         self.change_indptr[ticks_through_week + 1])
+        routines = self.change_routines[changes]
+        if len(routines) == 0:
+            return
+
+        # Expand each changing routine into the positions of its agents in routine_agents
+        firsts    = self.routine_indptr[routines]
+        sizes     = self.routine_indptr[routines + 1] - firsts
+        positions = np.repeat(firsts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+
+        self.bus.publish("request.agents.activity", self.routine_agents[positions],
+                         np.repeat(self.change_activities[changes], sizes))
+
+    def _draw_routines(self, routines, ages):
+        """Return a routine for each of the ages given, drawn from the weeks in the same age
+        bracket with probability proportional to their weights.  Ages outside the brackets of the
+        weeks are given the nearest bracket, as are those in brackets having no weeks.
+
+        Draws for each bracket are made at once, by a Philox generator seeded with the model's
+        seed and the bracket, which is age // age_bracket_length.  The draws for a bracket
+        therefore depend only on the seed and the ages falling in it, in the order given."""
+
+        week_brackets = np.asarray(routines['age_brackets'])
+        weights       = np.asarray(routines['weights'])
+        week_routines = np.asarray(routines['week_routines'])
+        brackets      = np.unique(week_brackets)
+        age_brackets  = np.digitize(ages, brackets[1:] * self.age_bracket_length)
+
+        drawn = np.empty(len(ages), dtype=np.intp)
+        for i, bracket in enumerate(brackets.tolist()):
+            weeks       = np.flatnonzero(week_brackets == bracket)
+            ages_drawn  = np.flatnonzero(age_brackets == i)
+            cum_weights = np.cumsum(weights[weeks])
+            if cum_weights[-1] == 0:
+                log.warning("All weeks in age bracket %s have 0 weight, choosing flat weights "
+                            "instead", bracket)
+                cum_weights = np.arange(1, len(weeks) + 1)
+            seed = np.random.SeedSequence(self.routine_entropy, spawn_key=(int(bracket), ))
+            rng  = np.random.Generator(np.random.Philox(seed))
+            drawn[ages_drawn] = week_routines[weeks[np.searchsorted(
+                cum_weights, rng.random(len(ages_drawn)) * cum_weights[-1], side='right')]]
+
+        return drawn
+
+    def _load_weekly_routines(self):
+        """Return the arrays describing weekly routines, as made by _compile_weekly_routines.
+
+        If routine_cache_dir is configured, the arrays are memory-mapped from the cache there,
+        being compiled and added to it first if they are not yet present."""
+
+        if 'routine_cache_dir' not in self.config:
+            return self._compile_weekly_routines()
+
+        key = routine_cache_key(self.config['time_use_filepath'], self.tick_length_s,
+                                self.activity_code_map, self.activity_manager.types_as_str(),
+                                self.age_bracket_length, self.config['border_worker_routine'])
+        cache_path = routine_cache_path(self.config['routine_cache_dir'], key)
+        if not osp.exists(cache_path):
+            save_routines(cache_path, self._compile_weekly_routines())
+
+        return load_routines(cache_path)
+
+    def _compile_weekly_routines(self):
+        """Compile weekly routines from the time use survey into arrays, with one entry per week:
+        identities, ages, weights, age_brackets and week_routines.
+
+        Routines are deduplicated and run-length encoded, as the run_indptr, run_starts and
+        run_activities of RunLengthRoutines, with ticks_in_week.  week_routines gives the routine
+        followed by each week, and border_worker_routine that followed by border workers."""
+
+        weeks = self._create_weekly_routines()
+        border_worker_routine = self.config['border_worker_routine']
+        if any(len(week.weekly_routine) != len(border_worker_routine) for week in weeks):
+            raise ValueError("The border worker routine must have an activity for each tick of "
+                             "the week")
+        weekly_routines = np.array([week.weekly_routine for week in weeks]
+                                   + [border_worker_routine], dtype=np.uint8)
+        routines, routine_index = np.unique(weekly_routines, axis=0, return_inverse=True)
+        routine_index = routine_index.ravel()
+        routines      = RunLengthRoutines.encode(routines)
+        log.info("%i distinct routines in %i weeks, with %i runs", len(routines), len(weeks),
+                 len(routines.run_starts))
+
+        ages = np.array([week.age for week in weeks])
+        return {'identities':            np.array([str(week.identity) for week in weeks]),
+                'ages':                  ages,
+                'weights':               np.array([week.weight for week in weeks], dtype=float),
+                'age_brackets':          ages // self.age_bracket_length,
+                'run_indptr':            routines.run_indptr,
+                'run_starts':            routines.run_starts,
+                'run_activities':        routines.run_activities,
+                'ticks_in_week':         routines.ticks_in_week,
+                'week_routines':         routine_index[:-1],
+                'border_worker_routine': routine_index[-1]}
 
     def _create_weekly_routines(self):
         """Create weekly routines for individuals, reading their daily routines
@@ -188,8 +274,9 @@ class SimpleActivityModel(ActivityModel):
 
             # Create a week with most things the same, but with a whole week's worth of activities
             week = DiaryWeek(weekday.identity, weekday.age, weekday.weight,
-                             weekend.daily_routine + weekday.daily_routine \
-                             * 5 + weekend.daily_routine)
+                             np.concatenate([weekend.daily_routine]
+                                            + [weekday.daily_routine] * 5
+                                            + [weekend.daily_routine]))
             weeks.append(week)
         log.info("Created %i weeks", len(weeks))
 
@@ -208,9 +295,9 @@ class SimpleActivityModel(ActivityModel):
         {'House': {'primary': [1], 'secondary': [11,12,13,14]},
         'Work': {'primary': [2]}}
 
-        The resulting function takes two arguments, namely the TUS primary
-        and secondary codes, as ints.  It returns one of the keys
-        from the mapping given to _this_ function.
+        The resulting function takes two arguments, namely pandas Series of
+        the TUS primary and secondary codes.  It returns an array of the ints
+        representing the keys from the mapping given to _this_ function.
         """
         # pylint doesn't like our primary, secondary shorthand below.
         # pylint: disable=invalid-name
@@ -227,11 +314,14 @@ class SimpleActivityModel(ActivityModel):
             for s in secondary:
                 mapping_sec[s] = self.activity_manager.as_int(abm_code)
 
-        # Define mapping function, enclosing the above mapping
+        # Define mapping function, enclosing the above mapping.  It maps whole columns of codes
+        # at once
         def tus_activity_to_abm_activity(tus_pri, tus_sec):
-            if tus_pri != 7:
-                return mapping_pri[tus_pri]
-            return mapping_sec[tus_sec]
+            activities = tus_pri.map(mapping_pri).where(tus_pri != 7, tus_sec.map(mapping_sec))
+            if activities.isna().any():
+                unmapped = sorted(set(zip(tus_pri[activities.isna()], tus_sec[activities.isna()])))
+                raise KeyError(f"TUS activity codes (primary, secondary) not mapped: {unmapped}")
+            return activities.to_numpy(dtype=int)
 
         return tus_activity_to_abm_activity
 
@@ -246,48 +336,53 @@ class SimpleActivityModel(ActivityModel):
         repositioned to the start of the day. This way, all routines cover a 24 hour period running
         from midnight to midnight.
 
+        All diaries are converted at once: activities are repeated for their durations, in
+        10 minute chunks, and the resulting routines resampled into ticks by indexing.
+
         Parameters:
             tus (pandas dataframe):The TUS dataset loaded from excel
-            map_func (function):A function taking two ints and returning
-                                the activity code for this row.
+            map_func (function):A function taking the columns of primary and
+                                secondary codes and returning the activity code
+                                of each row.
             tick_length_s:The length of ticks in the simulation, in seconds
 
         Returns:
-            days(list):A list of DiaryDay objects.
+            days(list):A list of DiaryDay objects, whose routines are uint8 arrays.
         """
-        # We use so many variables to be clearer in the parsing logic
-        # pylint: disable=too-many-locals
-
-        days  = []
-        clock = SimClock(tick_length_s, 1)
-        for date in tqdm(tus['id_jour'].unique()):
-            tus_date  = tus.loc[tus['id_jour'] == date]
-            durations = [y-x for x, y in
-                         list(zip(tus_date['heuredebmin'], tus_date['heuredebmin'][1:]))]
-
-            end_activity = map_func(tus_date.iloc[-1]['loc1_num_f'], tus_date.iloc[-1]['act1b_f'])
-            start_time = tus_date.iloc[0]['heuredebmin']
-
-            # Build variables for object at 10min resolution
-            identity, age, day, weight = [tus_date.iloc[0][x]
-                                          for x in ['id_ind', 'age', 'jours_f', 'poids_ind']]
-            daily_routine_tenmin = [end_activity] * start_time \
-                        + utils.flatten([[map_func(tus_date.iloc[i]['loc1_num_f'],
-                                                   tus_date.iloc[i]['act1b_f'])] * d
-                                         for i, d in enumerate(durations)]) \
-                        + [end_activity] * (DAY_LENGTH_10MIN - sum(durations) - start_time)
-
-            # Resample into the clock resolution
-            log.debug("Resampling 10min chunks into clock resolution (%is)...", clock.tick_length_s)
-            daily_routine = []
-            clock.reset()
-            for _ in clock:
-                seconds_through_day = clock.seconds_elapsed()
-                tenmin_bin = int(seconds_through_day / (10 * 60))
-                daily_routine.append(daily_routine_tenmin[tenmin_bin])
-
-            # Create the list entry
-            day = DiaryDay(identity, age, day, weight, daily_routine)
-            days.append(day)
-
-        return days
+        # Gather the rows of each diary together, with diaries in order of first appearance
+        diary_numbers = tus.groupby('id_jour', sort=False).ngroup().to_numpy()
+        tus     = tus.iloc[np.argsort(diary_numbers, kind='stable')]
+        diaries = tus.groupby('id_jour', sort=False)
+        sizes   = diaries.size().to_numpy()
+        lasts   = np.cumsum(sizes) - 1
+        firsts  = lasts - sizes + 1
+
+        # Each activity lasts until the next begins, and the last until the end of the day.  The
+        # last activity also covers the start of the day, before the first begins.  Activities
+        # listed out of order last no time, and those running past midnight are cut off there
+        activities = map_func(tus['loc1_num_f'], tus['act1b_f'])
+        if activities.max() > np.iinfo(np.uint8).max:
+            raise ValueError("Routines can hold at most 256 activities")
+        activities = activities.astype(np.uint8)
+        starts     = tus['heuredebmin'].to_numpy(dtype=int)
+        durations  = np.append(starts[1:], 0) - starts
+        durations[lasts] = DAY_LENGTH_10MIN - starts[lasts]
+        activities = np.insert(activities, firsts, activities[lasts])
+        durations  = np.maximum(np.insert(durations, firsts, starts[firsts]), 0)
+        routines_tenmin = np.repeat(activities, durations)
+
+        # Resample into the clock resolution
+        log.debug("Resampling 10min chunks into clock resolution (%is)...", tick_length_s)
+        ticks_in_day = int(86400 / tick_length_s)
+        tenmin_bins  = np.arange(ticks_in_day) * tick_length_s // (10 * 60)
+        day_lengths  = np.add.reduceat(durations, firsts + np.arange(len(firsts)))
+        if np.any(day_lengths <= tenmin_bins[-1]):
+            raise ValueError("Time use diaries must cover a whole day")
+        day_offsets = np.cumsum(day_lengths) - day_lengths
+        routines    = routines_tenmin[day_offsets[:, np.newaxis] + tenmin_bins]
+
+        first_rows = diaries.head(1)
+        return [DiaryDay(identity, age, day, weight, daily_routine)
+                for identity, age, day, weight, daily_routine
+                in zip(first_rows['id_ind'], first_rows['age'], first_rows['jours_f'],
+                       first_rows['poids_ind'], routines)]
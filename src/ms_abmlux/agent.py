@@ -31,7 +31,8 @@ class Agent:
         # Current state
         self.current_activity: Optional[str]       = None
         self.current_location: Optional[Location]  = current_location
-        self.health: Optional[str]                 = None
+        # Health states are represented by ints, as coded by the disease model's health states
+        self.health: Optional[int]                 = None
         self.current_employment: Optional[str]     = None
 
     def locations_for_activity(self, activity: str) -> list[Location]:
@@ -63,7 +64,7 @@ class Agent:
 
         self.activity_locations[activity] += location_list
 
-    def set_health(self, health: str) -> None:
+    def set_health(self, health: int) -> None:
         """Sets the agent as having the given health state"""
 
         log.debug("Agent %s: Health %s -> %s", self.uuid, self.health, health)
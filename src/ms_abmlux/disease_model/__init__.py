@@ -7,23 +7,29 @@ to support many other forms of disease model.
 import logging
 
 from ms_abmlux.component import Component
+from ms_abmlux.registry import Registry
 
 log = logging.getLogger("disease_model")
 
 class DiseaseModel(Component):
     """Represents a disease type within the system"""
 
+    # Whether the model needs agents' activities and locations to be simulated tick by tick.  If
+    # not, the simulator does not start the activity and movement models
+    tracks_movement = True
+
     def __init__(self, config, disease_states):
         """Represents a disease model as a list of states.
 
         Each state may be any type, but it will be cast to a string and shortened into a single
         uppercase letter for brief representation in output.  This means, for example, passing in
         ['SUSCEPTIBLE', 'INFECTED', 'DEAD'] would result in the single-letter codes 'S', 'I', and
-        'D'.
+        'D'.  Agents' health is represented by the int coding each state in health_states.
         """
 
         super().__init__(config)
         self.states             = disease_states
+        self.health_states      = Registry(disease_states)
         self.states_letter_dict = {DiseaseModel.letter_for_state(s): s for s in disease_states}
 
         # Ensure state letter codes are unique.
@@ -0,0 +1,207 @@
+"""Multi-strain disease model advanced in whole-day steps"""
+
+import logging
+import math
+
+import numpy as np
+
+from ms_abmlux.disease_model.multi_strain_disease_model import MultiStrainDiseaseModel
+
+log = logging.getLogger("daily_step_disease_model")
+
+# The length of the ticks on which the model runs, in seconds
+DAY_LENGTH_S = 86400
+
+#pylint: disable=attribute-defined-outside-init
+class DailyStepDiseaseModel(MultiStrainDiseaseModel):
+    """Represents an infectious disease consisting of multiple strains, with transmission computed
+    once a day from the time agents are expected to spend at each of their locations, rather than
+    from where agents are tick by tick.
+
+    Agents, strains and disease profiles are as in the multi-strain disease model, but the clock
+    must have ticks of one day, so that disease progression advances in whole days, and activities
+    and movement are not simulated.  Instead, each agent spends each day of the week as its weekly
+    routine dictates, with the time given to an activity shared evenly between the locations at
+    which the agent may perform it.
+
+    The day is divided into blocks_per_day blocks of equal length.  If w_ilb is the time agent i
+    spends at location l in block b, in ticks of the routines, and T_b is the number of such ticks
+    in the block, agents i and j are taken to be at l together for w_ilb w_jlb / T_b ticks.  A
+    susceptible agent j is then infected with probability 1 - exp(-h_j), where
+
+        h_j = sum over b and l of f_l w_jlb / T_b * sum over i of w_ilb p_i,
+
+    p_i is the infectiousness of agent i per tick of the routines, and f_l is the transmission
+    factor of l.  Since this ignores when within each block agents are at each location, it is a
+    coarse approximation to the tick-by-tick model, meant for horizons of months or years.
+    Transmission probabilities apply to ticks of the routines, whose length is the activity model's
+    tick_length_s.
+
+    Durations drawn in days are rounded up or down to whole days at random, with the probability of
+    rounding up equal to the fractional part, and agents leave each state once its duration has
+    elapsed.  Phases and immunity then last as long on average as in the tick-by-tick model, rather
+    than about half a day longer as they would if durations were floored and states left the tick
+    after, as there.  Since agents spend at least one tick in every state, phases shorter than a
+    day still last a day."""
+
+    tracks_movement = False
+
+    def __init__(self, config, world, clock):
+        super().__init__(config, world, clock)
+
+        if clock.tick_length_s != DAY_LENGTH_S:
+            raise ValueError(f"The daily step disease model needs ticks of {DAY_LENGTH_S}s, "
+                             f"not {clock.tick_length_s}s")
+
+        # Transmission is computed from routines here, so options of the tick-by-tick transmission
+        # path would be ignored
+        for option in ('transmission_shards', 'transmission_workers', 'household_location_types',
+                       'mean_field_threshold'):
+            if option in config:
+                raise ValueError(f"The daily step disease model does not support {option}")
+
+        # The number of blocks into which the day is divided when computing time spent together
+        self.blocks_per_day = config['blocks_per_day'] if 'blocks_per_day' in config else 24
+
+        # Agents in these health states, such as those in hospital, take no part in their routines
+        self.confined_states = config['confined_health_states'] \
+                               if 'confined_health_states' in config else []
+
+    def init_sim(self, sim):
+        super().init_sim(sim)
+
+        # Whether agents in each health state are confined
+        self.confined_codes = np.isin(self.health_states.types_as_int(),
+                                      [self.health_states.as_int(state)
+                                       for state in self.confined_states])
+
+        self._build_contact_weights(sim.activity_model)
+
+    def _durations_to_ticks(self, durations, rng):
+        """Rounds durations in days to whole days at random, so that their mean is unchanged,
+        keeping None for phases having no duration.  One uniform number is drawn for each phase,
+        after all durations have been drawn."""
+
+        fractions = rng.random(len(durations))
+        return [None if duration is None else math.floor(duration + fraction)
+                for duration, fraction in zip(durations, fractions)]
+
+    def _schedule_progression(self, agent, state_start_tick):
+        """Schedules the agent to leave its current state once its duration, in days, has elapsed,
+        or after one day if its duration is 0.  States with no duration are left only through other
+        means."""
+
+        duration_ticks = self._duration(agent, self.disease_phases[self.agent_index[agent]])
+        if duration_ticks is not None:
+            self.progression_events[state_start_tick + max(duration_ticks, 1)].append(agent)
+
+    def _build_contact_weights(self, activity_model):
+        """Tabulates the time spent on each activity in each block of each day of the week in every
+        weekly routine, and the locations at which each agent performs each of its activities.
+
+        The time agent pair_rows[k] spends at location pair_locations[k] in block b of day d of the
+        week is routine_time[pair_offsets[k] + (d * blocks_per_day + b) * num_activities] *
+        pair_shares[k].  Pairs are in agent order, those of the agent with row r running from
+        pair_indptr[r] up to pair_indptr[r + 1]."""
+
+        log.info("Computing daily contact weights from weekly routines...")
+        routines     = activity_model.routines
+        num_routines = len(routines)
+        self.ticks_per_day  = routines.ticks_in_week // 7
+        self.num_activities = int(routines.run_activities.max()) + 1
+
+        # routine_time[((w * 7 + d) * blocks_per_day + b) * num_activities + a]: ticks spent on
+        # activity a in block b of day d of routine w.  Runs are split where blocks start, so that
+        # each piece lies within one block
+        blocks = np.arange(self.ticks_per_day) * self.blocks_per_day // self.ticks_per_day
+        self.block_ticks = np.bincount(blocks)
+        blocks_in_week = np.tile(blocks, 7) + np.repeat(np.arange(7), self.ticks_per_day) \
+                                              * self.blocks_per_day
+        block_starts = np.flatnonzero(np.diff(blocks_in_week, prepend=-1))
+        piece_keys   = np.union1d(routines.run_keys,
+                                  (np.arange(num_routines)[:, np.newaxis] * routines.ticks_in_week
+                                   + block_starts).ravel())
+        piece_ticks  = np.diff(np.append(piece_keys, num_routines * routines.ticks_in_week))
+        piece_routines, piece_starts = np.divmod(piece_keys, routines.ticks_in_week)
+        self.routine_time = np.bincount(
+            (piece_routines * 7 * self.blocks_per_day + blocks_in_week[piece_starts])
+            * self.num_activities + routines.activities_at(piece_routines, piece_starts),
+            weights=piece_ticks,
+            minlength=num_routines * 7 * self.blocks_per_day * self.num_activities
+        ).astype(np.intp)
+        activities_by_routine = [np.flatnonzero(self.routine_time.reshape(num_routines, -1,
+                                                                          self.num_activities)[w]
+                                                .any(axis=0)) for w in range(num_routines)]
+
+        rows, locations, offsets, shares = [], [], [], []
+        for row, (agent, routine) in enumerate(zip(self.world.agents,
+                                                   activity_model.routine_by_agent.tolist())):
+            for activity in activities_by_routine[routine]:
+                activity_locations = agent.locations_for_activity(int(activity))
+                for location in activity_locations:
+                    rows.append(row)
+                    locations.append(self.location_index[location])
+                    offsets.append(routine * 7 * self.blocks_per_day * self.num_activities
+                                   + activity)
+                    shares.append(1 / len(activity_locations))
+
+        self.pair_rows      = np.array(rows, dtype=np.intp)
+        self.pair_locations = np.array(locations, dtype=np.intp)
+        self.pair_offsets   = np.array(offsets, dtype=np.intp)
+        self.pair_shares    = np.array(shares)
+        self.pair_indptr    = np.searchsorted(self.pair_rows, np.arange(len(self.world.agents) + 1))
+        log.info("%i agent-location pairs", len(self.pair_rows))
+
+    def _transmit(self):
+        """Determines which susceptible agents are infected today"""
+
+        day = self.sim.clock.ticks_through_week()
+        infectiousness = np.where(self.confined_codes[self.health_codes], 0.0, self.infectiousness)
+        infectiousness = infectiousness[self.pair_rows]
+        if not infectiousness.any():
+            return
+
+        # For each block of the day, the infectiousness present at each location, weighted by time
+        # spent there and scaled by the transmission factor, and the resulting exposure of each
+        # agent at each location.  Infectious time is summed over the day to choose infectors
+        exposure   = np.zeros(len(self.pair_rows))
+        infectious = np.zeros(len(self.pair_rows))
+        for block in range(self.blocks_per_day):
+            time = self.routine_time[self.pair_offsets + (day * self.blocks_per_day + block)
+                                     * self.num_activities] * self.pair_shares
+            infectious_time = time * infectiousness
+            pressure = self.location_factors * np.bincount(self.pair_locations,
+                                                           weights=infectious_time,
+                                                           minlength=len(self.locations)) \
+                       / self.block_ticks[block]
+            exposure   += time * pressure[self.pair_locations]
+            infectious += infectious_time
+        exposure[self.confined_codes[self.health_codes[self.pair_rows]]] = 0
+        hazard = np.bincount(self.pair_rows, weights=exposure, minlength=len(self.world.agents))
+
+        susceptible = np.flatnonzero((self.health_codes == self.susceptible_state) & (hazard > 0))
+        exposed = susceptible[self.prng.independent_booleans(-np.expm1(-hazard[susceptible]))]
+        if len(exposed) == 0:
+            return
+
+        # Choose where each exposed agent was infected in proportion to the exposure there
+        firsts = self.pair_indptr[exposed]
+        sizes  = self.pair_indptr[exposed + 1] - firsts
+        pairs  = np.repeat(firsts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        lasts  = np.cumsum(sizes)
+        pairs  = pairs[self.prng.grouped_cumulative_choices(np.cumsum(exposure[pairs]),
+                                                            lasts - sizes, lasts)]
+        locations = self.pair_locations[pairs]
+
+        # Choose each infector from those at the same location, in proportion to their
+        # infectiousness and the time they spend there during the day
+        infectious_pairs = np.flatnonzero(infectious > 0)
+        infectious_pairs = infectious_pairs[np.argsort(self.pair_locations[infectious_pairs],
+                                                       kind='stable')]
+        infectious_locations = self.pair_locations[infectious_pairs]
+        infectors = self.pair_rows[infectious_pairs[self.prng.grouped_cumulative_choices(
+                    np.cumsum(infectious[infectious_pairs]),
+                    np.searchsorted(infectious_locations, locations, side='left'),
+                    np.searchsorted(infectious_locations, locations, side='right'))]]
+
+        self._expose(exposed, infectors, locations)
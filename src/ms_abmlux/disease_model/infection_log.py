@@ -0,0 +1,73 @@
+"""Append-only, columnar record of infections"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger("infection_log")
+
+class InfectionLog:
+    """Records infections as rows in growable NumPy arrays, one array per column.
+
+    Rows are only ever appended, so views of rows already written stay valid as the log grows and
+    may be handed to reporters without copying.  Capacity doubles as needed, so appending costs
+    O(1) amortised per row."""
+
+    # Column names and types.  Agents and locations are identified by their index in the world,
+    # strains and location types by their index in the lists reported alongside the log.  An
+    # infector of -1 marks an initial case.
+    COLUMNS = {"tick":          np.int32,
+               "infectee":      np.int32,
+               "infector":      np.int32,
+               "strain":        np.int16,
+               "location":      np.int32,
+               "location_type": np.int16,
+               "infectee_age":  np.int16}
+
+    def __init__(self, initial_capacity: int=1024):
+        self.size    = 0
+        self.columns = {name: np.empty(initial_capacity, dtype=dtype)
+                        for name, dtype in InfectionLog.COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def append(self, tick, infectee, infector, strain, location, location_type, infectee_age):
+        """Append one row per infectee.  Each argument is an array with one entry per row, or a
+        single value to be used for every row."""
+
+        num_rows = len(infectee)
+        if self.size + num_rows > len(self.columns["tick"]):
+            self._grow(self.size + num_rows)
+
+        rows = slice(self.size, self.size + num_rows)
+        self.columns["tick"][rows]          = tick
+        self.columns["infectee"][rows]      = infectee
+        self.columns["infector"][rows]      = infector
+        self.columns["strain"][rows]        = strain
+        self.columns["location"][rows]      = location
+        self.columns["location_type"][rows] = location_type
+        self.columns["infectee_age"][rows]  = infectee_age
+        self.size += num_rows
+
+    def rows(self, start: int=0, stop: int=None) -> dict[str, np.ndarray]:
+        """Return views of the rows given, by column"""
+
+        stop = self.size if stop is None else min(stop, self.size)
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def save(self, filename: str, **metadata) -> None:
+        """Write the log to a .npz file, with any lists given as metadata, e.g. the names
+        of strains and location types"""
+
+        log.info("Writing %i infections to %s", self.size, filename)
+        np.savez_compressed(filename, **self.rows(), **metadata)
+
+    def _grow(self, min_capacity: int) -> None:
+        """Reallocate the columns with at least the capacity given"""
+
+        capacity = max(2 * len(self.columns["tick"]), min_capacity)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
@@ -1,12 +1,17 @@
 """Multi-strain disease model"""
 
 import logging
+import heapq
+import itertools
 from collections import defaultdict
 import numpy as np
 import math
 
 from ms_abmlux.disease_model import DiseaseModel
 from ms_abmlux.disease_model.strain import Strain
+from ms_abmlux.disease_model.infection_log import InfectionLog
+from ms_abmlux.disease_model.transmission import ShardedTransmission, force_of_infection
+from ms_abmlux.random_tools import alias_table
 
 log = logging.getLogger("multi_strain_disease_model")
 
@@ -18,10 +23,11 @@ class MultiStrainDiseaseModel(DiseaseModel):
     def __init__(self, config, world, clock):
         super().__init__(config, config['health_states'])
 
-        # Fundamental health states
-        self.susceptible_state = config['susceptible_state'] # str
-        self.infected_states   = config['infected_states'] # list
-        self.dead_state        = config['dead_state'] # str
+        # Fundamental health states, as represented in health_states
+        self.susceptible_state = self.health_states.as_int(config['susceptible_state']) # int
+        self.infected_states   = [self.health_states.as_int(state)
+                                  for state in config['infected_states']] # list[int]
+        self.dead_state        = self.health_states.as_int(config['dead_state']) # int
 
         # A list of all strains appearing in the model
         self.strains = []
@@ -47,6 +53,11 @@ class MultiStrainDiseaseModel(DiseaseModel):
             self.num_initial_cases[new_strain] =\
                 math.ceil(world.scale_factor * config['strains'][strain]['num_initial_cases'])
 
+        # The infectiousness of agents in each health state, by strain
+        self.transmission_probabilities = np.array(
+            [[strain.transmission_probability[state] if state in strain.transmission_probability
+              else 0.0 for state in self.states] for strain in self.strains])
+
         # Construct mutation matrix
         self.mutation_matrix = defaultdict(dict)
         for strain_1 in self.strains:
@@ -54,6 +65,13 @@ class MultiStrainDiseaseModel(DiseaseModel):
                 self.mutation_matrix[strain_1][strain_2] =\
                     config['mutation_matrix'][strain_1.name][strain_2.name]
 
+        # Alias tables for sampling the strain passed on by an agent infected with each strain,
+        # with one row per source strain
+        tables = [alias_table([self.mutation_matrix[strain_1][strain_2]
+                               for strain_2 in self.strains]) for strain_1 in self.strains]
+        self.mutation_probabilities = np.array([probabilities for probabilities, _ in tables])
+        self.mutation_aliases       = np.array([aliases for _, aliases in tables])
+
         # Construct immunity matrix
         self.immunity_matrix = defaultdict(dict)
         for strain_1 in self.strains:
@@ -66,47 +84,121 @@ class MultiStrainDiseaseModel(DiseaseModel):
         self.reduced_transmission_locations = config['reduced_transmission_locations']
         self.reduced_transmission_factor    = config['reduced_transmission_factor']
 
+        # The factor by which transmission is scaled at each location type
+        self.transmission_factors = defaultdict(lambda: 1.0)
+        for location_type in self.reduced_transmission_locations:
+            self.transmission_factors[location_type] = self.reduced_transmission_factor
+        for location_type in self.no_transmission_locations:
+            self.transmission_factors[location_type] = 0.0
+        if 'transmission_factors' in config:
+            self.transmission_factors.update(config['transmission_factors'])
+        self._validate_transmission_factors()
+
         # A record of who is infected with what
         self.infections = {} # self.infections[agent]: Strain
 
-        # A record of who is immune to what
-        self.immune = defaultdict(dict) # self.immune[agent][strain]: bool
+        # A record of who is immune to what, with one column per strain
+        self.immune = np.zeros((len(world.agents), len(self.strains)), dtype=bool)
 
-        # A record of who loses immunity to what when
-        self.immunity_loss_times = defaultdict(dict) # self.immunity_loss_times[agent][strain]: int
+        # A record of who loses immunity to what when, or -1 if immunity is permanent
+        self.immunity_loss_times = np.full((len(world.agents), len(self.strains)), -1.0)
 
-        # Set initial immunity
-        for agent in world.agents:
-            for strain in self.strains:
-                self.immune[agent][strain] = False
-                self.immunity_loss_times[agent][strain] = -1
+        # Pending immunity losses, as a heap of (tick, sequence number, agent rows, strain column).
+        # Rows whose loss time no longer matches immunity_loss_times have been superseded and are
+        # skipped
+        self.immunity_loss_queue = []
+        self.immunity_loss_count = itertools.count()
+
+        # The probability per tick that each agent infects another at the same location, which
+        # is 0 unless the agent is in an infected state
+        self.infectiousness = np.zeros(len(world.agents))
 
-        # Health state change time
-        self.health_state_change_time   = {}
-        self.transmission_probability   = {}
+        # Agents due to move to their next health state, keyed by tick.  Since durations are drawn
+        # in advance, the tick at which an agent leaves a state is known as soon as it enters it
+        self.progression_events = defaultdict(list) # self.progression_events[t]: list[Agent]
+        self.agent_index        = {agent: i for i, agent in enumerate(world.agents)}
 
         # Initialize health of agents
         for agent in world.agents:
             agent.health = self.susceptible_state
-            self.health_state_change_time[agent] = 0
 
-        # Determine disease pathway and durations
-        self.disease_profile_dict = defaultdict(dict)
-        self.disease_profile_index_dict = {}
-        self.disease_durations_dict = defaultdict(dict)
-        for agent in world.agents:
-            for strain in self.strains:
-                max_age = max(age for age in strain.labelled_profiles_by_age)
-                age_rounded = min((agent.age//strain.step_size)*strain.step_size, max_age)
-                profile = self.prng.multinoulli_dict(strain.labelled_profiles_by_age[age_rounded])
-                durations = self._durations_for_profile(profile, strain, clock)
-                self.disease_profile_dict[agent][strain] = [self.state_for_letter(l) for l in profile]
-                self.disease_durations_dict[agent][strain] = durations
-                self.disease_profile_index_dict[agent] = 0
+        # Disease pathways and durations are drawn when an agent is infected, and kept only for
+        # the agent's current infection.  Each distinct sequence of health states is stored once in
+        # the profile catalogue and referred to by its index.  Durations are whole ticks, with -1
+        # marking phases that have no duration
+        self.clock             = clock
+        self.strain_index      = {strain: i for i, strain in enumerate(self.strains)}
+        self.profile_seed      = np.random.SeedSequence(config['__prng_seed__']
+                                                        if '__prng_seed__' in config else None)\
+                                   .generate_state(1, np.uint64)[0]
+        self.profile_catalogue = [] # self.profile_catalogue[profile_id]: tuple[int]
+        self.profile_ids       = {} # self.profile_ids[tuple[int]]: int
+        self.profile_weights   = {} # self.profile_weights[strain][age]: cumulative weights
+        self.strain_profiles   = {} # self.strain_profiles[strain]: list[(profile_id, durations)]
+        for strain in self.strains:
+            self.strain_profiles[strain] = [(self._intern_profile(label), durations)
+                                            for label, durations
+                                            in strain.durations_by_profile.items()]
+            self.profile_weights[strain] = {age: self._cumulative_weights(weighted_labels, strain)
+                                            for age, weighted_labels
+                                            in strain.labelled_profiles_by_age.items()}
+        max_phases = max(len(label) for strain in self.strains
+                         for label in strain.durations_by_profile)
+        self.disease_profiles  = np.zeros(len(world.agents), dtype=np.uint16)
+        self.disease_durations = np.full((len(world.agents), max_phases), -1, dtype=np.int32)
+        self.disease_phases    = np.zeros(len(world.agents), dtype=np.int8)
 
         # Resident region
         self.region = config['region']
 
+        # Where to save the record of infections at the end of the simulation, if anywhere
+        self.infection_log_filename = config['infection_log_filename'] \
+                                      if 'infection_log_filename' in config else None
+
+        # Optionally, transmission is computed for fixed shards of locations, each with a random
+        # stream of its own, in a pool of worker processes if any are configured
+        self.transmission_shards  = config['transmission_shards'] \
+                                    if 'transmission_shards' in config else None
+        self.transmission_workers = config['transmission_workers'] \
+                                    if 'transmission_workers' in config else 0
+        self.transmission_seed    = config['__prng_seed__'] if '__prng_seed__' in config else None
+        self.transmission         = None
+
+        # Location types, such as houses, at which transmission among residents is computed for
+        # all locations of the type in one block.  Sharded transmission handles every location
+        # individually, so the two cannot be combined
+        self.household_location_types = config['household_location_types'] \
+                                        if 'household_location_types' in config else []
+        if self.transmission_shards is not None and len(self.household_location_types) > 0:
+            raise ValueError("household_location_types cannot be combined with "
+                             "transmission_shards")
+
+        # Occupancy above which the probability of infection at a location, other than a
+        # household, is approximated from the total infectiousness present.  Shards compute the
+        # exact probability everywhere, so the two cannot be combined
+        self.mean_field_threshold = config['mean_field_threshold'] \
+                                    if 'mean_field_threshold' in config else None
+        if self.transmission_shards is not None and self.mean_field_threshold is not None:
+            raise ValueError("mean_field_threshold cannot be combined with transmission_shards")
+
+    def _validate_transmission_factors(self):
+        """Raises ValueError unless the probability of transmission by an agent of each strain, in
+        any state and at any location type, scaled by the location type's factor, lies in [0, 1).
+        Location types without a factor given have a factor of 1."""
+
+        for strain, probabilities in zip(self.strains, self.transmission_probabilities):
+            if probabilities.min() < 0 or probabilities.max() >= 1:
+                raise ValueError(f"Transmission probabilities of strain {strain.name} must lie "
+                                 f"in [0, 1)")
+            for location_type, factor in self.transmission_factors.items():
+                if factor < 0:
+                    raise ValueError(f"Transmission factor of location type {location_type} "
+                                     f"must not be negative")
+                if factor * probabilities.max() >= 1:
+                    raise ValueError(f"Transmission factor {factor} of location type "
+                                     f"{location_type} scales the transmission probability of "
+                                     f"strain {strain.name} to 1 or more")
+
     def init_sim(self, sim):
         super().init_sim(sim)
 
@@ -114,16 +206,67 @@ class MultiStrainDiseaseModel(DiseaseModel):
         self.world = sim.world
 
         self.bus.subscribe("notify.time.tick", self.get_health_transitions, self)
-        self.bus.subscribe("notify.agent.health", self.update_health_state_change_time, self)
+        self.bus.subscribe("notify.agent.health", self.update_health_state, self)
+        self.bus.subscribe("notify.agent.location", self.update_location, self)
         self.bus.subscribe("request.agent.gain_immunity", self._gain_immunity, self)
+        self.bus.subscribe("request.agents.gain_immunity", self._gain_immunity_bulk, self)
+        self.bus.subscribe("notify.time.end_simulation", self.save_infection_log, self)
+        self.bus.subscribe("notify.time.end_simulation", self.stop_transmission, self)
+
+        # Each agent's current location, as an index into the world's locations, and the factor
+        # by which transmission is scaled at each location
+        self.locations       = self.world.locations
+        self.location_index  = {location: i for i, location in enumerate(self.locations)}
+        self.agent_locations = np.array([self.location_index[a.current_location]
+                                         for a in self.world.agents], dtype=np.intp)
+        self.location_factors = np.array([self.transmission_factors[l.typ] for l in self.locations])
+
+        # The residents of households, as assigned by the housing model, in compressed sparse row
+        # form: the rows of residents of the location with index l are household_residents[
+        # household_indptr[l]:household_indptr[l + 1]].  Households with visitors present are left
+        # to the general transmission path
+        households = [l for l in self.locations if l.typ in self.household_location_types]
+        occupants  = sim.housing_model.occupants if len(households) > 0 else {}
+        self.household_residents = np.array([self.agent_index[a] for l in households
+                                             for a in occupants[l]], dtype=np.intp)
+        num_residents = np.zeros(len(self.locations), dtype=np.intp)
+        num_residents[[self.location_index[l] for l in households]] = \
+            [len(occupants[l]) for l in households]
+        self.household_indptr = np.concatenate([[0], np.cumsum(num_residents)])
+        self.is_household     = num_residents > 0
+        self.agent_households = np.full(len(self.world.agents), -1, dtype=np.intp)
+        self.agent_households[self.household_residents] = \
+            np.repeat(np.arange(len(self.locations)), num_residents)
+        visitors = self.is_household[self.agent_locations] \
+                   & (self.agent_locations != self.agent_households)
+        self.visitor_counts = np.bincount(self.agent_locations[visitors],
+                                          minlength=len(self.locations))
+
+        # Whether each health state is an infected state
+        self.infected_codes = np.isin(self.health_states.types_as_int(), self.infected_states)
 
         # Report list of strains to telemetry bus
         self.report("strains.list", [strain.name for strain in self.strains])
 
+        # A record of every infection, with location types coded as in the world's registry
+        self.infection_log       = InfectionLog()
+        self.infections_reported = 0
+        self.location_types      = self.world.location_types.types_as_str()
+        self.location_type_codes = np.array([l.typ_int for l in self.locations], dtype=np.int16)
+        self.agent_ages          = np.array([a.age for a in self.world.agents], dtype=np.int16)
+        self.report("infection_log.initial", [strain.name for strain in self.strains],
+                    self.location_types, [a.uuid for a in self.world.agents], self.agent_ages,
+                    [l.coord for l in self.locations])
+
         # A record of cumulative cases by strain
         self.cumulative_cases_by_strain          = {strain: 0 for strain in self.strains}
         self.cumulative_resident_cases_by_strain = {strain: 0 for strain in self.strains}
 
+        # The number of agents currently in an infected state, by strain.  Maintained as agents
+        # enter and leave infected states, rather than counted every tick
+        self.infected_counts_by_strain          = {strain: 0 for strain in self.strains}
+        self.resident_infected_counts_by_strain = {strain: 0 for strain in self.strains}
+
         # The total number of initial infections
         total_num_initial_cases = sum([self.num_initial_cases[strain] for strain in self.strains])
 
@@ -136,35 +279,63 @@ class MultiStrainDiseaseModel(DiseaseModel):
         for strain in self.strains:
             initial_cases = self.prng.random_sample(total_initial_cases,
                                                     self.num_initial_cases[strain])
+            infected_rows = []
             for agent in initial_cases:
                 # Check for immunity
-                if self.immune[agent][strain]:
+                if self.immune[self.agent_index[agent], self.strain_index[strain]]:
                     continue
+                infected_rows.append(self.agent_index[agent])
                 # Infect agent with strain
                 self.infections[agent] = strain
                 self.cumulative_cases_by_strain[strain] += 1
                 if agent.region == self.region:
                     self.cumulative_resident_cases_by_strain[strain] += 1
                 # Update health state
-                self.disease_profile_index_dict[agent] = 2
-                new_health = self.disease_profile_dict[agent][strain][2]
-                self.transmission_probability[agent] = strain.transmission_probability[new_health]
+                self._assign_profile(agent, strain)
+                self.disease_phases[self.agent_index[agent]] = 2
+                new_health = self._profile(agent)[2]
+                self.infectiousness[self.agent_index[agent]] = \
+                    self.transmission_probabilities[self.strain_index[strain], new_health]
                 agent.health = new_health
+                if self.infected_codes[new_health]:
+                    self._count_infected(agent, strain, 1)
+                self._schedule_progression(agent, 0)
                 total_initial_cases.remove(agent)
+            self._log_infections(np.array(infected_rows, dtype=np.intp), -1,
+                                 self.strain_index[strain])
+
+        # Each agent's health code, and the number of susceptible agents at each location
+        self.health_codes = np.array([a.health for a in self.world.agents],
+                                     dtype=np.int8)
+        self.susceptible_counts = np.bincount(
+            self.agent_locations[self.health_codes == self.susceptible_state],
+            minlength=len(self.locations))
+
+        # The number of agents at each location, and the number and total infectiousness of those
+        # who are infectious, maintained as agents move and their infectiousness changes
+        self.occupancy           = np.bincount(self.agent_locations, minlength=len(self.locations))
+        self.infectious_counts   = np.bincount(self.agent_locations[self.infectiousness > 0],
+                                               minlength=len(self.locations))
+        self.infectiousness_sums = np.bincount(self.agent_locations, weights=self.infectiousness,
+                                               minlength=len(self.locations))
+
+        # Move the state read by sharded transmission into shared memory if there are workers
+        if self.transmission_shards is not None:
+            self.transmission = ShardedTransmission(self.transmission_shards,
+                                                    self.transmission_workers,
+                                                    self.transmission_seed, self.agent_locations,
+                                                    self.health_codes, self.infectiousness,
+                                                    self.location_factors, self.susceptible_state)
+            self.agent_locations = self.transmission.agent_locations
+            self.health_codes    = self.transmission.health_codes
+            self.infectiousness  = self.transmission.infectiousness
 
     def get_health_transitions(self, clock, t):
         """Updates the health state of agents"""
 
         # Report counts to telemetry bus
-        counts = {strain: 0 for strain in self.strains}
-        resident_counts = {strain: 0 for strain in self.strains}
-        for agent in self.world.agents:
-            if agent.health in self.infected_states:
-                counts[self.infections[agent]] += 1
-                if agent.region == self.region:
-                    resident_counts[self.infections[agent]] += 1
-        row = [counts[strain] for strain in self.strains]\
-              + [resident_counts[strain] for strain in self.strains]
+        row = [self.infected_counts_by_strain[strain] for strain in self.strains]\
+              + [self.resident_infected_counts_by_strain[strain] for strain in self.strains]
         self.report("strain_counts.update", clock, row)
 
         # Report cumulative cases to telemetry bus
@@ -173,70 +344,233 @@ class MultiStrainDiseaseModel(DiseaseModel):
         self.report("cumulative_cases_by_strain.update", clock, row)
 
         # Determine which suceptible agents are infected during this tick
-        for location in self.sim.world.locations:
-            if location.typ not in self.no_transmission_locations:
-                infected_lists  = [self.sim.attendees_by_health[location][h]
-                                   for h in self.infected_states]
-                infected = [sym for sym_list in infected_lists for sym in sym_list]
-                if len(infected) > 0:
-                    if location.typ in self.reduced_transmission_locations:
-                        r_t_f = self.reduced_transmission_factor
-                    else:
-                        r_t_f = 1
-                    probability = 1 - np.prod([1 - (r_t_f * self.transmission_probability[a])
-                                               for a in infected])
-                    susceptibles = self.sim.attendees_by_health[location][self.susceptible_state]
-                    num_new_exposures = self.prng.binomial(len(susceptibles), probability)
-                    if num_new_exposures > 0:
-                        new_exposures = self.prng.random_sample(susceptibles, num_new_exposures)
-                        weights = [self.transmission_probability[a] for a in infected]
-                        # Loop through new exposures and request health state updates
-                        for agent in new_exposures:
-                            infector = self.prng.random_choices(infected, weights, 1)[0]
-                            strain = self.infections[infector]
-                            self._infect(agent, strain, clock)
-
-        # Determine which other agents need moving to their next health state
-        for agent in self.world.agents:
-            for strain in self.strains:
-                if self.immunity_loss_times[agent][strain] == t:
-                    self._lose_immunity(agent, strain)
-            if agent.health in self.infected_states:
-                duration_ticks = self.disease_durations_dict[agent][self.infections[agent]]\
-                                 [self.disease_profile_index_dict[agent]]
-                if duration_ticks is not None:
-                    time_since_state_change = t - self.health_state_change_time[agent]
-                    if time_since_state_change > duration_ticks:
-                        new_health = self.disease_profile_dict[agent][self.infections[agent]]\
-                                     [self.disease_profile_index_dict[agent] + 1]
-                        self.bus.publish("request.agent.health", agent, new_health)
-
-    def update_health_state_change_time(self, agent, old_health):
-        """Update internal counts."""
-
-        self.health_state_change_time[agent] = self.sim.clock.t
+        self._transmit()
+
+        # Report infections recorded since the last tick
+        if len(self.infection_log) > self.infections_reported:
+            self.report("infection_log.update", clock,
+                        self.infection_log.rows(self.infections_reported))
+            self.infections_reported = len(self.infection_log)
+
+        # Determine which agents lose immunity
+        self._process_immunity_loss(t)
+
+        # Move agents whose current state has run its course to their next health state.  Requests
+        # are published in world order, so that the simulator enacts them deterministically
+        due_agents = self.progression_events.pop(t, [])
+        due_agents.sort(key=self.agent_index.__getitem__)
+        for agent in due_agents:
+            new_health = self._profile(agent)[self.disease_phases[self.agent_index[agent]] + 1]
+            self.bus.publish("request.agent.health", agent, new_health)
+
+    def update_location(self, agent, old_location):
+        """Track the location of agents"""
+
+        row = self.agent_index[agent]
+        new_location = self.location_index[agent.current_location]
+        if self.health_codes[row] == self.susceptible_state:
+            self.susceptible_counts[self.agent_locations[row]] -= 1
+            self.susceptible_counts[new_location] += 1
+        for location, change in ((self.agent_locations[row], -1), (new_location, 1)):
+            if self.is_household[location] and self.agent_households[row] != location:
+                self.visitor_counts[location] += change
+            self.occupancy[location] += change
+            if self.infectiousness[row] > 0:
+                self.infectious_counts[location]   += change
+                self.infectiousness_sums[location] += change * self.infectiousness[row]
+        if self.transmission is not None:
+            self.transmission.move(row, self.agent_locations[row], new_location)
+        self.agent_locations[row] = new_location
+
+    def update_health_state(self, agent, old_health):
+        """Update internal counts and schedule the agent's next change of health."""
 
         strain = self.infections[agent]
 
+        # Keep the health codes and counts in step with the change just enacted
+        row = self.agent_index[agent]
+        old_code, new_code = self.health_codes[row], agent.health
+        self.health_codes[row] = new_code
+        if (old_code == self.susceptible_state) != (new_code == self.susceptible_state):
+            self.susceptible_counts[self.agent_locations[row]] += \
+                1 if new_code == self.susceptible_state else -1
+        if self.infected_codes[old_code] != self.infected_codes[new_code]:
+            self._count_infected(agent, strain, 1 if self.infected_codes[new_code] else -1)
+
         if agent.health == self.susceptible_state:
-            immunity_duration = self.disease_durations_dict[agent][self.infections[agent]][-1]
-            self._recover(agent, strain, immunity_duration)
+            immunity_phase = len(self._profile(agent)) - 1
+            self._recover(agent, strain, self._duration(agent, immunity_phase))
         elif agent.health == self.dead_state:
             self._die(agent)
         else:
             self._next_state(agent, strain, agent.health)
 
-    def _infect(self, agent, strain, clock):
-        """Infects an agent"""
-
-        # Mutate the strain
-        weights = [self.mutation_matrix[strain][s] for s in self.strains]
-        strain = self.prng.random_choices(self.strains, weights, 1)[0]
+    def _transmit(self):
+        """Determines which susceptible agents are infected during this tick"""
 
-        # Check agent immunity
-        if self.immune[agent][strain]:
+        if self.transmission is not None:
+            self._expose(*self.transmission.transmit())
             return
 
+        # Households without visitors are handled in one block, and other locations one by one
+        infectious = np.flatnonzero(self.infectiousness > 0)
+        exposed_rows, infector_rows = [], []
+        if len(self.household_residents) > 0:
+            blocked = self.is_household[self.agent_locations[infectious]] \
+                      & (self.visitor_counts[self.agent_locations[infectious]] == 0)
+            exposed, infectors = self._transmit_households(infectious[blocked])
+            exposed_rows.append(exposed)
+            infector_rows.append(infectors)
+            infectious = infectious[~blocked]
+        if self.mean_field_threshold is not None:
+            mean_field = (self.occupancy > self.mean_field_threshold) & ~self.is_household
+            exposed, infectors = self._transmit_mean_field(
+                np.flatnonzero(mean_field & (self.infectious_counts > 0)))
+            exposed_rows.append(exposed)
+            infector_rows.append(infectors)
+            infectious = infectious[~mean_field[self.agent_locations[infectious]]]
+
+        present, probabilities, infectious, starts = force_of_infection(
+            infectious, self.agent_locations, self.infectiousness, self.location_factors)
+        num_new_exposures = self.prng.binomial(self.susceptible_counts[present], probabilities)
+
+        # Draw the agents exposed at each location and the infector of each, in proportion to
+        # their infectiousness
+        ends = np.append(starts[1:], len(infectious))
+        for i in np.flatnonzero(num_new_exposures):
+            susceptibles   = self.sim.attendees_by_health[self.locations[present[i]]]\
+                                                     [self.susceptible_state]
+            exposed_rows.append(np.array([self.agent_index[a] for a in self.prng.random_sample(
+                                          susceptibles, num_new_exposures[i])], dtype=np.intp))
+            infectors = infectious[starts[i]:ends[i]]
+            infectors = infectors[self.prng.cumulative_choices(
+                                  np.cumsum(self.infectiousness[infectors]), num_new_exposures[i])]
+            infector_rows.append(infectors)
+
+        if len(infector_rows) > 0:
+            self._expose(np.concatenate(exposed_rows), np.concatenate(infector_rows))
+
+    def _transmit_households(self, infectious):
+        """Determines which agents are infected during this tick in the households of the
+        infectious agents given, which have no visitors present, with one binomial draw for all
+        households.  Returns the rows of the agents exposed and of the agent infecting each, chosen
+        in proportion to their infectiousness."""
+
+        present, probabilities, infectious, starts = force_of_infection(
+            infectious, self.agent_locations, self.infectiousness, self.location_factors)
+        num_new_exposures = np.zeros(len(self.locations), dtype=np.intp)
+        num_new_exposures[present] = self.prng.binomial(self.susceptible_counts[present],
+                                                        probabilities)
+
+        # Gather the residents of households with exposures, and sample those exposed from the
+        # susceptible residents at home
+        households = present[num_new_exposures[present] > 0]
+        firsts     = self.household_indptr[households]
+        sizes      = self.household_indptr[households + 1] - firsts
+        residents  = self.household_residents[np.repeat(firsts - np.cumsum(sizes) + sizes, sizes)
+                                              + np.arange(sizes.sum())]
+        susceptible = residents[(self.health_codes[residents] == self.susceptible_state)
+                                & (self.agent_locations[residents]
+                                   == self.agent_households[residents])]
+        exposed = susceptible[self.prng.grouped_sample(self.agent_locations[susceptible],
+                                                       num_new_exposures)]
+
+        # Choose each infector from the infectious agents in the same household
+        locations = self.agent_locations[infectious]
+        exposed_households = self.agent_locations[exposed]
+        infectors = infectious[self.prng.grouped_cumulative_choices(
+                    np.cumsum(self.infectiousness[infectious]),
+                    np.searchsorted(locations, exposed_households, side='left'),
+                    np.searchsorted(locations, exposed_households, side='right'))]
+
+        return exposed, infectors
+
+    def _transmit_mean_field(self, locations):
+        """Determines which agents are infected during this tick at the locations given, taking
+        the probability of escaping infection to be exp(-f P), where P is the total infectiousness
+        present and f the transmission factor of the location.  Since 1 - f p <= exp(-f p), this
+        slightly overestimates the exact probability of escape, the product of 1 - f p over
+        infectious agents, but takes no work in proportion to the number of agents present.
+        Infectors are only sought at locations with exposures.  Returns the rows of the agents
+        exposed and of the agent infecting each."""
+
+        probabilities = -np.expm1(-self.location_factors[locations]
+                                  * self.infectiousness_sums[locations])
+        num_new_exposures = self.prng.binomial(self.susceptible_counts[locations], probabilities)
+
+        exposed_rows, infector_rows = [np.zeros(0, dtype=np.intp)], [np.zeros(0, dtype=np.intp)]
+        for i in np.flatnonzero(num_new_exposures):
+            attendees = self.sim.attendees_by_health[self.locations[locations[i]]]
+            exposed_rows.append(np.array([self.agent_index[a] for a in self.prng.random_sample(
+                                          attendees[self.susceptible_state], num_new_exposures[i])],
+                                         dtype=np.intp))
+            infectors = np.array([self.agent_index[a] for state in self.infected_states
+                                  for a in attendees[state]], dtype=np.intp)
+            infectors = infectors[self.infectiousness[infectors] > 0]
+            infector_rows.append(infectors[self.prng.cumulative_choices(
+                                 np.cumsum(self.infectiousness[infectors]), num_new_exposures[i])])
+
+        return np.concatenate(exposed_rows), np.concatenate(infector_rows)
+
+    def _expose(self, rows, infectors, locations=None):
+        """Infects the agents with the rows given with the strains of the infectors given, which
+        are mutated in one draw, unless they are immune to the strain they receive.  Infections
+        are recorded at the locations given, or by default at the agents' current locations"""
+
+        infector_strains = [self.strain_index[self.infections[self.world.agents[infector]]]
+                            for infector in infectors]
+        strains  = self._mutate_all(np.array(infector_strains, dtype=np.intp))
+        infected = ~self.immune[rows, strains]
+        for row, strain in zip(rows[infected], strains[infected]):
+            self._start_infection(self.world.agents[row], self.strains[strain])
+        self._log_infections(rows[infected], infectors[infected], strains[infected],
+                             None if locations is None else locations[infected])
+
+    def _log_infections(self, infectees, infectors, strains, locations=None):
+        """Records infections of the agents with the rows given, at the location indices given or
+        by default at the agents' current locations"""
+
+        if locations is None:
+            locations = self.agent_locations[infectees]
+        self.infection_log.append(self.sim.clock.t, infectees, infectors, strains, locations,
+                                  self.location_type_codes[locations], self.agent_ages[infectees])
+
+    def save_infection_log(self, sim):
+        """Writes the record of infections to disk, if a filename has been configured"""
+
+        if self.infection_log_filename is not None:
+            self.infection_log.save(self.infection_log_filename,
+                                    strains=[strain.name for strain in self.strains],
+                                    location_types=self.location_types)
+
+    def stop_transmission(self, sim):
+        """Stops any transmission workers, first moving the state they read out of shared
+        memory"""
+
+        if self.transmission is not None:
+            self.agent_locations = self.agent_locations.copy()
+            self.health_codes    = self.health_codes.copy()
+            self.infectiousness  = self.infectiousness.copy()
+            self.transmission.close()
+            self.transmission = None
+
+    def _count_infected(self, agent, strain, change):
+        """Adjusts the number of agents infected with the strain given"""
+
+        self.infected_counts_by_strain[strain] += change
+        if agent.region == self.region:
+            self.resident_infected_counts_by_strain[strain] += change
+
+    def _mutate_all(self, strains):
+        """Returns the indices of the strains passed on by agents infected with the strains whose
+        indices are given"""
+
+        return self.prng.alias_choices(self.mutation_probabilities[strains],
+                                       self.mutation_aliases[strains])
+
+    def _start_infection(self, agent, strain):
+        """Infects a susceptible agent who is not immune to the strain"""
+
         # Infect agent with strain
         self.infections[agent] = strain
         self.cumulative_cases_by_strain[strain] += 1
@@ -244,15 +578,133 @@ class MultiStrainDiseaseModel(DiseaseModel):
             self.cumulative_resident_cases_by_strain[strain] += 1
 
         # Publish health state transition request
-        new_health = self.disease_profile_dict[agent][self.infections[agent]][1]
+        self._assign_profile(agent, strain)
+        new_health = self._profile(agent)[1]
         self.bus.publish("request.agent.health", agent, new_health)
 
     def _next_state(self, agent, strain, new_health):
         """Responds to new infected state of agent"""
 
         # Move agent health to next state
-        self.disease_profile_index_dict[agent] += 1
-        self.transmission_probability[agent] = strain.transmission_probability[new_health]
+        self.disease_phases[self.agent_index[agent]] += 1
+        self._set_infectiousness(self.agent_index[agent],
+                                 self.transmission_probabilities[self.strain_index[strain],
+                                                                 new_health])
+        self._schedule_progression(agent, self.sim.clock.t)
+
+    def _set_infectiousness(self, row, infectiousness):
+        """Sets the infectiousness of the agent with the row given, keeping the totals at the
+        agent's location in step"""
+
+        location = self.agent_locations[row]
+        self.infectious_counts[location]   += int(infectiousness > 0) \
+                                              - int(self.infectiousness[row] > 0)
+        self.infectiousness_sums[location] += infectiousness - self.infectiousness[row]
+        self.infectiousness[row] = infectiousness
+
+    def _schedule_progression(self, agent, state_start_tick):
+        """Schedules the agent to leave its current state once its duration has elapsed.
+
+        An agent leaves a state at the first tick t for which t - state_start_tick exceeds the
+        duration of that state.  States with no duration are left only through other means."""
+
+        duration_ticks = self._duration(agent, self.disease_phases[self.agent_index[agent]])
+        if duration_ticks is not None:
+            due_tick = state_start_tick + duration_ticks + 1
+            self.progression_events[due_tick].append(agent)
+
+    def _profile(self, agent):
+        """Returns the health states the agent passes through during its current infection"""
+
+        return self.profile_catalogue[self.disease_profiles[self.agent_index[agent]]]
+
+    def _duration(self, agent, phase):
+        """Returns the number of ticks the agent spends in a phase of its current infection, or
+        None if the phase lasts indefinitely"""
+
+        duration = self.disease_durations[self.agent_index[agent], phase]
+        return None if duration < 0 else int(duration)
+
+    def _assign_profile(self, agent, strain):
+        """Draws the profile and durations for the agent's infection with the strain"""
+
+        profile_id, durations = self._sample_profile(agent, strain)
+        row = self.agent_index[agent]
+        self.disease_profiles[row]  = profile_id
+        self.disease_durations[row] = -1
+        self.disease_durations[row, :len(durations)] = [-1 if d is None else d for d in durations]
+
+    def _sample_profile(self, agent, strain):
+        """Draws the agent's disease profile and phase durations, in ticks, for the strain.
+
+        Draws are made by a Philox counter-based generator whose key is the model's seed together
+        with the agent's index in the world and the strain's index in the config.  The same
+        profile is therefore drawn for an agent and strain whenever the draw is made, and however
+        many other strains are modelled.  Returns the catalogue id of the profile and its
+        durations, with None for phases having no duration."""
+
+        stream = (self.agent_index[agent] << 32) | self.strain_index[strain]
+        key    = np.array([self.profile_seed, stream], dtype=np.uint64)
+        rng = np.random.Generator(np.random.Philox(key=key))
+
+        max_age     = max(self.profile_weights[strain])
+        age_rounded = min((agent.age // strain.step_size) * strain.step_size, max_age)
+        cumulative_weights = self.profile_weights[strain][age_rounded]
+        profile = np.searchsorted(cumulative_weights, rng.random() * cumulative_weights[-1],
+                                  side='right')
+
+        profile_id, distributions = self.strain_profiles[strain][profile]
+        return profile_id, self._durations_to_ticks([self._draw_duration(dist, rng)
+                                                     for dist in distributions], rng)
+
+    def _durations_to_ticks(self, durations, rng):
+        """Converts durations in days to whole ticks, rounding down, keeping None for phases
+        having no duration"""
+
+        return [None if duration is None else math.floor(self.clock.days_to_ticks(duration))
+                for duration in durations]
+
+    def _draw_duration(self, dist, rng):
+        """Draws a duration, in days, from a distribution given in the config.  Returns None if the
+        phase has no duration"""
+
+        if dist == 'None':
+            return None
+        if dist[0] == 'G':
+            dur_days = rng.gamma(float(dist[1][0]), float(dist[1][1]))
+        elif dist[0] == 'U':
+            dur_days = rng.integers(int(dist[1][0]), int(dist[1][1]))
+        elif dist[0] == 'C':
+            dur_days = float(dist[1][0])
+        elif dist[0] == 'E':
+            dur_days = rng.exponential(float(dist[1][0]))
+        else:
+            raise ValueError(f"Unknown duration distribution: {dist}")
+        return dur_days
+
+    @staticmethod
+    def _cumulative_weights(weighted_labels, strain):
+        """Returns the cumulative weights of a strain's profiles, in the order of
+        durations_by_profile, from a dict of weights by profile label"""
+
+        weights = np.array([weighted_labels.get(label, 0)
+                            for label in strain.durations_by_profile], dtype=float)
+        if weights.sum() == 0:
+            log.warning("All profiles have 0 weight, choosing flat weights instead")
+            weights = np.ones(len(weights))
+        return np.cumsum(weights)
+
+    def _intern_profile(self, label):
+        """Returns the catalogue id of the profile given by a string of state letters, adding it to
+        the catalogue if it is not yet present"""
+
+        states = tuple(self.health_states.as_int(self.state_for_letter(l)) for l in label)
+        if states not in self.profile_ids:
+            if len(self.profile_catalogue) > np.iinfo(np.uint16).max:
+                raise ValueError("Too many distinct disease profiles")
+            self.profile_ids[states] = len(self.profile_catalogue)
+            self.profile_catalogue.append(states)
+        return self.profile_ids[states]
 
     def _recover(self, agent, strain, immunity_duration):
         """Responds to recovery of agent"""
@@ -263,9 +715,9 @@ class MultiStrainDiseaseModel(DiseaseModel):
         # Remove strain from agent
         self.infections[agent] = None
 
-        # Reset index
-        self.disease_profile_index_dict[agent] = None
-        self.transmission_probability[agent] = None
+        # Reset phase, so that the agent can be infected with another strain
+        self.disease_phases[self.agent_index[agent]] = 0
+        self._set_infectiousness(self.agent_index[agent], 0)
 
     def _die(self, agent):
         """Responds to death of agent"""
@@ -273,49 +725,49 @@ class MultiStrainDiseaseModel(DiseaseModel):
         # Remove strain from agent
         self.infections[agent] = None
 
-        # Reset index
-        self.disease_profile_index_dict[agent] = None
-        self.transmission_probability[agent] = None
+        # Reset phase
+        self.disease_phases[self.agent_index[agent]] = 0
+        self._set_infectiousness(self.agent_index[agent], 0)
 
     def _gain_immunity(self, agent, strains, duration):
         """Agent gains immunity to this and possibly other strains"""
 
-        # Add agent immunity
+        self._gain_immunity_bulk([agent], strains, duration)
+
+    def _gain_immunity_bulk(self, agents, strains, duration):
+        """Agents gain immunity to these and possibly other strains.
+
+        For each strain given, each agent independently gains immunity to every other strain
+        with the probability given by the immunity matrix.  Immunity is lost after the duration
+        given, in ticks, or never if the duration is None."""
+
+        rows = np.fromiter((self.agent_index[a] for a in agents), dtype=np.intp, count=len(agents))
         for strain in strains:
             if isinstance(strain, str):
                 strain = self.strains_by_name[strain]
             for other_strain in self.strains:
-                if self.prng.boolean(self.immunity_matrix[strain][other_strain]):
-                    self.immune[agent][other_strain] = True
-                    if duration is not None:
-                        self.immunity_loss_times[agent][other_strain] = self.sim.clock.t + duration
-                    else:
-                        self.immunity_loss_times[agent][other_strain] = -1
-
-    def _lose_immunity(self, agent, strain):
-        """Agent loses immunity to this and possibly other strains"""
-
-        # Remove agent immunity
-        self.immune[agent][strain] = False
-        self.immunity_loss_times[agent][strain] = -1
-
-    def _durations_for_profile(self, profile, strain, clock):
-        """Assigns durations for each phase in a given profile"""
-
-        durations = []
-        for i in range(len(strain.durations_by_profile[profile])):
-            dist = strain.durations_by_profile[profile][i]
-            if dist == 'None':
-                durations.append(None)
-            if isinstance(dist,list):
-                if dist[0] == 'G':
-                    dur_days = self.prng.gammavariate(float(dist[1][0]), float(dist[1][1]))
-                if dist[0] == 'U':
-                    dur_days = self.prng.random_choice(list(range(int(dist[1][0]),
-                                                                   int(dist[1][1]))))
-                if dist[0] == 'C':
-                    dur_days = float(dist[1][0])
-                if dist[0] == 'E':
-                    dur_days = self.prng.expovariate(1/float(dist[1][0]))
-                durations.append(clock.days_to_ticks(dur_days))
-        return durations
+                col = self.strain_index[other_strain]
+                gained = rows[self.prng.booleans(self.immunity_matrix[strain][other_strain],
+                                                 len(rows))]
+                self.immune[gained, col] = True
+                if duration is not None:
+                    loss_time = self.sim.clock.t + duration
+                    self.immunity_loss_times[gained, col] = loss_time
+                    if len(gained) > 0:
+                        heapq.heappush(self.immunity_loss_queue, (loss_time,
+                                       next(self.immunity_loss_count), gained, col))
+                else:
+                    self.immunity_loss_times[gained, col] = -1
+
+    def _process_immunity_loss(self, t):
+        """Removes immunity from agents whose immunity expires at or before tick t.
+
+        Renewing immunity leaves the old entry in the queue, so entries are only acted upon for
+        agents whose current loss time still matches."""
+
+        queue = self.immunity_loss_queue
+        while queue and queue[0][0] <= t:
+            loss_time, _, rows, col = heapq.heappop(queue)
+            expired = rows[self.immunity_loss_times[rows, col] == loss_time]
+            self.immune[expired, col] = False
+            self.immunity_loss_times[expired, col] = -1
@@ -0,0 +1,231 @@
+"""Transmission of infection between agents sharing a location.
+
+Transmission at each location depends only on the agents present there, so locations may be split
+into shards and each shard's transmission computed independently.  ShardedTransmission does so
+with a separate random stream for each shard, optionally in a pool of worker processes which read
+agents' state from shared memory.  The agents at each shard's locations are kept partitioned by
+shard as they move, so that each shard only reads the state of its own agents."""
+
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+log = logging.getLogger("transmission")
+
+def force_of_infection(infectious, agent_locations, infectiousness, location_factors):
+    """Returns the probability that a susceptible agent is infected this tick at each location
+    with infectious agents present.
+
+    The probability of escaping infection at a location is the product of 1 - f p over the
+    infectious agents present, where p is each agent's infectiousness and f the transmission
+    factor of the location.  This is computed for all locations at once by summing log(1 - f p)
+    over the infectious agents, sorted by location.  Returns the location indices, the
+    probabilities, the infectious agents' rows sorted by location, and the offset of each
+    location's first agent in those rows."""
+
+    infectious = infectious[location_factors[agent_locations[infectious]] > 0]
+    infectious = infectious[np.argsort(agent_locations[infectious], kind='stable')]
+    locations  = agent_locations[infectious]
+
+    starts = np.flatnonzero(np.diff(locations, prepend=-1))
+    log_escape = np.log1p(-location_factors[locations] * infectiousness[infectious])
+    probabilities = -np.expm1(np.add.reduceat(log_escape, starts)) if len(starts) > 0 \
+                    else np.zeros(0)
+
+    return locations[starts], probabilities, infectious, starts
+
+def transmit_shard(rng, first_location, last_location, agents, agent_locations, health_codes,
+                   infectiousness, location_factors, susceptible_code):
+    """Determines which susceptible agents are infected this tick at the locations with indices
+    from first_location up to, but not including, last_location, which are those of the agents
+    with the rows given, in any order.
+
+    Returns the rows of the agents exposed and of the agent infecting each, who is chosen in
+    proportion to their infectiousness.  All random numbers are drawn from the generator given,
+    in an order that depends only on the state of agents in the shard."""
+
+    infectious = np.sort(agents[infectiousness[agents] > 0])
+    present, probabilities, infectious, starts = force_of_infection(infectious, agent_locations,
+                                                                    infectiousness,
+                                                                    location_factors)
+
+    # Susceptible agents sorted by location, and the offset of each location's first agent
+    susceptible = np.sort(agents[health_codes[agents] == susceptible_code])
+    susceptible = susceptible[np.argsort(agent_locations[susceptible], kind='stable')]
+    susceptible_counts  = np.bincount(agent_locations[susceptible] - first_location,
+                                      minlength=last_location - first_location)
+    susceptible_starts  = np.cumsum(susceptible_counts) - susceptible_counts
+
+    num_new_exposures = rng.binomial(susceptible_counts[present - first_location], probabilities)
+
+    new_exposures, infectors = [np.zeros(0, dtype=np.intp)], [np.zeros(0, dtype=np.intp)]
+    ends = np.append(starts[1:], len(infectious))
+    for i in np.flatnonzero(num_new_exposures):
+        location   = present[i] - first_location
+        candidates = susceptible[susceptible_starts[location]:
+                                 susceptible_starts[location] + susceptible_counts[location]]
+        new_exposures.append(rng.choice(candidates, num_new_exposures[i], replace=False))
+        present_infectious = infectious[starts[i]:ends[i]]
+        cum_weights = np.cumsum(infectiousness[present_infectious])
+        infectors.append(present_infectious[np.searchsorted(
+                         cum_weights, rng.random(num_new_exposures[i]) * cum_weights[-1],
+                         side='right')])
+
+    return np.concatenate(new_exposures), np.concatenate(infectors)
+
+class ShardedTransmission:
+    """Computes transmission for fixed shards of contiguous locations, each with its own random
+    stream spawned from the seed given.
+
+    Shards are evaluated in turn in this process if num_workers is 0, and otherwise divided
+    between that many persistent worker processes.  Agents' locations, health codes and
+    infectiousness are then held in shared memory, which the workers read: the arrays to use in
+    their place are given by the attributes of the same name.  Results depend on the number of
+    shards but not on the number of workers.
+
+    The rows of agents are held in shard_agents grouped by the shard of their location, with those
+    of shard i from shard_starts[i] up to shard_starts[i + 1], also in shared memory.  Moves between
+    shards must be given to move so that the partition is kept up to date."""
+
+    # The agent state read by shards
+    SHARED_ARRAYS = ("agent_locations", "health_codes", "infectiousness", "shard_agents",
+                     "shard_starts")
+
+    def __init__(self, num_shards, num_workers, seed, agent_locations, health_codes,
+                 infectiousness, location_factors, susceptible_code):
+
+        self.location_factors = location_factors
+        self.susceptible_code = susceptible_code
+        self.num_workers      = num_workers
+
+        # Shard i covers the locations from bounds[i] up to bounds[i + 1]
+        bounds = np.linspace(0, len(location_factors), num_shards + 1).astype(np.intp)
+        seeds  = np.random.SeedSequence(seed).spawn(num_shards)
+        self.shards = [(i, bounds[i], bounds[i + 1], seeds[i]) for i in range(num_shards)]
+
+        # Agents partitioned by shard, and the position of each agent in the partition
+        self.location_shards = np.searchsorted(bounds, np.arange(len(location_factors)),
+                                               side='right') - 1
+        agent_shards    = self.location_shards[agent_locations]
+        shard_agents    = np.argsort(agent_shards, kind='stable')
+        shard_starts    = np.searchsorted(agent_shards[shard_agents], np.arange(num_shards + 1))
+        self.positions  = np.empty_like(shard_agents)
+        self.positions[shard_agents] = np.arange(len(shard_agents))
+
+        self.shared_memory = []
+        self.workers       = []
+        self.connections   = []
+        arrays = {"agent_locations": agent_locations, "health_codes": health_codes,
+                  "infectiousness": infectiousness, "shard_agents": shard_agents,
+                  "shard_starts": shard_starts}
+
+        if num_workers == 0:
+            for name, array in arrays.items():
+                setattr(self, name, array)
+            self.rngs = {i: np.random.default_rng(shard_seed) for i, _, _, shard_seed in self.shards}
+            return
+
+        log.info("Starting %i transmission workers for %i shards", num_workers, num_shards)
+        specs = {}
+        for name, array in arrays.items():
+            memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+            shared[:] = array
+            setattr(self, name, shared)
+            self.shared_memory.append(memory)
+            specs[name] = (memory.name, array.shape, array.dtype)
+
+        context = multiprocessing.get_context("spawn")
+        for w in range(num_workers):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=_worker, name=f"transmission-{w}", daemon=True,
+                                     args=(worker_connection, specs, location_factors,
+                                           susceptible_code, self.shards[w::num_workers]))
+            worker.start()
+            self.workers.append(worker)
+            self.connections.append(connection)
+
+    def move(self, row, old_location, new_location):
+        """Keeps the partition of agents by shard up to date as the agent with the row given moves
+        between the locations with the indices given.
+
+        The agent is passed from shard to shard towards its new one, at each step swapped to the
+        edge of the current shard's block and moved across the boundary, so that the blocks stay
+        contiguous at the cost of one swap per shard crossed."""
+
+        shard, new_shard = self.location_shards[old_location], self.location_shards[new_location]
+        step = 1 if new_shard > shard else -1
+        while shard != new_shard:
+            boundary = shard + 1 if step == 1 else shard
+            edge     = self.shard_starts[boundary] - 1 if step == 1 else self.shard_starts[boundary]
+            self._swap(self.positions[row], edge)
+            self.shard_starts[boundary] -= step
+            shard += step
+
+    def _swap(self, i, j):
+        """Swaps the agents at positions i and j of the partition"""
+
+        row_i, row_j = self.shard_agents[i], self.shard_agents[j]
+        self.shard_agents[i], self.shard_agents[j] = row_j, row_i
+        self.positions[row_i], self.positions[row_j] = j, i
+
+    def transmit(self):
+        """Returns the rows of the agents exposed this tick, and of the agent infecting each,
+        concatenated over shards in order"""
+
+        if self.num_workers == 0:
+            results = [transmit_shard(self.rngs[i], first, last,
+                                      self.shard_agents[self.shard_starts[i]:
+                                                        self.shard_starts[i + 1]],
+                                      self.agent_locations, self.health_codes,
+                                      self.infectiousness, self.location_factors,
+                                      self.susceptible_code)
+                       for i, first, last, _ in self.shards]
+        else:
+            for connection in self.connections:
+                connection.send(True)
+            results_by_shard = {}
+            for connection in self.connections:
+                results_by_shard.update(connection.recv())
+            results = [results_by_shard[i] for i, _, _, _ in self.shards]
+
+        return np.concatenate([result[0] for result in results]), \
+               np.concatenate([result[1] for result in results])
+
+    def close(self):
+        """Stops the workers and frees shared memory.  The shared arrays must no longer be
+        referenced elsewhere."""
+
+        for connection in self.connections:
+            connection.send(None)
+        for worker in self.workers:
+            worker.join()
+        for name in ShardedTransmission.SHARED_ARRAYS:
+            setattr(self, name, None)
+        for memory in self.shared_memory:
+            memory.close()
+            memory.unlink()
+        self.workers, self.connections, self.shared_memory = [], [], []
+
+def _worker(connection, specs, location_factors, susceptible_code, shards):
+    """Worker process main loop: evaluate the shards given whenever asked, until sent None"""
+
+    memory = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    arrays = {name: np.ndarray(spec[1], dtype=spec[2], buffer=memory[name].buf)
+              for name, spec in specs.items()}
+    rngs   = {i: np.random.default_rng(shard_seed) for i, _, _, shard_seed in shards}
+
+    while connection.recv() is not None:
+        starts = arrays["shard_starts"]
+        connection.send({i: transmit_shard(rngs[i], first, last,
+                                           arrays["shard_agents"][starts[i]:starts[i + 1]],
+                                           arrays["agent_locations"], arrays["health_codes"],
+                                           arrays["infectiousness"], location_factors,
+                                           susceptible_code)
+                         for i, first, last, _ in shards})
+
+    del arrays
+    for shared in memory.values():
+        shared.close()
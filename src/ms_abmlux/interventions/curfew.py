@@ -31,6 +31,8 @@ class Curfew(Intervention):
         super().init_sim(sim)
 
         self.home_activity_type = sim.activity_manager.as_int(self.config['home_activity_type'])
+        self.curfew_types       = sim.world.location_types.mask(self.curfew_locations,
+                                                                register=True)
 
         self.bus.subscribe("notify.time.tick", self.handle_time_change, self)
         self.bus.subscribe("request.agent.location", self.handle_location_change, self)
@@ -54,7 +56,7 @@ class Curfew(Intervention):
         if not self.active:
             return
 
-        if new_location.typ in self.curfew_locations:
+        if (self.curfew_types >> new_location.typ_int) & 1:
             home_location = agent.locations_for_activity(self.home_activity_type)[0]
             if new_location != home_location:
                 self.bus.publish("request.agent.location", agent, home_location)
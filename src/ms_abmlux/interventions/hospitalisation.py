@@ -17,10 +17,15 @@ class Hospitalisation(Intervention):
 
         super().init_sim(sim)
 
-        self.dead_states            = self.config['dead_states']
-        self.hospital_states        = self.config['hospital_states']
+        # Bitmasks over the ints representing health states
+        self.dead_states            = sim.disease_model.health_states.mask(
+                                          self.config['dead_states'])
+        self.hospital_states        = sim.disease_model.health_states.mask(
+                                          self.config['hospital_states'])
         self.cemetery_location_type = self.config['cemetery_location_type']
         self.hospital_location_type = self.config['hospital_location_type']
+        self.cemetery_type_int      = sim.world.location_types.register(self.cemetery_location_type)
+        self.hospital_type_int      = sim.world.location_types.register(self.hospital_location_type)
 
         # Overridden later when the simulation states
         self.cemeteries = []
@@ -50,12 +55,12 @@ class Hospitalisation(Intervention):
         # be modified by allowing activity_changes at time t to depend on health_changes at time
         # t and moreover by allowing agents to enter and exit hospital independently of their
         # Markov chain.
-        if agent.health in self.hospital_states:
-            if agent.current_location not in self.hospitals:
+        if (self.hospital_states >> agent.health) & 1:
+            if agent.current_location.typ_int != self.hospital_type_int:
                 self.bus.publish("request.agent.location", agent, \
                                  self.prng.random_choice(self.hospitals))
 
-        if agent.health in self.dead_states:
-            if agent.current_location not in self.cemeteries:
+        if (self.dead_states >> agent.health) & 1:
+            if agent.current_location.typ_int != self.cemetery_type_int:
                 self.bus.publish("request.agent.location", agent, \
                                  self.prng.random_choice(self.cemeteries))
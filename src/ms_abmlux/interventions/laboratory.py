@@ -40,7 +40,9 @@ class Laboratory(Intervention):
 
         self.do_test_to_test_results_ticks = \
             int(sim.clock.days_to_ticks(self.config['do_test_to_test_results_days']))
-        self.infected_states = self.config['incubating_states'] + self.config['contagious_states']
+        self.health_states   = sim.disease_model.health_states
+        self.infected_states = self.health_states.mask(self.config['incubating_states']
+                                                       + self.config['contagious_states'])
 
         self.agents = sim.world.agents
 
@@ -78,7 +80,7 @@ class Laboratory(Intervention):
             return
 
         test_result = False
-        if agent.health in self.infected_states:
+        if (self.infected_states >> agent.health) & 1:
             if self.prng.boolean(1 - self.prob_false_negative):
                 test_result = True
         else:
@@ -90,10 +92,9 @@ class Laboratory(Intervention):
         self.test_result_events.add("notify.testing.result",
                                     self.do_test_to_test_results_ticks, agent, test_result)
 
-        self.report("notify.testing.result", self.clock, test_result, agent.age, agent.health,
-                                   self.home_locations_dict[agent].uuid,
-                                   self.home_locations_dict[agent].coord,
-                                   self.resident_dict[agent])
+        self.report("notify.testing.result", self.clock, test_result, agent.age,
+                    self.health_states.as_str(agent.health), self.home_locations_dict[agent].uuid,
+                    self.home_locations_dict[agent].coord, self.resident_dict[agent])
 
 class TestBooking(Intervention):
     """Consume a 'request to book test' signal and wait a bit whilst getting around to it.
@@ -104,13 +105,14 @@ class TestBooking(Intervention):
     def __init__(self, config, init_enabled):
         super().__init__(config, init_enabled)
 
-        self.symptomatic_states   = config['symptomatic_states']
         self.agents_awaiting_test = set()
 
     def init_sim(self, sim):
 
         super().init_sim(sim)
 
+        self.symptomatic_states   = sim.disease_model.health_states.mask(
+                                        self.config['symptomatic_states'])
         self.test_events          = DeferredEventPool(self.bus, sim.clock)
         self.bus.subscribe("request.testing.book_test", self.handle_book_test, self)
 
@@ -129,7 +131,7 @@ class TestBooking(Intervention):
             return
 
         if agent not in self.agents_awaiting_test:
-            if agent.health in self.symptomatic_states:
+            if (self.symptomatic_states >> agent.health) & 1:
                 self.test_events.add(self.send_agent_for_test,
                                      self.time_to_arrange_test_symptoms, agent)
             else:
@@ -25,6 +25,8 @@ class LocationClosures(Intervention):
     def init_sim(self, sim):
         super().init_sim(sim)
 
+        self.closed_types       = sim.world.location_types.mask(self.location_closures,
+                                                                register=True)
         self.home_activity_type = sim.activity_manager.as_int(self.config['home_activity_type'])
         self.bus.subscribe("request.agent.location", self.handle_location_change, self)
 
@@ -35,7 +37,7 @@ class LocationClosures(Intervention):
         if not self.enabled:
             return
 
-        if new_location.typ in self.location_closures:
+        if (self.closed_types >> new_location.typ_int) & 1:
 
             home_location = agent.locations_for_activity(self.home_activity_type)[0]
             if new_location != home_location:
@@ -59,6 +61,8 @@ class CareHomeClosures(Intervention):
         super().init_sim(sim)
 
         self.activity_manager = sim.activity_manager
+        self.closed_types     = sim.world.location_types.mask(self.location_closures,
+                                                              register=True)
 
         self.home_activity_type = sim.activity_manager.as_int(self.config['home_activity_type'])
         self.work_activity_type = sim.activity_manager.as_int(self.config['work_activity_type'])
@@ -72,7 +76,7 @@ class CareHomeClosures(Intervention):
         if not self.enabled:
             return
 
-        if new_location.typ in self.location_closures:
+        if (self.closed_types >> new_location.typ_int) & 1:
             home_location = agent.locations_for_activity(self.home_activity_type)[0]
             work_location = agent.locations_for_activity(self.work_activity_type)[0]
             if new_location not in [home_location, work_location]:
@@ -97,6 +101,8 @@ class ShopClosures(Intervention):
         super().init_sim(sim)
 
         # Determine which shops are subject to closure restrictions
+        self.closed_types = sim.world.location_types.mask(self.location_closures,
+                                                          register=True)
         for location in sim.world.locations:
             if location.typ in self.location_closures:
                 self.location_to_close[location] = self.prng.boolean(self.prob_close)
@@ -111,7 +117,7 @@ class ShopClosures(Intervention):
         if not self.enabled:
             return
 
-        if new_location.typ in self.location_closures:
+        if (self.closed_types >> new_location.typ_int) & 1:
             if self.location_to_close[new_location]:
                 home_location = agent.locations_for_activity(self.home_activity_type)[0]
                 if new_location != home_location:
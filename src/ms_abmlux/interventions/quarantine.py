@@ -23,11 +23,12 @@ class Quarantine(Intervention):
         self.default_duration_ticks = int(sim.clock.days_to_ticks(self.default_duration_days))
         early_end_days              = self.config['negative_test_result_to_end_quarantine_days']
         self.early_end_ticks        = int(sim.clock.days_to_ticks(early_end_days))
-        self.location_blacklist     = self.config['location_blacklist']
+        self.location_blacklist     = sim.world.location_types.mask(
+                                          self.config['location_blacklist'], register=True)
         self.home_activity_type     = sim.activity_manager.as_int(self.config['home_activity_type'])
         self.disable_releases_immediately = self.config['disable_releases_immediately']
 
-        self.health_states = sim.disease_model.states
+        self.health_states = sim.disease_model.health_states
         self.clock         = sim.clock
 
         self.end_quarantine_events = DeferredEventPool(self.bus, sim.clock)
@@ -54,8 +55,10 @@ class Quarantine(Intervention):
 
         self.default_duration_ticks = int(clock.days_to_ticks(self.default_duration_days))
         num_in_quarantine = len(self.agents_in_quarantine)
-        agents_in_quarantine_by_health_state = {str(hs): len([agent for agent in
-                     self.agents_in_quarantine if agent.health == hs]) for hs in self.health_states}
+        counts = [0] * len(self.health_states)
+        for agent in self.agents_in_quarantine:
+            counts[agent.health] += 1
+        agents_in_quarantine_by_health_state = dict(zip(self.health_states.types_as_str(), counts))
         total_age = sum([agent.age for agent in self.agents_in_quarantine])
         self.report("quarantine_data", self.clock, num_in_quarantine,
                     agents_in_quarantine_by_health_state, total_age)
@@ -123,6 +126,6 @@ class Quarantine(Intervention):
         if agent in self.agents_in_quarantine:
             home_location = agent.locations_for_activity(self.home_activity_type)[0]
             if new_location != home_location:
-                if new_location.typ not in self.location_blacklist:
+                if not (self.location_blacklist >> new_location.typ_int) & 1:
                     self.bus.publish("request.agent.location", agent, home_location)
                     return MessageBus.CONSUME
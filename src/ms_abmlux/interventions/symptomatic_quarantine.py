@@ -23,10 +23,13 @@ class SymptomaticQuarantine(Intervention):
 
         self.default_duration_days  = self.config['default_duration_days']
         self.default_duration_ticks = int(self.clock.days_to_ticks(self.default_duration_days))
-        self.location_blacklist     = self.config['location_blacklist']
+        self.location_blacklist     = sim.world.location_types.mask(
+                                          self.config['location_blacklist'], register=True)
         self.home_activity_type     = sim.activity_manager.as_int(self.config['home_activity_type'])
-        self.symptomatic_states     = self.config['symptomatic_states']
-        self.asymptomatic_states    = self.config['asymptomatic_states']
+        # Bitmasks over the ints representing health states
+        health_states               = sim.disease_model.health_states
+        self.symptomatic_states     = health_states.mask(self.config['symptomatic_states'])
+        self.asymptomatic_states    = health_states.mask(self.config['asymptomatic_states'])
 
         self.prob_quarantine_symptomatic = self.config['prob_quarantine_symptomatic']
         self.prob_quarantine_asymptomatic = self.config['prob_quarantine_asymptomatic']
@@ -51,14 +54,16 @@ class SymptomaticQuarantine(Intervention):
             return
 
         # If moving from an asymptomatic state to a symtomatic state
-        if old_health not in self.symptomatic_states and agent.health in self.symptomatic_states:
+        if not (self.symptomatic_states >> old_health) & 1 \
+           and (self.symptomatic_states >> agent.health) & 1:
             if self.prng.boolean(self.prob_quarantine_symptomatic):
                 self.agent_in_quarantine[agent] = True
                 self.end_quarantine_events.add("request.quarantine.stop", \
                                                self.default_duration_ticks, agent)
 
         # If moving from to an asymptomatic state
-        if old_health not in self.asymptomatic_states and agent.health in self.asymptomatic_states:
+        if not (self.asymptomatic_states >> old_health) & 1 \
+           and (self.asymptomatic_states >> agent.health) & 1:
             if self.prng.boolean(self.prob_quarantine_asymptomatic):
                 self.agent_in_quarantine[agent] = True
                 self.end_quarantine_events.add("request.quarantine.stop", \
@@ -78,6 +83,6 @@ class SymptomaticQuarantine(Intervention):
         if self.agent_in_quarantine[agent]:
             home_location = agent.locations_for_activity(self.home_activity_type)[0]
             if new_location != home_location:
-                if new_location.typ not in self.location_blacklist:
+                if not (self.location_blacklist >> new_location.typ_int) & 1:
                     self.bus.publish("request.agent.location", agent, home_location)
                     return MessageBus.CONSUME
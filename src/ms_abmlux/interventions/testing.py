@@ -73,8 +73,10 @@ class PrescriptionTesting(Intervention):
         self.onset_of_symptoms_to_test_booking = \
             int(sim.clock.days_to_ticks(self.config['onset_of_symptoms_to_test_booking_days']))
 
-        self.symptomatic_states   = self.config['symptomatic_states']
-        self.asymptomatic_states  = self.config['asymptomatic_states']
+        # Bitmasks over the ints representing health states
+        health_states             = sim.disease_model.health_states
+        self.symptomatic_states   = health_states.mask(self.config['symptomatic_states'])
+        self.asymptomatic_states  = health_states.mask(self.config['asymptomatic_states'])
         self.test_booking_events = DeferredEventPool(self.bus, sim.clock)
 
         self.bus.subscribe("notify.agent.health", self.handle_health_change, self)
@@ -93,13 +95,15 @@ class PrescriptionTesting(Intervention):
             return
 
         # If moving from an asymptomatic state to a symtomatic state
-        if old_health not in self.symptomatic_states and agent.health in self.symptomatic_states:
+        if not (self.symptomatic_states >> old_health) & 1 \
+           and (self.symptomatic_states >> agent.health) & 1:
             if self.prng.boolean(self.prob_test_symptoms_symptomatic):
                 self.test_booking_events.add("request.testing.book_test", \
                                              self.onset_of_symptoms_to_test_booking, agent)
 
         # If moving from to an asymptomatic state
-        if old_health not in self.asymptomatic_states and agent.health in self.asymptomatic_states:
+        if not (self.asymptomatic_states >> old_health) & 1 \
+           and (self.asymptomatic_states >> agent.health) & 1:
             if self.prng.boolean(self.prob_test_symptoms_asymptomatic):
                 self.test_booking_events.add("request.testing.book_test", \
                                              self.onset_of_symptoms_to_test_booking, agent)
\ No newline at end of file
@@ -80,12 +80,13 @@ class Vaccination(Intervention):
         self.agent_wants_vaccine = self._get_vaccine_hesitancy(age_low, age_high,
                                                                prob_low, prob_med, prob_high)
 
-    def administer_second_dose(self, agent, vaccine):
+    def administer_second_dose(self, agents, vaccine):
         """Administers agents with a second dose of the vaccine"""
 
-        if self.prng.boolean(vaccine.prob_second_dose_successful):
-            self.bus.publish("request.agent.gain_immunity", agent,
-                             vaccine.targetted_strains, vaccine.duration)
+        immunised = [agent for agent in agents
+                     if self.prng.boolean(vaccine.prob_second_dose_successful)]
+        self.bus.publish("request.agents.gain_immunity", immunised,
+                         vaccine.targetted_strains, vaccine.duration)
 
     def midnight(self, clock, t):
         """At midnight, remove from the priority list agents who have tested positive that day
@@ -108,14 +109,20 @@ class Vaccination(Intervention):
         for vaccine in self.vaccines:
             agents_to_vaccinate = self.prng.random_sample(total_agents_to_vaccinate,
                                                           num_to_vaccinate[vaccine])
+            immunised, second_doses = [], []
             for agent in agents_to_vaccinate:
                 if self.agent_wants_vaccine[agent]:
                     if self.prng.boolean(vaccine.prob_first_dose_successful):
-                        self.bus.publish("request.agent.gain_immunity", agent,
-                                         vaccine.targetted_strains, vaccine.duration)
+                        immunised.append(agent)
                     if vaccine.second_dose_needed:
-                        self.second_dose_events.add("request.vaccination.second_dose",
-                                                    vaccine.time_between_doses, agent, vaccine)
+                        second_doses.append(agent)
+
+            # Immunity is granted, and second doses scheduled, for the whole day's doses at once
+            self.bus.publish("request.agents.gain_immunity", immunised,
+                             vaccine.targetted_strains, vaccine.duration)
+            if len(second_doses) > 0:
+                self.second_dose_events.add("request.vaccination.second_dose",
+                                            vaccine.time_between_doses, second_doses, vaccine)
 
     def _get_vaccine_hesitancy(self, age_low, age_high, prob_low, prob_med, prob_high):
         """Decides who will refuse the vaccine at the moment of being offered it"""
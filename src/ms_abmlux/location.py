@@ -31,8 +31,10 @@ class Location:
 
         # Unique identifier
         self.uuid      = uuid.uuid4().hex
-        # The type of location, for example House, Restaurant etc
+        # The type of location, for example House, Restaurant etc, and the int representing it in
+        # the registry of the world to which the location is added
         self.typ       = typ
+        self.typ_int   = None
 
         # Spatial coordinates of the location
         self.coord     = coord
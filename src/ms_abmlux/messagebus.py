@@ -1,8 +1,17 @@
-"""Simple synchronous messagebus implementation."""
+"""Simple messagebus implementations.
+
+MessageBus delivers events synchronously, in the publishing thread.  AsyncMessageBus queues events
+and delivers them from a background thread, and is intended for telemetry, where the simulation
+should not wait on reporters formatting and writing their output."""
 
 import logging
+import queue
+import threading
 from collections import defaultdict
-from typing import Any, Callable
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
 
 log = logging.getLogger("messagebus")
 
@@ -96,3 +105,115 @@ class MessageBus:
 
     pub = publish
     sub = subscribe
+
+
+class AsyncMessageBus(MessageBus):
+    """Message broker that delivers events from a background thread.
+
+    Publishing places an immutable record of the event on a bounded queue, which is drained in
+    order by a single worker thread that invokes the subscribed callbacks.  If the queue is full,
+    publishing blocks until the worker catches up (backpressure), so memory use is bounded.
+
+    Arguments are frozen when published, since the publisher may mutate them before they are
+    delivered: objects offering a snapshot() method (e.g. SimClock) are replaced by their snapshot,
+    NumPy arrays are copied into read-only arrays, and dicts, lists, tuples and sets are copied
+    into read-only equivalents, with their contents frozen in turn.  Other objects, such as agents
+    and locations, are delivered by reference.
+
+    Publishing to any of the barrier topics (by default "simulation.end") waits until the event
+    and everything queued before it has been delivered, so that reporters have closed their files
+    by the time the simulation returns.  Exceptions raised by callbacks are re-raised in the
+    publishing thread at the next publish or flush.
+    """
+
+    # Sentinel used to stop the worker thread
+    _STOP = object()
+
+    def __init__(self, max_queue_size: int=10000,
+                 barrier_topics: Iterable[str]=("simulation.end", )):
+
+        super().__init__()
+
+        self.queue: queue.Queue    = queue.Queue(maxsize=max_queue_size)
+        self.barrier_topics        = set(barrier_topics)
+        self.error: Optional[BaseException] = None
+
+        self.worker = threading.Thread(target=self._drain, name="telemetry", daemon=True)
+        self.worker.start()
+
+    def publish(self, topic: str, *args, **kwargs) -> None:
+        """Queue an event for delivery to the handlers of the topic given.
+
+        Blocks if the queue is full.  If the topic is a barrier topic, blocks until the event has
+        been delivered.
+
+        Parameters:
+            topic (str): The topic to publish on
+            *args: Positional arguments to the callback
+            **kwargs: Keyword arguments to the callback
+        """
+
+        self._raise_worker_error()
+
+        record = (topic, tuple(_freeze(arg) for arg in args),
+                  {key: _freeze(value) for key, value in kwargs.items()})
+        self.queue.put(record)
+
+        if topic in self.barrier_topics:
+            self.flush()
+
+    pub = publish
+
+    def flush(self) -> None:
+        """Block until every event published so far has been delivered."""
+
+        self.queue.join()
+        self._raise_worker_error()
+
+    def close(self) -> None:
+        """Deliver any outstanding events and stop the worker thread."""
+
+        self.flush()
+        self.queue.put(AsyncMessageBus._STOP)
+        self.worker.join()
+
+    def _drain(self) -> None:
+        """Worker thread main loop: deliver queued events in order."""
+
+        while True:
+            record = self.queue.get()
+            try:
+                if record is AsyncMessageBus._STOP:
+                    return
+                topic, args, kwargs = record
+                super().publish(topic, *args, **kwargs)
+            except Exception as exc: # pylint: disable=broad-except
+                log.exception("Error delivering telemetry event")
+                if self.error is None:
+                    self.error = exc
+            finally:
+                self.queue.task_done()
+
+    def _raise_worker_error(self) -> None:
+        """Re-raise, in the calling thread, the first exception raised by a callback."""
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Telemetry handler failed") from error
+
+def _freeze(value: Any) -> Any:
+    """Return a copy of value that the publisher cannot mutate after the fact."""
+
+    if hasattr(value, "snapshot"):
+        return value.snapshot()
+    if isinstance(value, np.ndarray):
+        value = value.copy()
+        value.flags.writeable = False
+        return value
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
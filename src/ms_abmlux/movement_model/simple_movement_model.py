@@ -2,6 +2,8 @@
 
 import logging
 
+import numpy as np
+
 from ms_abmlux.movement_model import MovementModel
 
 log = logging.getLogger("simple_movement_model")
@@ -16,7 +18,6 @@ class SimpleMovementModel(MovementModel):
         super().__init__(config, activity_manager)
 
         # Moving to public transport is a special case
-        self.no_move_states         = self.config['no_move_health_states']
         self.pt_activity_type_int   = activity_manager.as_int(config['pt_activity_type'])
         self.pt_loc_type            = config['pt_location_type']
         self.public_transport_units = world.locations_for_types(self.pt_loc_type)
@@ -30,9 +31,18 @@ class SimpleMovementModel(MovementModel):
     def init_sim(self, sim):
         super().init_sim(sim)
 
+        # Bitmask over the ints representing the health states in which agents do not move
+        self.no_move_states     = sim.disease_model.health_states.mask(
+                                      self.config['no_move_health_states'])
         self.pt_units_available = sim.transport_model.units_available
 
+        # Each agent's allowable locations for each activity, as indices into the world's locations
+        # in compressed sparse row form: those of the agent with row r for activity a are
+        # location_options[option_indptr[k]:option_indptr[k + 1]], where k = r * num_activities + a
+        self._build_location_options(sim.world)
+
         self.bus.subscribe("request.agent.activity", self.handle_activity_change, self)
+        self.bus.subscribe("request.agents.activity", self.handle_activity_changes, self)
         self.bus.subscribe("notify.pt.availability", self.update_pt_unit_availability, self)
 
     def update_pt_unit_availability(self, pt_units_available):
@@ -44,7 +54,7 @@ class SimpleMovementModel(MovementModel):
         """Respond to an activity by sending location change requests."""
 
         # If agent is hospitalised or dead, don't change location in response to new activity
-        if agent.health not in self.no_move_states:
+        if not (self.no_move_states >> agent.health) & 1:
             if new_activity == self.pt_activity_type_int:
                 allowable_locations = self.public_transport_units[0:self.pt_units_available]
                 self.bus.publish("request.agent.location", agent, \
@@ -53,3 +63,55 @@ class SimpleMovementModel(MovementModel):
                 allowable_locations = agent.locations_for_activity(new_activity)
                 self.bus.publish("request.agent.location", agent, \
                 self.prng.random_choice(list(allowable_locations)))
+
+    def handle_activity_changes(self, agents, new_activities):
+        """Respond to many activity changes at once, as for a single change, drawing the new
+        locations of every agent in one step."""
+
+        healths = np.fromiter((agent.health for agent in agents), dtype=np.int64,
+                              count=len(agents))
+        moving  = np.flatnonzero(((np.int64(self.no_move_states) >> healths) & 1) == 0)
+        if len(moving) == 0:
+            return
+
+        # Agents taking public transport choose among the units available, and others among their
+        # allowable locations for the activity
+        rows       = np.fromiter((self.agent_index[agents[i]] for i in moving.tolist()),
+                                 dtype=np.intp, count=len(moving))
+        activities = np.asarray(new_activities)[moving]
+        on_pt      = activities == self.pt_activity_type_int
+        keys       = rows * self.num_activities + activities
+        firsts     = np.where(on_pt, 0, self.option_indptr[keys])
+        sizes      = np.where(on_pt, self.pt_units_available,
+                              self.option_indptr[keys + 1] - self.option_indptr[keys])
+        if np.any(sizes == 0):
+            raise ValueError("Agents have no locations for their new activity")
+        choices    = firsts + self.prng.random_indices(sizes)
+
+        locations = np.empty(len(moving), dtype=np.intp)
+        locations[on_pt]  = self.pt_unit_indices[choices[on_pt]]
+        locations[~on_pt] = self.location_options[choices[~on_pt]]
+
+        # Location requests are made one agent at a time, so that interventions may redirect them
+        for i, location in zip(moving.tolist(), locations.tolist()):
+            self.bus.publish("request.agent.location", agents[i], self.locations[location])
+
+    def _build_location_options(self, world):
+        """Tabulate the allowable locations of every agent for every activity"""
+
+        self.locations      = world.locations
+        location_index      = {location: i for i, location in enumerate(self.locations)}
+        self.agent_index    = {agent: i for i, agent in enumerate(world.agents)}
+        self.num_activities = len(self.activity_manager.types_as_int())
+
+        counts  = np.zeros(len(world.agents) * self.num_activities, dtype=np.intp)
+        options = []
+        for row, agent in enumerate(world.agents):
+            for activity, locations in sorted(agent.activity_locations.items()):
+                counts[row * self.num_activities + activity] = len(locations)
+                options.extend(location_index[location] for location in locations)
+
+        self.location_options = np.array(options, dtype=np.intp)
+        self.option_indptr    = np.concatenate([[0], np.cumsum(counts)])
+        self.pt_unit_indices  = np.array([location_index[unit]
+                                          for unit in self.public_transport_units], dtype=np.intp)
@@ -3,7 +3,7 @@
 import random
 import logging
 import math
-from typing import Sequence, TypeVar, MutableSequence, Any, Optional
+from typing import Sequence, TypeVar, MutableSequence, Any, Optional, Union
 import numpy
 
 log = logging.getLogger("random_tools")
@@ -12,6 +12,31 @@ log = logging.getLogger("random_tools")
 Probability = float
 T = TypeVar('T')
 
+def alias_table(weights: Sequence[float]) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Build a Vose alias table for sampling items in proportion to the weights given.
+
+    Returns an array of acceptance probabilities and an array of aliases, each with one entry per
+    item.  Item i is sampled by picking a column c uniformly and returning c with probability
+    probabilities[c], or aliases[c] otherwise."""
+
+    weights = numpy.asarray(weights, dtype=float)
+    if weights.sum() <= 0:
+        raise ValueError("Alias table needs at least one positive weight")
+
+    scaled        = weights * len(weights) / weights.sum()
+    probabilities = numpy.ones(len(weights))
+    aliases       = numpy.arange(len(weights))
+    small = [i for i, w in enumerate(scaled) if w < 1]
+    large = [i for i, w in enumerate(scaled) if w >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probabilities[less], aliases[less] = scaled[less], more
+        scaled[more] += scaled[less] - 1
+        (small if scaled[more] < 1 else large).append(more)
+
+    # Anything left over is within rounding error of 1, and so always accepted
+    return probabilities, aliases
+
 class Random:
     """Wraps the python random classes as an abstraction layer over them,
     and offers a number of convenience methods"""
@@ -41,8 +66,11 @@ class Random:
 
         return self.prng.randrange(stop)
 
-    def binomial(self, size: int, prob: float) -> int:
-        """Random binomial function"""
+    def binomial(self, size: Union[int, numpy.ndarray],
+                 prob: Union[float, numpy.ndarray]) -> Union[int, numpy.ndarray]:
+        """Return the number of successes in size trials, each succeeding with probability prob.
+        Sizes and probabilities may be arrays, which are broadcast against each other to give an
+        array of counts."""
 
         return self.prng_np.binomial(size, prob)
 
@@ -65,12 +93,63 @@ class Random:
         return self.prng.choices(population, weights=weights, cum_weights=None, k=sample_size)
 
 
+    def cumulative_choices(self, cum_weights: Sequence[float], sample_size: int) -> numpy.ndarray:
+        """Return the indices of sample_size items chosen with replacement, where item i is
+        chosen with probability proportional to cum_weights[i] - cum_weights[i - 1]."""
+
+        thresholds = self.prng_np.random_sample(sample_size) * cum_weights[-1]
+        return numpy.searchsorted(cum_weights, thresholds, side='right')
+
+
+    def grouped_cumulative_choices(self, cum_weights: numpy.ndarray, firsts: numpy.ndarray,
+                                   lasts: numpy.ndarray) -> numpy.ndarray:
+        """Make one choice for each pair of bounds given, returning for choice j the index of an
+        item from firsts[j] up to, but not including, lasts[j], where item i is chosen with
+        probability proportional to cum_weights[i] - cum_weights[i - 1]."""
+
+        lower = numpy.where(firsts > 0, cum_weights[firsts - 1], 0)
+        upper = cum_weights[lasts - 1]
+        thresholds = lower + self.prng_np.random_sample(len(firsts)) * (upper - lower)
+        return numpy.clip(numpy.searchsorted(cum_weights, thresholds, side='right'),
+                          firsts, lasts - 1)
+
+
+    def alias_choices(self, probabilities: numpy.ndarray, aliases: numpy.ndarray) -> numpy.ndarray:
+        """Draw one item for each row of the alias tables given, where row i holds the
+        probabilities and aliases returned by alias_table for the distribution of draw i."""
+
+        rows    = numpy.arange(len(probabilities))
+        columns = numpy.minimum((self.prng_np.random_sample(len(rows)) * probabilities.shape[1])
+                                .astype(int), probabilities.shape[1] - 1)
+        accept  = self.prng_np.random_sample(len(rows)) < probabilities[rows, columns]
+        return numpy.where(accept, columns, aliases[rows, columns])
+
+
+    def random_indices(self, sizes: numpy.ndarray) -> numpy.ndarray:
+        """Return, for each size given, an index chosen uniformly from 0 up to, but not including,
+        the size.  Sizes must be positive."""
+
+        sizes = numpy.asarray(sizes)
+        return numpy.minimum((self.prng_np.random_sample(len(sizes)) * sizes).astype(numpy.intp),
+                             sizes - 1)
+
+
     def random_sample(self, population: Sequence[T], k: int) -> list[T]:
         """Select k items from the population given."""
 
         return self.prng.sample(population, k)
 
 
+    def grouped_sample(self, groups: numpy.ndarray, sample_sizes: numpy.ndarray) -> numpy.ndarray:
+        """Sample without replacement from each group of items, where groups[i] is the group of
+        item i, in ascending order, and sample_sizes[g] items are taken from group g.  Returns the
+        indices of the items selected."""
+
+        order = numpy.lexsort((self.prng_np.random_sample(len(groups)), groups))
+        ranks = numpy.arange(len(groups)) - numpy.searchsorted(groups, groups)
+        return order[ranks < sample_sizes[groups]]
+
+
     def random_shuffle(self, x: MutableSequence[Any]) -> None:
         """Random shuffle function"""
 
@@ -143,3 +222,17 @@ class Random:
         assert probability_true <= 1
 
         return self.prng.random() < probability_true
+
+    def booleans(self, probability_true: Probability, size: int) -> numpy.ndarray:
+        """Return an array of booleans, each true with the probability given."""
+
+        assert probability_true >= 0
+        assert probability_true <= 1
+
+        return self.prng_np.random_sample(size) < probability_true
+
+    def independent_booleans(self, probabilities: numpy.ndarray) -> numpy.ndarray:
+        """Return an array of booleans, where element i is true with probability
+        probabilities[i]."""
+
+        return self.prng_np.random_sample(len(probabilities)) < probabilities
@@ -0,0 +1,83 @@
+"""Mechanisms to convert named types, such as health states and location types, between the
+human-readable strings used in config and output and the small ints used in code.
+
+Sets of types, such as the infected health states, may be represented as bitmasks over those ints,
+so that membership can be tested without hashing or scanning lists.
+"""
+
+import logging
+from typing import Iterable, Union
+
+log = logging.getLogger("registry")
+
+class Registry:
+    """Assigns each name an int, in order of registration, and offers methods to map between the
+    two representations and to build bitmasks over sets of names."""
+
+    def __init__(self, names: Iterable[str]=()):
+        self.str_to_int: dict[str, int] = {}
+        self.int_to_str: list[str]      = []
+        for name in names:
+            self.register(name)
+
+    def __len__(self):
+        return len(self.int_to_str)
+
+    def register(self, name: str) -> int:
+        """Return the int representing the name given, assigning the next free int if the name
+        has not been seen before."""
+
+        if name not in self.str_to_int:
+            self.str_to_int[name] = len(self.int_to_str)
+            self.int_to_str.append(name)
+        return self.str_to_int[name]
+
+    def types_as_int(self) -> list[int]:
+        """Return the list of all types as integers.
+
+        The ordering of the response will be the same as types_as_str"""
+        return list(range(len(self.int_to_str)))
+
+    def types_as_str(self) -> list[str]:
+        """Return a list of all types as strings.
+
+        If types_as_int is also called, the ordering will be the same."""
+        return list(self.int_to_str)
+
+    def as_int(self, str_or_int: Union[str, int]) -> int:
+        """Given a string or int representation of a type, return the representation as an int.
+
+        Parameters:
+            str_or_int: The type to return as an int"""
+        if isinstance(str_or_int, str):
+            return self.str_to_int[str_or_int]
+
+        return str_or_int
+
+    def as_str(self, str_or_int: Union[str, int]) -> str:
+        """Given a string or int representation of a type, return the representation as a string.
+
+        Parameters:
+            str_or_int: The type to return as a string"""
+        if isinstance(str_or_int, str):
+            return str_or_int
+
+        return self.int_to_str[str_or_int]
+
+    def mask(self, names: Iterable[Union[str, int]], register: bool=False) -> int:
+        """Return a bitmask with bit i set for each type given, which is tested for type i with
+        (mask >> i) & 1.  A single name may be given in place of a list.
+
+        Names not yet seen raise KeyError, so that a mistyped name in config fails at startup.
+        If register is True they are registered instead, so that masks built from config can
+        match types that appear later, as location types do when locations are added."""
+
+        if isinstance(names, str):
+            names = [names]
+
+        mask = 0
+        for name in names:
+            if isinstance(name, str) and name not in self.str_to_int and not register:
+                raise KeyError(f"Unknown type {name!r}, expected one of {self.int_to_str}")
+            mask |= 1 << (self.register(name) if isinstance(name, str) else name)
+        return mask
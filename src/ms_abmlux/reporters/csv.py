@@ -4,6 +4,8 @@ import os
 import os.path
 import csv
 
+import numpy as np
+
 from ms_abmlux.reporters import Reporter
 
 # TODO: handle >1 sim at the same time using the run_id
@@ -378,20 +380,27 @@ class QuarantineCounts(Reporter):
             self.handle.close()
 
 class ExposureEvents(Reporter):
-    """Reporter that writes to a CSV file as it runs."""
+    """Reporter that writes to a CSV file as it runs, one row per infection."""
 
     def __init__(self, telemetry_bus, config):
         super().__init__(telemetry_bus)
 
         self.filename = config['filename']
 
-        self.subscribe("agent_data.initial", self.initial_agent_data)
-        self.subscribe("new_infection", self.new_infection)
+        self.subscribe("infection_log.initial", self.initial_infection_log)
+        self.subscribe("infection_log.update", self.update_infection_log)
         self.subscribe("simulation.end", self.stop_sim)
 
-    def initial_agent_data(self, agent_uuids):
+    def initial_infection_log(self, strains, location_types, agent_uuids, agent_ages,
+                              location_coords):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
+        self.strains         = strains
+        self.location_types  = location_types
+        self.agent_uuids     = agent_uuids
+        self.agent_ages      = agent_ages
+        self.location_coords = location_coords
+
         dirname = os.path.dirname(self.filename)
         if dirname != '':
             os.makedirs(dirname, exist_ok=True)
@@ -399,20 +408,24 @@ class ExposureEvents(Reporter):
         self.writer = csv.writer(self.handle)
 
         # Write header
-        header = ["tick", "iso8601", "date", "location type", "location coordinates",
-                  "agent infected", "age of agent infected", "activity of agent infected",
-                  "agent responsible", "age of agent responsible", "activity of agent responsible"]
+        header = ["tick", "iso8601", "date", "strain", "location type", "location coordinates",
+                  "agent infected", "age of agent infected", "agent responsible",
+                  "age of agent responsible"]
         self.writer.writerow(header)
 
-    def new_infection(self, clock, location_typ, location_coord, agent_uuid, agent_age,
-                      agent_activity, agent_responsible_uuid, agent_responsible_age,
-                      agent_responsible_activity):
-        """Update the CSV, writing a single row for every clock tick"""
-
-        row = [clock.t, clock.iso8601(), clock.now().date(), location_typ, location_coord,
-               agent_uuid, agent_age, agent_activity, agent_responsible_uuid, agent_responsible_age,
-               agent_responsible_activity]
-        self.writer.writerow(row)
+    def update_infection_log(self, clock, infections):
+        """Update the CSV, writing a row for each infection recorded this tick.  Initial cases
+        have no agent responsible."""
+
+        for infectee, infector, strain, location, location_type, infectee_age in \
+            zip(infections["infectee"], infections["infector"], infections["strain"],
+                infections["location"], infections["location_type"], infections["infectee_age"]):
+            responsible     = self.agent_uuids[infector] if infector >= 0 else None
+            responsible_age = self.agent_ages[infector] if infector >= 0 else None
+            row = [clock.t, clock.iso8601(), clock.now().date(), self.strains[strain],
+                   self.location_types[location_type], self.location_coords[location],
+                   self.agent_uuids[infectee], infectee_age, responsible, responsible_age]
+            self.writer.writerow(row)
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
@@ -460,34 +473,32 @@ class DeathEvents(Reporter):
             self.handle.close()
 
 class SecondaryInfectionCounts(Reporter):
-    """Reporter that writes to a CSV file as it runs."""
+    """Reporter that writes to a CSV file at the end of the simulation, giving the number of
+    agents responsible for each number of infections."""
 
     def __init__(self, telemetry_bus, config):
         super().__init__(telemetry_bus)
 
         self.filename = config['filename']
 
-        self.subscribe("agent_data.initial", self.initial_agent_data)
-        self.subscribe("new_infection", self.new_infection)
+        self.subscribe("infection_log.initial", self.initial_infection_log)
+        self.subscribe("infection_log.update", self.update_infection_log)
         self.subscribe("simulation.end", self.stop_sim)
 
-        self.secondary_infections_by_agent = {}
-
-    def initial_agent_data(self, agent_uuids):
-        """Initialize secondary infection counts"""
+    def initial_infection_log(self, strains, location_types, agent_uuids, agent_ages,
+                              location_coords):
+        """Initialize secondary infection counts, indexed as the agents are"""
 
-        for agent_uuid in agent_uuids:
-            self.secondary_infections_by_agent[agent_uuid] = 0
+        self.secondary_infections_by_agent = np.zeros(len(agent_uuids), dtype=np.int64)
 
-    def new_infection(self, clock, location_typ, location_coord, agent_uuid, agent_age,
-                      agent_activity, agent_responsible_uuid, agent_responsible_age,
-                      agent_responsible_activity):
+    def update_infection_log(self, clock, infections):
         """Update the secondary infection counts"""
 
-        self.secondary_infections_by_agent[agent_responsible_uuid] += 1
+        infectors = infections["infector"]
+        np.add.at(self.secondary_infections_by_agent, infectors[infectors >= 0], 1)
 
     def stop_sim(self):
-        """Called when the simulation ends.  Closes the file handle."""
+        """Called when the simulation ends.  Writes the counts and closes the file handle."""
 
         dirname = os.path.dirname(self.filename)
         if dirname != '':
@@ -499,14 +510,9 @@ class SecondaryInfectionCounts(Reporter):
         header = ["secondary_infections", "count"]
         self.writer.writerow(header)
 
-        max_secondary_infections = max(list(self.secondary_infections_by_agent.values()))
-        secondary_infection_counts = {num : 0 for num in range(0, max_secondary_infections + 1)}
-        for agent_uuid in self.secondary_infections_by_agent:
-            secondary_infection_counts[self.secondary_infections_by_agent[agent_uuid]] += 1
-
-        for count in secondary_infection_counts:
-            row = [count, secondary_infection_counts[count]]
-            self.writer.writerow(row)
+        secondary_infection_counts = np.bincount(self.secondary_infections_by_agent)
+        for count, num_agents in enumerate(secondary_infection_counts):
+            self.writer.writerow([count, num_agents])
 
         if self.handle is not None:
             self.handle.close()
@@ -184,6 +184,41 @@ class SimClock:
 
         return self.timedelta_to_ticks(time - self.epoch)
 
+    def snapshot(self) -> "ClockSnapshot":
+        """Return an immutable copy of the clock's current position, for use by consumers that
+        read the time after the clock has moved on (e.g. an asynchronous telemetry bus)."""
+        return ClockSnapshot(self.epoch, self.tick_length_s, self.max_ticks, self.t)
+
+class ClockSnapshot:
+    """A frozen view of a SimClock at a single tick.
+
+    Offers the read-only subset of the SimClock interface used by reporters.  Date formatting
+    is deferred until it is asked for, so taking a snapshot is cheap."""
+
+    __slots__ = ("epoch", "tick_length_s", "max_ticks", "t")
+
+    def __init__(self, epoch: datetime, tick_length_s: int, max_ticks: int, t: int):
+        self.epoch         = epoch
+        self.tick_length_s = tick_length_s
+        self.max_ticks     = max_ticks
+        self.t             = t
+
+    def time_elapsed(self) -> timedelta:
+        """Return the time elapsed, as a timedelta object"""
+        return timedelta(seconds=self.t * self.tick_length_s)
+
+    def now(self) -> datetime:
+        """Return a datetime.datetime showing the clock time"""
+        return self.epoch + self.time_elapsed()
+
+    def iso8601(self) -> str:
+        """Return ISO 8601 time as a string"""
+        return self.now().strftime('%m/%d/%YT%H:%M:%S %Z')
+
+    def snapshot(self) -> "ClockSnapshot":
+        """Snapshots are already immutable, so return self"""
+        return self
+
 Duration = Union[int, timedelta]
 
 class DeferredEventPool:
@@ -76,15 +76,20 @@ class Simulator:
         for name, intervention in self.interventions.items():
             intervention.set_telemetry_bus(self.telemetry_bus)
 
-        # Here we assume that components are going to hook onto the messagebus
-        self.activity_model.init_sim(self)
+        # Here we assume that components are going to hook onto the messagebus.  Activities and
+        # movement are only simulated if the disease model depends on them
+        if self.disease_model.tracks_movement:
+            self.activity_model.init_sim(self)
+        else:
+            log.info("Disease model does not track movement: not simulating activities")
         self.housing_model.init_sim(self)
         self.education_model.init_sim(self)
         self.health_model.init_sim(self)
         self.transport_model.init_sim(self)
         self.leisure_model.init_sim(self)
         self.labour_model.init_sim(self)
-        self.movement_model.init_sim(self)
+        if self.disease_model.tracks_movement:
+            self.movement_model.init_sim(self)
         self.disease_model.init_sim(self)
 
         for name, intervention in self.interventions.items():
@@ -96,6 +101,7 @@ class Simulator:
         self.agent_updates = defaultdict(dict)
         self.bus.subscribe("request.agent.location", self.record_location_change, self)
         self.bus.subscribe("request.agent.activity", self.record_activity_change, self)
+        self.bus.subscribe("request.agents.activity", self.record_activity_changes, self)
         self.bus.subscribe("request.agent.health", self.record_health_change, self)
         # self.bus.subscribe("request.agent.employment", self.record_employment_change, self)
 
@@ -120,6 +126,14 @@ class Simulator:
         self.agent_updates[agent]['activity'] = new_activity
         return MessageBus.CONSUME
 
+    def record_activity_changes(self, agents, new_activities):
+        """Record request.agents.activity events, in which many agents change activity at once,
+        as for request.agent.activity."""
+
+        for agent, new_activity in zip(agents, new_activities.tolist()):
+            self.agent_updates[agent]['activity'] = new_activity
+        return MessageBus.CONSUME
+
     def record_health_change(self, agent, new_health):
         """Record request.agent.health events, placing them on a queue to be enacted
         at the end of the tick.
@@ -155,10 +169,11 @@ class Simulator:
         self.bus.publish("notify.time.start_simulation", self)
         self.telemetry_bus.publish("simulation.start")
 
-        # Partition attendees according to health for optimization
+        # Partition attendees according to health for optimization, indexing by the int
+        # representing each health state
         log.info("Creating agent location indices...")
-        self.health_states = self.disease_model.states
-        self.attendees_by_health = {l: {h: [] for h in self.health_states}
+        self.health_states = self.disease_model.health_states
+        self.attendees_by_health = {l: [[] for _ in range(len(self.health_states))]
                                     for l in self.world.locations}
         for agent in self.world.agents:
             location = agent.current_location
@@ -166,11 +181,12 @@ class Simulator:
             self.attendees_by_health[location][health].append(agent)
 
         # Notify telemetry bus of initial counts
-        self.resident_agents_by_health_state_counts = {hs: sum([len({a for a in
-            self.attendees_by_health[loc][hs] if a.region == self.region}) for loc in
-            self.world.locations]) for hs in self.health_states}
+        self.resident_agents_by_health_state_counts = [0] * len(self.health_states)
+        for agent in self.world.agents:
+            if agent.region == self.region:
+                self.resident_agents_by_health_state_counts[agent.health] += 1
         self.telemetry_bus.publish("agents_by_health_state_counts.initial",
-                                    self.resident_agents_by_health_state_counts)
+                                   self._health_state_counts_by_name())
 
         # Start the main loop
         update_notifications = []
@@ -199,10 +215,19 @@ class Simulator:
         self.telemetry_bus.publish("simulation.end")
         self.bus.publish("notify.time.end_simulation", self)
 
+    def _health_state_counts_by_name(self):
+        """Return the counts of resident agents in each health state, keyed by the name of the
+        health state, for reporting"""
+
+        return dict(zip(self.health_states.types_as_str(),
+                        self.resident_agents_by_health_state_counts))
+
     def _update_agents(self):
         """Update the state of agents according to the lists provided."""
 
         update_notifications = []
+        activity_agents      = []
+        old_activities       = []
 
         for agent, updates in self.agent_updates.items():
 
@@ -212,9 +237,9 @@ class Simulator:
 
             if 'activity' in updates:
 
-                old_activity = agent.current_activity
+                activity_agents.append(agent)
+                old_activities.append(agent.current_activity)
                 agent.set_activity(updates['activity'])
-                update_notifications.append(("notify.agent.activity", agent, old_activity))
 
             if 'health' in updates:
 
@@ -238,8 +263,13 @@ class Simulator:
 
             self.attendees_by_health[agent.current_location][agent.health].append(agent)
 
+        # Activity changes are notified together, as most happen at once as routines change
+        if len(activity_agents) > 0:
+            update_notifications.append(("notify.agents.activity", activity_agents,
+                                         old_activities))
+
         self.telemetry_bus.publish("agents_by_health_state_counts.update", self.clock,
-                                   self.resident_agents_by_health_state_counts)
+                                   self._health_state_counts_by_name())
 
         self.agent_updates = defaultdict(dict)
 
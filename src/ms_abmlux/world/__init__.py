@@ -6,6 +6,7 @@ import ms_abmlux.utils as utils
 from ms_abmlux.world.map import Map
 from ms_abmlux.agent import Agent
 from ms_abmlux.location import Location
+from ms_abmlux.registry import Registry
 
 class World:
     """Represents the set of locations, upon a map describing their relationship to real life.
@@ -22,7 +23,9 @@ class World:
         self.beta  = None
 
         self.locations_by_type: dict[str, list[Location]] = {}
-        self.location_types = list(self.locations_by_type.keys())
+
+        # Location types are also represented by ints, in order of registration
+        self.location_types: Registry = Registry()
 
     def set_scale_factor(self, scale_factor: float) -> None:
         """Set the scale factor for this map: how does it relate to the population
@@ -55,6 +58,7 @@ class World:
         """Add a Location object to the world."""
 
         self.locations.append(location)
+        location.typ_int = self.location_types.register(location.typ)
 
         if location.typ not in self.locations_by_type:
             self.locations_by_type[location.typ] = []
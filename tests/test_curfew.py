@@ -6,6 +6,7 @@ import datetime
 from ms_abmlux.agent import Agent
 from ms_abmlux.location import Location
 from ms_abmlux.utils import instantiate_class
+from ms_abmlux.world import World
 from ms_abmlux.sim_time import SimClock
 
 from ms_abmlux.messagebus import MessageBus
@@ -61,6 +62,7 @@ class TestCurfew(unittest.TestCase):
         new_intervention = instantiate_class("ms_abmlux.interventions", intervention_class,
                                                 intervention_config, initial_enabled)
 
+        world = World(None)
         test_current_location = Location("Test type", (0,0))
         test_agent = Agent(40, "Luxembourg", test_current_location)
 
@@ -69,6 +71,10 @@ class TestCurfew(unittest.TestCase):
 
         test_new_location_1 = Location("Restaurant", (2,2))
         test_new_location_2 = Location("Not a Restaurant", (2,2))
+        world.add_location(test_current_location)
+        world.add_location(test_home_location)
+        world.add_location(test_new_location_1)
+        world.add_location(test_new_location_2)
 
         def test_callback(agent, home_location):
             """Test callback function"""
@@ -84,6 +90,8 @@ class TestCurfew(unittest.TestCase):
 
         new_intervention.bus = test_bus
         new_intervention.home_activity_type = 0
+        new_intervention.curfew_types = world.location_types.mask(intervention_config['locations'],
+                                                                  register=True)
 
         new_intervention.enabled = True
         new_intervention.active = True
@@ -0,0 +1,39 @@
+"""Tests the columnar infection log"""
+
+import numpy as np
+
+from ms_abmlux.disease_model.infection_log import InfectionLog
+
+class TestInfectionLog:
+    """Tests the columnar infection log"""
+
+    def test_append_grows_and_keeps_views(self):
+        """Appending beyond capacity should keep all rows, and views of earlier rows valid"""
+
+        infection_log = InfectionLog(initial_capacity=2)
+        infection_log.append(0, np.array([5, 6]), -1, 1, np.array([7, 8]), 2, np.array([30, 40]))
+        first = infection_log.rows()
+        infection_log.append(1, np.arange(10), np.arange(10, 20), 0, np.arange(10), 3, 50)
+
+        assert len(infection_log) == 12
+        assert list(first["infectee"]) == [5, 6]
+        assert list(first["infector"]) == [-1, -1]
+
+        rows = infection_log.rows(2)
+        assert list(rows["tick"]) == [1] * 10
+        assert list(rows["infector"]) == list(range(10, 20))
+        assert list(rows["infectee_age"]) == [50] * 10
+        assert list(infection_log.rows(0, 3)["infectee"]) == [5, 6, 0]
+
+    def test_save(self, tmp_path):
+        """Saved logs should hold every column and the metadata given"""
+
+        infection_log = InfectionLog()
+        infection_log.append(3, np.array([1, 2]), np.array([0, 0]), 1, np.array([4, 4]), 0, 20)
+        filename = tmp_path / "infections.npz"
+        infection_log.save(filename, strains=["Alpha", "Beta"])
+
+        with np.load(filename) as saved:
+            assert list(saved["infectee"]) == [1, 2]
+            assert list(saved["location"]) == [4, 4]
+            assert list(saved["strains"]) == ["Alpha", "Beta"]
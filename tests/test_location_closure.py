@@ -5,6 +5,7 @@ import unittest
 from ms_abmlux.agent import Agent
 from ms_abmlux.location import Location
 from ms_abmlux.utils import instantiate_class
+from ms_abmlux.world import World
 
 from ms_abmlux.messagebus import MessageBus
 
@@ -47,6 +48,7 @@ class TestLocationClosure(unittest.TestCase):
         new_intervention = instantiate_class("ms_abmlux.interventions", intervention_class,
                                              intervention_config, initial_enabled)
 
+        world = World(None)
         test_current_location = Location("Test type", (0,0))
         test_agent = Agent(40, "Luxembourg", test_current_location)
 
@@ -55,6 +57,10 @@ class TestLocationClosure(unittest.TestCase):
 
         test_new_location_1 = Location("Primary School", (2,2))
         test_new_location_2 = Location("Not a Primary School", (2,2))
+        world.add_location(test_current_location)
+        world.add_location(test_home_location)
+        world.add_location(test_new_location_1)
+        world.add_location(test_new_location_2)
 
         def test_callback(agent, home_location):
             """Test callback function"""
@@ -70,6 +76,8 @@ class TestLocationClosure(unittest.TestCase):
 
         new_intervention.bus = test_bus
         new_intervention.home_activity_type = 0
+        new_intervention.closed_types = world.location_types.mask(intervention_config['locations'],
+                                                                  register=True)
 
         assert new_intervention.handle_location_change(test_agent, test_new_location_1)
 
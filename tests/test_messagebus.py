@@ -0,0 +1,113 @@
+"""Tests the synchronous and asynchronous message buses"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ms_abmlux.messagebus import MessageBus, AsyncMessageBus
+from ms_abmlux.sim_time import SimClock
+
+class TestMessageBus:
+    """Tests delivery of events by the message buses"""
+
+    def test_consume_stops_propagation(self):
+        """A handler returning CONSUME should stop later handlers being called"""
+
+        bus = MessageBus()
+        received = []
+        bus.subscribe("topic", lambda x: received.append(("first", x)) or MessageBus.CONSUME, None)
+        bus.subscribe("topic", lambda x: received.append(("second", x)), None)
+
+        bus.publish("topic", 1)
+
+        assert received == [("first", 1)]
+
+    def test_async_delivers_in_order_before_end(self):
+        """All events should have been delivered, in order, once simulation.end returns"""
+
+        bus = AsyncMessageBus(max_queue_size=4)
+        received = []
+        bus.subscribe("topic", received.append, None)
+        bus.subscribe("simulation.end", lambda: received.append("end"), None)
+
+        for i in range(100):
+            bus.publish("topic", i)
+        bus.publish("simulation.end")
+
+        assert received == list(range(100)) + ["end"]
+        bus.close()
+
+    def test_async_delivers_on_worker_thread(self):
+        """Handlers should not run on the publishing thread"""
+
+        bus = AsyncMessageBus()
+        threads = []
+        bus.subscribe("topic", lambda: threads.append(threading.current_thread()), None)
+
+        bus.publish("topic")
+        bus.flush()
+
+        assert threads == [bus.worker]
+        bus.close()
+
+    def test_async_freezes_payloads(self):
+        """Mutating a payload after publishing it should not change what reporters receive"""
+
+        bus = AsyncMessageBus()
+        received = []
+        bus.subscribe("topic", lambda clock, counts, row: received.append((clock, counts, row)),
+                      None)
+
+        clock  = SimClock(600, 10, datetime(2020, 2, 23))
+        counts = {"SUSCEPTIBLE": 10}
+        row    = [1, 2]
+        next(clock)
+        bus.publish("topic", clock, counts, row)
+        next(clock)
+        counts["SUSCEPTIBLE"] = 9
+        row.append(3)
+        bus.flush()
+
+        snapshot, frozen_counts, frozen_row = received[0]
+        assert snapshot.t == 0
+        assert snapshot.iso8601() == "02/23/2020T00:00:00 "
+        assert frozen_counts["SUSCEPTIBLE"] == 10
+        assert list(frozen_row) == [1, 2]
+        with pytest.raises(TypeError):
+            frozen_counts["SUSCEPTIBLE"] = 0
+        bus.close()
+
+    def test_async_freezes_arrays_and_nested_payloads(self):
+        """Arrays, and containers within containers, should be copied when published"""
+
+        bus = AsyncMessageBus()
+        received = []
+        bus.subscribe("topic", received.append, None)
+
+        columns = {"tick": np.arange(3), "rows": [[1, 2]]}
+        bus.publish("topic", columns)
+        columns["tick"][0] = 9
+        columns["rows"][0].append(3)
+        bus.flush()
+
+        frozen = received[0]
+        assert list(frozen["tick"]) == [0, 1, 2]
+        assert frozen["rows"] == ((1, 2), )
+        with pytest.raises(ValueError):
+            frozen["tick"][0] = 9
+        bus.close()
+
+    def test_async_reraises_handler_errors(self):
+        """Exceptions in handlers should surface in the publishing thread"""
+
+        bus = AsyncMessageBus()
+
+        def broken_handler():
+            raise ValueError("broken")
+        bus.subscribe("simulation.end", broken_handler, None)
+
+        with pytest.raises(RuntimeError):
+            bus.publish("simulation.end")
+        bus.close()
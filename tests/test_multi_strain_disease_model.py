@@ -0,0 +1,643 @@
+"""Tests the multi-strain disease model"""
+
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ms_abmlux.activity_model.routines import RunLengthRoutines
+from ms_abmlux.agent import Agent
+from ms_abmlux.config import Config
+from ms_abmlux.location import Location
+from ms_abmlux.messagebus import MessageBus
+from ms_abmlux.sim_time import SimClock
+from ms_abmlux.random_tools import Random
+from ms_abmlux.world import World
+from ms_abmlux.disease_model.multi_strain_disease_model import MultiStrainDiseaseModel
+from ms_abmlux.disease_model.transmission import ShardedTransmission, force_of_infection
+from ms_abmlux.disease_model.daily_step_disease_model import DailyStepDiseaseModel
+
+HEALTH_STATES = ['SUSCEPTIBLE', 'EXPOSED', 'INFECTED', 'DEAD']
+SUSCEPTIBLE, EXPOSED, INFECTED, DEAD = range(len(HEALTH_STATES)) # As coded by the model
+
+def make_config(strain_names=("Alpha", ), num_initial_cases=0, profiles=None,
+                transmission_probability=0.5, distribution_by_age=None, step_size=200, **extra):
+    """Return a disease model config with the same disease profiles for each strain, by default
+    a single fixed profile"""
+
+    profiles = profiles or {'SEIS': ['None', ['C', [2]], ['C', [3]], 'None']}
+    distribution_by_age = distribution_by_age or {0: [1 / len(profiles)] * len(profiles)}
+    strains = {}
+    for name in strain_names:
+        strains[name] = {'num_initial_cases': num_initial_cases,
+                         'transmission_probability': {'EXPOSED': 0.0,
+                                                      'INFECTED': transmission_probability},
+                         'disease_profile_list': list(profiles.keys()),
+                         'disease_profile_distribution_by_age': distribution_by_age,
+                         'step_size': step_size,
+                         'durations_by_profile': profiles}
+    identity = {s1: {s2: float(s1 == s2) for s2 in strain_names} for s1 in strain_names}
+    return Config(_dict={'__prng_seed__': 1,
+                         'no_transmission_locations': ['Outdoor'],
+                         'reduced_transmission_locations': ['Hospital'],
+                         'reduced_transmission_factor': 0.5,
+                         'region': 'Luxembourg',
+                         'health_states': HEALTH_STATES,
+                         'susceptible_state': 'SUSCEPTIBLE',
+                         'infected_states': ['EXPOSED', 'INFECTED'],
+                         'dead_state': 'DEAD',
+                         'strains': strains,
+                         'mutation_matrix': identity,
+                         'immunity_matrix': identity,
+                         **extra})
+
+def make_world(num_agents=20, location_types=("House", )):
+    """Return a world with agents spread evenly over one location of each type given"""
+
+    world = World(None)
+    for typ in location_types:
+        world.add_location(Location(typ, (4000000 + len(world.locations), 3000000)))
+    for i in range(num_agents):
+        agent = Agent(30, 'Luxembourg')
+        agent.set_location(world.locations[i % len(world.locations)])
+        world.add_agent(agent)
+    return world
+
+class FakeSim:
+    """The parts of the Simulator used by the disease model.
+
+    As in the Simulator, requests are enacted at the end of each tick and notifications of them
+    are published at the start of the next."""
+
+    def __init__(self, world, clock):
+        self.world = world
+        self.clock = clock
+        self.bus   = MessageBus()
+        self.health_updates = {}
+        self.notifications  = []
+        self.bus.subscribe("request.agent.health", self.record_health_change, self)
+
+    def record_health_change(self, agent, new_health):
+        """Queue health changes until the end of the tick"""
+        self.health_updates[agent] = new_health
+        return MessageBus.CONSUME
+
+    def start(self, disease_model):
+        """Initialise the disease model and index attendees by health"""
+        disease_model.init_sim(self)
+        self.attendees_by_health = {l: defaultdict(list) for l in self.world.locations}
+        for agent in self.world.agents:
+            self.attendees_by_health[agent.current_location][agent.health].append(agent)
+
+    def tick(self, t):
+        """Run one tick of the simulation"""
+        for topic, *params in self.notifications:
+            self.bus.publish(topic, *params)
+        self.bus.publish("notify.time.tick", self.clock, t)
+
+        updates, self.health_updates, self.notifications = self.health_updates, {}, []
+        for agent, new_health in updates.items():
+            self.attendees_by_health[agent.current_location][agent.health].remove(agent)
+            old_health = agent.health
+            agent.set_health(new_health)
+            self.attendees_by_health[agent.current_location][agent.health].append(agent)
+            self.notifications.append(("notify.agent.health", agent, old_health))
+
+def loop_force_of_infection(model, sim):
+    """Return the probability of infection at each location, computed one location at a time as
+    the transmission loop used to"""
+
+    probabilities = {}
+    for location in sim.world.locations:
+        if location.typ not in model.no_transmission_locations:
+            infected = [a for h in model.infected_states
+                        for a in sim.attendees_by_health[location][h]]
+            if len(infected) > 0:
+                if location.typ in model.reduced_transmission_locations:
+                    r_t_f = model.reduced_transmission_factor
+                else:
+                    r_t_f = 1
+                probabilities[location] = 1 - np.prod([1 - r_t_f * model.infectiousness[
+                                                        model.agent_index[a]] for a in infected])
+    return probabilities
+
+def make_model(config, world, days=30):
+    """Return a disease model and a started fake simulation driving it"""
+
+    clock = SimClock(86400, days, "1st March 2020")
+    model = MultiStrainDiseaseModel(config, world, clock)
+    sim   = FakeSim(world, clock)
+    sim.start(model)
+    return model, sim
+
+def make_daily_model(config, world, routine):
+    """Return a daily step disease model and a started fake simulation driving it, with every
+    agent following the daily routine given, in ticks of ten minutes, and performing activity a at
+    the location of index a in the world"""
+
+    for agent in world.agents:
+        for activity, location in enumerate(world.locations):
+            agent.add_activity_location(activity, location)
+
+    clock = SimClock(86400, 30, "1st March 2020")
+    model = DailyStepDiseaseModel(config, world, clock)
+    sim   = FakeSim(world, clock)
+    sim.activity_model = SimpleNamespace(routines=RunLengthRoutines.encode(
+                                             np.array([routine * 7], dtype=np.uint8)),
+                                         routine_by_agent=np.zeros(len(world.agents), dtype=int))
+    sim.start(model)
+    return model, sim
+
+class TestMultiStrainDiseaseModel:
+    """Tests the multi-strain disease model"""
+
+    def test_progression_follows_durations(self):
+        """Agents should leave each state at the first tick after its duration has elapsed"""
+
+        # One agent is infected at the start, and exposes the other outdoors, where no transmission
+        # occurs otherwise
+        world = make_world(num_agents=2, location_types=("Outdoor", ))
+        model, sim = make_model(make_config(num_initial_cases=1), world)
+        infector = next(i for i, a in enumerate(world.agents) if model.infections.get(a))
+        agent    = world.agents[1 - infector]
+
+        history = []
+        for t in sim.clock:
+            if t == 1:
+                # pylint: disable=protected-access
+                model._expose(np.array([1 - infector]), np.array([infector]))
+            sim.tick(t)
+            history.append(agent.health)
+
+        # Infected during t=1 and notified at t=2.  E lasts 2 days and I lasts 3 days, with each
+        # transition requested at the first tick after the duration has elapsed
+        assert history == [SUSCEPTIBLE] + [EXPOSED] * 4 + [INFECTED] * 5 \
+                          + [SUSCEPTIBLE] * 20
+        assert model.immune[1 - infector, 0]
+        assert model.infections[agent] is None
+        assert list(model.infection_log.rows()["infector"]) == [-1, infector]
+
+    def test_renewed_immunity_supersedes_earlier_loss(self):
+        """Renewing immunity should postpone its loss, leaving the earlier entry to be skipped"""
+
+        world = make_world(num_agents=1)
+        model, sim = make_model(make_config(), world)
+        agent, strain = world.agents[0], model.strains[0]
+        # pylint: disable=protected-access
+
+        sim.clock.t = 0
+        model._gain_immunity(agent, [strain], 3)
+        sim.clock.t = 2
+        model._gain_immunity(agent, ["Alpha"], 3)
+
+        model._process_immunity_loss(3)
+        assert model.immune[0, 0]
+        model._process_immunity_loss(5)
+        assert not model.immune[0, 0]
+        assert not model.immunity_loss_queue
+
+    def test_bulk_immunity_follows_immunity_matrix(self):
+        """Granting immunity in bulk should confer cross-immunity per agent, and expire"""
+
+        world = make_world(num_agents=2000)
+        config = make_config(strain_names=("Alpha", "Beta"))
+        config['immunity_matrix']['Alpha']['Beta'] = 0.5
+        model, sim = make_model(config, world)
+        # pylint: disable=protected-access
+
+        sim.bus.publish("request.agents.gain_immunity", world.agents[:1000], ["Alpha"], 4)
+
+        assert model.immune[:1000, 0].all()
+        assert not model.immune[1000:].any()
+        assert abs(model.immune[:1000, 1].mean() - 0.5) < 0.05
+        model._process_immunity_loss(3)
+        assert model.immune[:1000, 0].all()
+        model._process_immunity_loss(4)
+        assert not model.immune.any()
+
+    def test_infected_counts_match_recount(self):
+        """Reported infected counts should match a recount of infected agents every tick"""
+
+        world = make_world(num_agents=60, location_types=("House", "Hospital"))
+        world.agents[0].region = 'Elsewhere'
+        clock = SimClock(86400, 30, "1st March 2020")
+        model = MultiStrainDiseaseModel(make_config(strain_names=("Alpha", "Beta"),
+                                                    num_initial_cases=3), world, clock)
+        telemetry_bus = MessageBus()
+        model.set_telemetry_bus(telemetry_bus)
+        sim = FakeSim(world, clock)
+        sim.start(model)
+
+        rows = []
+        def recount(clock, row):
+            infected = [a for a in world.agents if a.health in model.infected_states]
+            expected = [len([a for a in infected if model.infections[a] == s])
+                        for s in model.strains]
+            expected += [len([a for a in infected if model.infections[a] == s
+                              and a.region == model.region]) for s in model.strains]
+            rows.append((row, expected))
+            assert [model.susceptible_counts[model.location_index[l]] for l in world.locations] \
+                   == [len(sim.attendees_by_health[l][SUSCEPTIBLE]) for l in world.locations]
+            locations = model.agent_locations
+            assert np.array_equal(model.occupancy, np.bincount(locations, minlength=2))
+            assert np.array_equal(model.infectious_counts,
+                                  np.bincount(locations[model.infectiousness > 0], minlength=2))
+            assert np.allclose(model.infectiousness_sums,
+                               np.bincount(locations, weights=model.infectiousness, minlength=2))
+        telemetry_bus.subscribe("strain_counts.update", recount, None)
+
+        for t in sim.clock:
+            sim.tick(t)
+
+        assert len(rows) == 30
+        assert all(row == expected for row, expected in rows)
+        assert sum(model.cumulative_cases_by_strain.values()) > 6
+
+    def test_infection_log(self):
+        """Every infection should be logged once, reported the tick it happens, with an infector
+        who was infectious at the same location"""
+
+        world = make_world(num_agents=200, location_types=("House", "Hospital"))
+        clock = SimClock(86400, 30, "1st March 2020")
+        model = MultiStrainDiseaseModel(make_config(strain_names=("Alpha", "Beta"),
+                                                    num_initial_cases=3), world, clock)
+        telemetry_bus = MessageBus()
+        model.set_telemetry_bus(telemetry_bus)
+        updates = []
+        telemetry_bus.subscribe("infection_log.update",
+                                lambda clock, infections: updates.append((clock.t, infections)),
+                                None)
+        sim = FakeSim(world, clock)
+        sim.start(model)
+
+        infectious = set()
+        for t in sim.clock:
+            infectious = {a for a in world.agents if a.health == INFECTED}
+            sim.tick(t)
+            if len(updates) > 0 and updates[-1][0] == t:
+                infections = updates[-1][1]
+                assert (infections["tick"] == t).all()
+                for infectee, infector, location in zip(infections["infectee"],
+                                                        infections["infector"],
+                                                        infections["location"]):
+                    if infector >= 0:
+                        assert world.agents[infectee].health == EXPOSED
+                        assert world.agents[infector] in infectious
+                        assert world.agents[infector].current_location is world.locations[location]
+
+        assert sum(len(infections["tick"]) for _, infections in updates) \
+               == len(model.infection_log) == sum(model.cumulative_cases_by_strain.values())
+        initial = model.infection_log.rows()["infector"] == -1
+        assert initial.sum() == 6
+        assert (model.infection_log.rows()["tick"][initial] == 0).all()
+
+    def test_shard_partition_follows_moves(self):
+        """Agents should stay partitioned by the shard of their location as they move"""
+
+        rng = np.random.default_rng(1)
+        agent_locations = rng.integers(10, size=200)
+        transmission = ShardedTransmission(4, 0, 1, agent_locations, np.zeros(200, dtype=np.int8),
+                                           np.zeros(200), np.ones(10), 0)
+
+        for row, new_location in zip(rng.integers(200, size=1000), rng.integers(10, size=1000)):
+            transmission.move(row, agent_locations[row], new_location)
+            agent_locations[row] = new_location
+
+        starts = transmission.shard_starts
+        for i, first, last, _ in transmission.shards:
+            agents = transmission.shard_agents[starts[i]:starts[i + 1]]
+            assert set(agents) == set(np.flatnonzero((agent_locations >= first)
+                                                     & (agent_locations < last)))
+        assert np.array_equal(transmission.shard_agents[transmission.positions], np.arange(200))
+
+    def test_sharded_transmission_independent_of_workers(self):
+        """Sharded transmission should infect the same agents whether shards are evaluated in
+        this process or divided between workers"""
+
+        world = make_world(num_agents=300, location_types=("House", "Hospital", "School"))
+        logs = []
+        for num_workers in [0, 2]:
+            config = make_config(strain_names=("Alpha", "Beta"), num_initial_cases=5,
+                                 transmission_probability=0.1, transmission_shards=3,
+                                 transmission_workers=num_workers)
+            model, sim = make_model(config, world, days=20)
+            for t in sim.clock:
+                sim.tick(t)
+            model.stop_transmission(sim)
+            logs.append(model.infection_log.rows())
+
+        assert len(logs[0]["tick"]) > 10
+        for column in logs[0]:
+            assert np.array_equal(logs[0][column], logs[1][column])
+
+    def test_sharded_transmission_refuses_households(self):
+        """Household blocks are not computed by shards, so asking for both should be refused"""
+
+        config = make_config(transmission_shards=2, household_location_types=['House'])
+        with pytest.raises(ValueError, match="household_location_types"):
+            MultiStrainDiseaseModel(config, make_world(), SimClock(86400, 30, "1st March 2020"))
+
+    def test_sharded_transmission_refuses_mean_field(self):
+        """Shards compute exact probabilities everywhere, so asking for the mean-field
+        approximation as well should be refused rather than ignored"""
+
+        config = make_config(transmission_shards=2, mean_field_threshold=5)
+        with pytest.raises(ValueError, match="mean_field_threshold"):
+            MultiStrainDiseaseModel(config, make_world(), SimClock(86400, 30, "1st March 2020"))
+
+    def test_profiles_independent_of_other_strains(self):
+        """An agent's profile and durations for a strain should not depend on when they are drawn
+        or on which other strains are modelled"""
+
+        profiles = {'SEIS': ['None', ['G', [4, 0.75]], ['U', [2, 9]], 'None'],
+                    'SEIDS': ['None', ['E', [3]], ['C', [3]], ['G', [2, 1]], 'None']}
+        world = make_world(num_agents=50)
+        clock = SimClock(86400, 30, "1st March 2020")
+        alone = MultiStrainDiseaseModel(make_config(("Alpha", ), profiles=profiles), world, clock)
+        both  = MultiStrainDiseaseModel(make_config(("Alpha", "Beta"), profiles=profiles), world,
+                                        clock)
+        # pylint: disable=protected-access
+
+        alpha_alone, alpha_both, beta = alone.strains[0], both.strains[0], both.strains[1]
+        for agent in world.agents:
+            both._sample_profile(agent, beta)
+        for agent in reversed(world.agents):
+            assert alone._sample_profile(agent, alpha_alone) == \
+                   both._sample_profile(agent, alpha_both)
+        assert both.profile_catalogue == [(SUSCEPTIBLE, EXPOSED, INFECTED, SUSCEPTIBLE),
+                                          (SUSCEPTIBLE, EXPOSED, INFECTED, DEAD,
+                                           SUSCEPTIBLE)]
+
+    def test_sampled_profiles_follow_distribution(self):
+        """Profiles should be drawn with the weights for each age bracket"""
+
+        profiles = {'SEIS': ['None', ['U', [2, 5]], ['C', [1]], 'None'],
+                    'SEIDS': ['None', ['C', [1]], ['C', [1]], ['C', [1]], 'None']}
+        world = make_world(num_agents=10000)
+        for agent in world.agents[8000:]:
+            agent.age = 60
+        model = MultiStrainDiseaseModel(make_config(profiles=profiles,
+                                                    distribution_by_age={0: [0.25, 0.75],
+                                                                         50: [1, 0]},
+                                                    step_size=50),
+                                        world, SimClock(86400, 30, "1st March 2020"))
+        strain = model.strains[0]
+        # pylint: disable=protected-access
+        samples = [model._sample_profile(agent, strain) for agent in world.agents]
+
+        # Profiles are catalogued in the order of durations_by_profile: SEIS then SEIDS
+        assert abs(np.mean([p == 1 for p, _ in samples[:8000]]) - 0.75) < 0.02
+        assert all(p == 0 for p, _ in samples[8000:])
+        assert {d[1] for p, d in samples if p == 0} == {2, 3, 4}
+        assert all(d[0] is None and d[-1] is None for _, d in samples)
+
+    def test_force_of_infection_matches_loop(self):
+        """The vectorised force of infection used by transmission should match the per-location
+        product"""
+
+        world = make_world(num_agents=300, location_types=("House", "Hospital", "Outdoor") * 4)
+        model, sim = make_model(make_config(num_initial_cases=60, transmission_probability=0.05),
+                                world)
+
+        present, probabilities, _, _ = force_of_infection(np.flatnonzero(model.infectiousness > 0),
+                                                          model.agent_locations,
+                                                          model.infectiousness,
+                                                          model.location_factors)
+        expected = loop_force_of_infection(model, sim)
+
+        assert [model.locations[l] for l in present] == list(expected)
+        assert np.allclose(probabilities, list(expected.values()))
+
+    def test_transmission_factors_by_location_type(self):
+        """Factors given by location type should override the no and reduced transmission lists"""
+
+        world = make_world(num_agents=4, location_types=("House", "Hospital", "Outdoor", "School"))
+        model, _ = make_model(make_config(transmission_factors={'School': 1.5, 'Outdoor': 0.1}),
+                              world)
+
+        assert list(model.location_factors) == [1.0, 0.5, 0.1, 1.5]
+
+    def test_transmission_factors_validated(self):
+        """Factors which are negative or scale a transmission probability to 1 or more should be
+        refused, naming the location type and strain"""
+
+        world = make_world()
+        clock = SimClock(86400, 30, "1st March 2020")
+        for factors, message in (({'School': -0.1}, "School"),
+                                 ({'School': 2.0}, "School.*Alpha"),
+                                 ({'Hospital': 4.0}, "Hospital.*Alpha")):
+            with pytest.raises(ValueError, match=message):
+                MultiStrainDiseaseModel(make_config(transmission_factors=factors), world, clock)
+        with pytest.raises(ValueError, match="Alpha"):
+            MultiStrainDiseaseModel(make_config(transmission_probability=1.0), world, clock)
+
+    def test_new_exposures_match_loop_distribution(self):
+        """New exposures drawn in one binomial call should follow the same distribution as draws
+        made location by location"""
+
+        world = make_world(num_agents=300, location_types=("House", "Hospital", "Outdoor") * 4)
+        model, sim = make_model(make_config(num_initial_cases=60, transmission_probability=0.01),
+                                world)
+        probabilities = loop_force_of_infection(model, sim)
+        susceptibles  = {l: len(sim.attendees_by_health[l][SUSCEPTIBLE]) for l in probabilities}
+        # pylint: disable=protected-access
+
+        vectorised, looped = [], []
+        for seed in range(600):
+            model.prng, sim.health_updates = Random(seed), {}
+            model._transmit()
+            vectorised.append(len(sim.health_updates))
+
+            prng = Random(seed)
+            looped.append(sum(prng.binomial(susceptibles[l], p) for l, p in probabilities.items()))
+
+        mean = sum(susceptibles[l] * p for l, p in probabilities.items())
+        standard_error = (np.var(looped) / len(looped)) ** 0.5
+        assert abs(np.mean(vectorised) - mean) < 4 * standard_error
+        assert abs(np.mean(looped) - mean) < 4 * standard_error
+        assert 0.8 < np.var(vectorised) / np.var(looped) < 1.25
+
+    def test_household_exposures_match_loop_distribution(self):
+        """Exposures drawn for households in one block should follow the same distribution as
+        draws made location by location, with infectors from the same household"""
+
+        world = make_world(num_agents=160, location_types=("House", ) * 40)
+        occupants = defaultdict(list)
+        for agent in world.agents:
+            occupants[agent.current_location].append(agent)
+        world.agents[0].set_location(world.locations[1])
+        config = make_config(num_initial_cases=40, transmission_probability=0.2,
+                             household_location_types=["House"])
+        clock = SimClock(86400, 30, "1st March 2020")
+        model = MultiStrainDiseaseModel(config, world, clock)
+        sim   = FakeSim(world, clock)
+        sim.housing_model = SimpleNamespace(occupants=occupants)
+        sim.start(model)
+        probabilities = loop_force_of_infection(model, sim)
+        susceptibles  = {l: len(sim.attendees_by_health[l][SUSCEPTIBLE]) for l in probabilities}
+        # pylint: disable=protected-access
+
+        assert list(np.flatnonzero(model.visitor_counts)) == [1]
+        exposures = []
+        for seed in range(600):
+            model.prng, sim.health_updates = Random(seed), {}
+            model._transmit()
+            exposures.append(len(sim.health_updates))
+            for agent in sim.health_updates:
+                assert agent.health == SUSCEPTIBLE
+        infections = model.infection_log.rows()
+        infectors  = model.agent_locations[infections["infector"][infections["infector"] >= 0]]
+        assert np.array_equal(infectors, infections["location"][infections["infector"] >= 0])
+
+        mean = sum(susceptibles[l] * p for l, p in probabilities.items())
+        variance = sum(susceptibles[l] * p * (1 - p) for l, p in probabilities.items())
+        assert abs(np.mean(exposures) - mean) < 4 * (variance / len(exposures)) ** 0.5
+
+    def test_mean_field_exposures_follow_total_infectiousness(self):
+        """Exposures at locations above the occupancy threshold should follow the mean-field
+        probability of infection, with infectors present at the same location"""
+
+        world = make_world(num_agents=400, location_types=("School", "House", "School", "House"))
+        config = make_config(num_initial_cases=40, transmission_probability=0.01,
+                             mean_field_threshold=50)
+        model, sim = make_model(config, world)
+        exact = loop_force_of_infection(model, sim)
+        # pylint: disable=protected-access
+
+        schools = [world.locations[0], world.locations[2]]
+        mean_field = {l: 1 - np.exp(-model.infectiousness_sums[model.location_index[l]])
+                      for l in schools}
+        assert all(mean_field[l] < exact[l] for l in schools)
+
+        probabilities = {**exact, **mean_field}
+        susceptibles  = {l: len(sim.attendees_by_health[l][SUSCEPTIBLE]) for l in probabilities}
+        exposures = []
+        for seed in range(600):
+            model.prng, sim.health_updates = Random(seed), {}
+            model._transmit()
+            exposures.append(len(sim.health_updates))
+        infections = model.infection_log.rows()
+        infected   = infections["infector"] >= 0
+        assert np.array_equal(model.agent_locations[infections["infector"][infected]],
+                              infections["location"][infected])
+
+        mean = sum(susceptibles[l] * p for l, p in probabilities.items())
+        variance = sum(susceptibles[l] * p * (1 - p) for l, p in probabilities.items())
+        assert abs(np.mean(exposures) - mean) < 4 * (variance / len(exposures)) ** 0.5
+
+    def test_mutation_frequencies_match_matrix(self):
+        """Strains passed on by exposure should be drawn with the frequencies in the mutation
+        matrix"""
+
+        matrix = {'Alpha': {'Alpha': 0.7, 'Beta': 0.2, 'Gamma': 0.1},
+                  'Beta':  {'Alpha': 0.0, 'Beta': 0.5, 'Gamma': 0.5},
+                  'Gamma': {'Alpha': 0.0, 'Beta': 0.0, 'Gamma': 1.0}}
+        world = make_world(num_agents=10001)
+        model, _ = make_model(make_config(("Alpha", "Beta", "Gamma"), mutation_matrix=matrix),
+                              world)
+        # pylint: disable=protected-access
+
+        # The first agent infects all the others with each strain in turn
+        exposed = np.arange(1, 10001)
+        for source, name in enumerate(("Alpha", "Beta", "Gamma")):
+            model.infections[world.agents[0]] = model.strains[source]
+            model._expose(exposed, np.zeros(10000, dtype=np.intp))
+            mutated = model.infection_log.rows()["strain"][-10000:]
+            frequencies = np.bincount(mutated, minlength=3) / 10000
+            assert np.allclose(frequencies, list(matrix[name].values()), atol=0.02)
+
+def mean_phase_lengths(model, world):
+    """Return the mean time, in days, that agents infected with the model's first strain spend in
+    each phase of the profile, including immunity as the last phase, as scheduled by the model"""
+
+    # pylint: disable=protected-access
+    ticks_per_day = model.clock.days_to_ticks(1)
+    lengths = []
+    for agent in world.agents:
+        model._assign_profile(agent, model.strains[0])
+        row, phases = model.agent_index[agent], len(model._profile(agent))
+        agent_lengths = []
+        for phase in range(1, phases - 1):
+            model.disease_phases[row] = phase
+            model.progression_events.clear()
+            model._schedule_progression(agent, 0)
+            agent_lengths.append(next(iter(model.progression_events)))
+        agent_lengths.append(model._duration(agent, phases - 1))
+        lengths.append(agent_lengths)
+    return np.mean(lengths, axis=0) / ticks_per_day
+
+class TestDailyStepDiseaseModel:
+    """Tests the daily step disease model"""
+
+    def test_phase_lengths_match_full_model(self):
+        """Phases and immunity should last as long on average as with ticks of ten minutes, rather
+        than half a day longer"""
+
+        profiles = {'SEIS': ['None', ['G', [4, 0.75]], ['G', [9, 0.5]], ['E', [30]]]}
+        world  = make_world(num_agents=4000)
+        config = make_config(profiles=profiles)
+        full   = MultiStrainDiseaseModel(config, world, SimClock(600, 30, "1st March 2020"))
+        daily  = DailyStepDiseaseModel(config, world, SimClock(86400, 30, "1st March 2020"))
+
+        full_lengths, daily_lengths = mean_phase_lengths(full, world), \
+                                      mean_phase_lengths(daily, world)
+        assert np.allclose(full_lengths, [3, 4.5, 30], rtol=0.05)
+        assert np.allclose(daily_lengths, full_lengths, atol=0.03)
+
+    def test_needs_daily_ticks(self):
+        """The model should refuse to run on ticks shorter than a day"""
+
+        with pytest.raises(ValueError):
+            DailyStepDiseaseModel(make_config(), make_world(), SimClock(600, 30, "1st March 2020"))
+
+    def test_refuses_tick_transmission_options(self):
+        """Options of the tick-by-tick transmission path should be refused rather than ignored"""
+
+        for option in ({'transmission_shards': 2}, {'transmission_workers': 2},
+                       {'household_location_types': ['House']}, {'mean_field_threshold': 5}):
+            with pytest.raises(ValueError, match=next(iter(option))):
+                DailyStepDiseaseModel(make_config(**option), make_world(),
+                                      SimClock(86400, 30, "1st March 2020"))
+
+    def test_exposures_follow_time_together(self):
+        """Agents together all day should be infected with probability 1 - exp(-T p), for T
+        ticks a day and infectiousness p per tick"""
+
+        world  = make_world(num_agents=2000)
+        config = make_config(num_initial_cases=1, transmission_probability=0.001)
+        model, sim = make_daily_model(config, world, [0] * 144)
+        # pylint: disable=protected-access
+
+        exposures = []
+        for seed in range(100):
+            model.prng, sim.health_updates = Random(seed), {}
+            model._transmit()
+            exposures.append(len(sim.health_updates))
+        infections = model.infection_log.rows()
+        assert np.all(infections["location"][infections["infector"] >= 0] == 0)
+        assert np.all(model.infectiousness[infections["infector"][infections["infector"] >= 0]] > 0)
+
+        p = 1 - np.exp(-144 * 0.001)
+        assert abs(np.mean(exposures) - 1999 * p) < 4 * (1999 * p * (1 - p) / 100) ** 0.5
+
+    def test_no_transmission_between_agents_apart(self):
+        """Agents at the same location at different times of day should only infect one another
+        if the day is not divided into blocks"""
+
+        for blocks_per_day, expect_exposures in ((24, False), (1, True)):
+            world  = make_world(num_agents=400, location_types=("House", "Work"))
+            config = make_config(num_initial_cases=1, transmission_probability=0.01,
+                                 blocks_per_day=blocks_per_day)
+            model, sim = make_daily_model(config, world, [0] * 72 + [1] * 72)
+            # pylint: disable=protected-access
+
+            # The infectious agent is at work while everyone else is at home, and vice versa
+            infectious = model.infectiousness > 0
+            routines = RunLengthRoutines.encode(np.array([([0] * 72 + [1] * 72) * 7,
+                                                          ([1] * 72 + [0] * 72) * 7],
+                                                         dtype=np.uint8))
+            model._build_contact_weights(SimpleNamespace(
+                routines=routines, routine_by_agent=np.asarray(infectious, dtype=int)))
+            model._transmit()
+            assert (len(sim.health_updates) > 0) == expect_exposures
@@ -1,6 +1,8 @@
 """Tests the random tools"""
 
-from ms_abmlux.random_tools import Random
+import numpy as np
+
+from ms_abmlux.random_tools import Random, alias_table
 
 class TestRandomTools:
     """Tests the random tools uses in the model"""
@@ -33,3 +35,85 @@ class TestRandomTools:
 
         for _ in range(10):
             assert random_test.random_choice(items) in items
+
+    def test_booleans(self):
+        """Tests the array boolean function"""
+
+        random_test = Random(4)
+
+        assert random_test.booleans(1, 10).all()
+        assert not random_test.booleans(0, 10).any()
+        assert abs(random_test.booleans(0.3, 10000).mean() - 0.3) < 0.02
+
+    def test_independent_booleans(self):
+        """Tests the array boolean function with a probability for each element"""
+
+        random_test = Random(4)
+        results = random_test.independent_booleans(np.tile([0, 0.3, 1], 10000)).reshape(-1, 3)
+
+        assert not results[:, 0].any()
+        assert results[:, 2].all()
+        assert abs(results[:, 1].mean() - 0.3) < 0.02
+
+    def test_random_indices(self):
+        """Tests the uniform choice of an index below each size given"""
+
+        random_test = Random(4)
+        indices = random_test.random_indices(np.tile([1, 4], 10000)).reshape(-1, 2)
+
+        assert (indices[:, 0] == 0).all()
+        assert set(indices[:, 1]) == {0, 1, 2, 3}
+        assert abs((indices[:, 1] == 3).mean() - 0.25) < 0.02
+
+    def test_cumulative_choices(self):
+        """Tests the cumulative weights choice function"""
+
+        random_test = Random(4)
+        choices = random_test.cumulative_choices([1, 1, 4, 10], 10000)
+
+        assert set(choices) == {0, 2, 3}
+        assert abs((choices == 3).mean() - 0.6) < 0.02
+
+    def test_grouped_cumulative_choices(self):
+        """Tests choosing by cumulative weights within groups of items"""
+
+        random_test = Random(4)
+        cum_weights = np.cumsum([1, 3, 0, 2, 2, 5])
+        firsts = np.array([0] * 10000 + [2] * 10000 + [5] * 10)
+        lasts  = np.array([2] * 10000 + [5] * 10000 + [6] * 10)
+        choices = random_test.grouped_cumulative_choices(cum_weights, firsts, lasts)
+
+        assert set(choices[:10000]) == {0, 1}
+        assert abs((choices[:10000] == 1).mean() - 0.75) < 0.02
+        assert set(choices[10000:20000]) == {3, 4}
+        assert np.all(choices[20000:] == 5)
+
+    def test_grouped_sample(self):
+        """Tests sampling without replacement within groups of items"""
+
+        random_test = Random(4)
+        groups = np.array([0, 0, 0, 2, 2, 3, 3, 3, 3])
+        sample_sizes = np.array([2, 5, 2, 0])
+        counts = np.zeros(len(groups))
+        for _ in range(3000):
+            selected = random_test.grouped_sample(groups, sample_sizes)
+            assert len(set(selected)) == len(selected)
+            assert list(np.bincount(groups[selected], minlength=4)) == [2, 0, 2, 0]
+            counts[selected] += 1
+
+        assert np.allclose(counts[:5] / 3000, [2 / 3] * 3 + [1, 1], atol=0.03)
+
+    def test_alias_choices(self):
+        """Tests sampling from alias tables"""
+
+        weights = [[0.1, 0.6, 0, 0.3], [0, 0, 1, 0]]
+        tables  = [alias_table(w) for w in weights]
+        rows    = np.array([0] * 20000 + [1] * 1000)
+        random_test = Random(4)
+
+        choices = random_test.alias_choices(np.array([p for p, _ in tables])[rows],
+                                            np.array([a for _, a in tables])[rows])
+
+        frequencies = np.bincount(choices[:20000], minlength=4) / 20000
+        assert np.allclose(frequencies, weights[0], atol=0.01)
+        assert np.all(choices[20000:] == 2)
@@ -0,0 +1,47 @@
+"""Tests the registry of named types"""
+
+import pytest
+
+from ms_abmlux.registry import Registry
+
+class TestRegistry:
+    """Tests the conversion of named types to ints and bitmasks"""
+
+    def test_ints_assigned_in_order_of_registration(self):
+        """Names are coded by their order of registration, and re-registering is idempotent"""
+
+        registry = Registry(["SUSCEPTIBLE", "EXPOSED"])
+        assert registry.register("INFECTED") == 2
+        assert registry.register("EXPOSED") == 1
+        assert len(registry) == 3
+        assert registry.types_as_str() == ["SUSCEPTIBLE", "EXPOSED", "INFECTED"]
+        assert registry.types_as_int() == [0, 1, 2]
+
+    def test_conversion(self):
+        """Either representation converts to the other, and to itself"""
+
+        registry = Registry(["House", "Hospital"])
+        assert registry.as_int("Hospital") == 1
+        assert registry.as_int(1) == 1
+        assert registry.as_str(0) == "House"
+        assert registry.as_str("House") == "House"
+
+    def test_mask(self):
+        """Masks contain exactly the types given, registering any not yet seen only if asked"""
+
+        registry = Registry(["House", "Hospital", "Cemetery"])
+        mask = registry.mask(["House", "Cemetery", "Restaurant"], register=True)
+        assert [(mask >> i) & 1 for i in range(len(registry))] == [1, 0, 1, 1]
+        assert registry.as_str(3) == "Restaurant"
+        assert registry.mask("Hospital") == registry.mask([1]) == 0b10
+        assert registry.mask([]) == 0
+
+    def test_mask_refuses_unknown_names(self):
+        """A mistyped name should raise rather than register a new type"""
+
+        registry = Registry(["SUSCEPTIBLE", "INFECTED"])
+        with pytest.raises(KeyError, match="INFECTD"):
+            registry.mask(["SUSCEPTIBLE", "INFECTD"])
+        with pytest.raises(KeyError):
+            registry.mask("EXPOSED")
+        assert registry.types_as_str() == ["SUSCEPTIBLE", "INFECTED"]
@@ -0,0 +1,77 @@
+"""Tests the on-disk cache of compiled weekly routines"""
+
+import numpy as np
+
+from ms_abmlux.activity_model.routine_cache import (routine_cache_key, routine_cache_path,
+                                                    load_routines, save_routines)
+
+ACTIVITY_CODE_MAP = {"House": {"primary": [1], "secondary": [11, 12]},
+                     "Work":  {"primary": [2]}}
+ACTIVITIES        = ["House", "Work"]
+BORDER_ROUTINE    = [0, 1, 0]
+
+class TestRoutineCache:
+    """Tests the keying, saving and loading of cached routines"""
+
+    def make_tus(self, tmp_path, contents="id_jour,heuredebmin\n1,0\n"):
+        """Write a time use survey file, returning its path"""
+
+        filename = tmp_path / "TUS.csv"
+        filename.write_text(contents)
+        return str(filename)
+
+    def test_key_is_stable(self, tmp_path):
+        """The same inputs give the same key, whatever the order of the activity mapping"""
+
+        tus          = self.make_tus(tmp_path)
+        reversed_map = dict(reversed(list(ACTIVITY_CODE_MAP.items())))
+        assert routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, ACTIVITIES, 10, BORDER_ROUTINE) \
+               == routine_cache_key(tus, 600, reversed_map, ACTIVITIES, 10, BORDER_ROUTINE)
+
+    def test_key_changes_with_inputs(self, tmp_path):
+        """Changing the survey contents or any setting gives a new key"""
+
+        tus  = self.make_tus(tmp_path)
+        key  = routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, ACTIVITIES, 10, BORDER_ROUTINE)
+        keys = [routine_cache_key(tus, 300, ACTIVITY_CODE_MAP, ACTIVITIES, 10, BORDER_ROUTINE),
+                routine_cache_key(tus, 600, {**ACTIVITY_CODE_MAP, "Work": {"primary": [2, 3]}},
+                                  ACTIVITIES, 10, BORDER_ROUTINE),
+                routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, list(reversed(ACTIVITIES)), 10, BORDER_ROUTINE),
+                routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, ACTIVITIES, 5, BORDER_ROUTINE),
+                routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, ACTIVITIES, 10, [0, 0, 0])]
+
+        self.make_tus(tmp_path, "id_jour,heuredebmin\n1,1\n")
+        keys.append(routine_cache_key(tus, 600, ACTIVITY_CODE_MAP, ACTIVITIES, 10, BORDER_ROUTINE))
+
+        assert key not in keys
+        assert len(set(keys)) == len(keys)
+
+    def test_round_trip(self, tmp_path):
+        """Saved arrays load unchanged, memory-mapped"""
+
+        arrays = {"identities":   np.array(["A", "BB"]),
+                  "ages":         np.array([7, 42]),
+                  "weights":      np.array([0.5, 1.5]),
+                  "age_brackets": np.array([0, 4]),
+                  "routines":     np.arange(12, dtype=np.uint8).reshape(2, 6),
+                  "empty":        np.zeros((0, 6))}
+        path = routine_cache_path(tmp_path / "cache", "abc")
+        save_routines(path, arrays)
+
+        loaded = load_routines(path)
+        assert set(loaded) == set(arrays)
+        for name, array in arrays.items():
+            assert loaded[name].dtype == array.dtype
+            assert np.array_equal(loaded[name], array)
+        assert isinstance(loaded["routines"], np.memmap)
+        assert [entry.name for entry in (tmp_path / "cache").iterdir()] == ["routines-abc"]
+
+    def test_concurrent_save_keeps_first_entry(self, tmp_path):
+        """Saving an entry that another run has already saved keeps the existing entry"""
+
+        path = routine_cache_path(tmp_path, "abc")
+        save_routines(path, {"routines": np.zeros((2, 6), dtype=np.uint8)})
+        save_routines(path, {"routines": np.ones((2, 6), dtype=np.uint8)})
+
+        assert not load_routines(path)["routines"].any()
+        assert [entry.name for entry in tmp_path.iterdir()] == ["routines-abc"]
@@ -0,0 +1,54 @@
+"""Tests the run-length encoding of weekly routines"""
+
+import numpy as np
+
+from ms_abmlux.activity_model.routines import RunLengthRoutines
+
+# Three routines of a week of eight ticks
+ROUTINES = np.array([[0, 0, 1, 1, 1, 2, 0, 0],
+                     [3, 3, 3, 3, 3, 3, 3, 3],
+                     [1, 0, 0, 0, 0, 0, 0, 2]], dtype=np.uint8)
+
+class TestRunLengthRoutines:
+    """Tests the run-length encoding of weekly routines"""
+
+    def test_encode(self):
+        """Runs start where activities change, and decode to the routines encoded"""
+
+        routines = RunLengthRoutines.encode(ROUTINES)
+        assert len(routines) == 3
+        assert list(routines.run_indptr) == [0, 4, 5, 8]
+        assert list(routines.run_starts) == [0, 2, 5, 6, 0, 0, 1, 7]
+        assert list(routines.run_activities) == [0, 1, 2, 0, 3, 1, 0, 2]
+        assert np.array_equal(routines.decode(), ROUTINES)
+
+    def test_activities_at(self):
+        """Lookups match the routines at every tick, and broadcast"""
+
+        routines = RunLengthRoutines.encode(ROUTINES)
+        for routine in range(3):
+            assert list(routines.activities_at(routine, np.arange(8))) == list(ROUTINES[routine])
+        assert list(routines.activities_at(np.array([2, 0, 1, 0]), 5)) == [0, 2, 3, 2]
+
+    def test_changes(self):
+        """Changes are those between consecutive ticks, including the wrap to the next week"""
+
+        ticks, routines, activities = RunLengthRoutines.encode(ROUTINES).changes()
+        expected = [(t, r, ROUTINES[r, t]) for t in range(8) for r in range(3)
+                    if ROUTINES[r, t] != ROUTINES[r, t - 1]]
+        assert list(zip(ticks, routines, activities)) == expected
+
+    def test_performs(self):
+        """Routines perform the activities found in any of their runs"""
+
+        routines = RunLengthRoutines.encode(ROUTINES)
+        assert list(routines.performs(1)) == [True, False, True]
+        assert list(routines.performs(4)) == [False, False, False]
+
+    def test_memory_independent_of_tick_length(self):
+        """Resampling to shorter ticks leaves the runs, and so the memory used, unchanged"""
+
+        coarse = RunLengthRoutines.encode(ROUTINES)
+        fine   = RunLengthRoutines.encode(np.repeat(ROUTINES, 10, axis=1))
+        assert list(fine.run_starts) == list(coarse.run_starts * 10)
+        assert fine.nbytes() == coarse.nbytes()
@@ -0,0 +1,184 @@
+"""Tests the parsing, assignment and dispatch of weekly routines by the simple activity model"""
+
+import os.path as osp
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from ms_abmlux.activity_model.activity_manager import ActivityManager
+from ms_abmlux.activity_model.routines import RunLengthRoutines
+from ms_abmlux.activity_model.simple_activity_model import SimpleActivityModel, DAY_LENGTH_10MIN
+from ms_abmlux.agent import Agent
+from ms_abmlux.location import Location
+from ms_abmlux.messagebus import MessageBus
+from ms_abmlux.sim_time import SimClock
+from ms_abmlux.simulator import Simulator
+
+# Weeks in brackets of 10 years: routine 0 in the 10s, 1 and 2 in the 30s, and 3 in the 40s
+ROUTINES = {"age_brackets":  np.array([1, 3, 3, 4]),
+            "weights":       np.array([1.0, 1.0, 3.0, 1.0]),
+            "week_routines": np.array([0, 1, 2, 3])}
+
+# A small time use survey, with diaries starting after midnight, listing activities out of order or
+# past midnight, sharing lines with other diaries or having lines with missing values
+TUS_FILENAME      = osp.join(osp.dirname(__file__), "test_data", "time_use_survey", "TUS.csv")
+ACTIVITY_CODE_MAP = {"House":      {"primary": [1], "secondary": [11, 12, 21, 31]},
+                     "Work":       {"primary": [2], "secondary": [111]},
+                     "School":     {"secondary": [232]},
+                     "Restaurant": {"primary": [5], "secondary": [546]},
+                     "Outdoor":    {"primary": [6]},
+                     "Car":        {"primary": [13]},
+                     "Transport":  {"primary": [15]},
+                     "Shop":       {"secondary": [361]},
+                     "Medical":    {"secondary": [365]},
+                     "Worship":    {"secondary": [435]},
+                     "Sport":      {"secondary": [544]},
+                     "Cinema":     {"secondary": [531]},
+                     "Visit":      {"primary": [4], "secondary": [395]}}
+
+def loop_parse_days(tus, tick_length_s):
+    """Return the identity, age, day, weight and routine of each diary, parsed one line at a time
+    as the simple activity model used to"""
+
+    mapping_pri, mapping_sec = {}, {}
+    for activity, codes in enumerate(ACTIVITY_CODE_MAP.values()):
+        mapping_pri.update({code: activity for code in codes.get("primary", [])})
+        mapping_sec.update({code: activity for code in codes.get("secondary", [])})
+    def map_func(tus_pri, tus_sec):
+        return mapping_pri[tus_pri] if tus_pri != 7 else mapping_sec[tus_sec]
+
+    days  = []
+    clock = SimClock(tick_length_s, 1)
+    for date in tus['id_jour'].unique():
+        tus_date  = tus.loc[tus['id_jour'] == date]
+        durations = [y-x for x, y in
+                     list(zip(tus_date['heuredebmin'], tus_date['heuredebmin'][1:]))]
+        end_activity = map_func(tus_date.iloc[-1]['loc1_num_f'], tus_date.iloc[-1]['act1b_f'])
+        start_time   = int(tus_date.iloc[0]['heuredebmin'])
+
+        routine_tenmin = [end_activity] * start_time
+        for i, duration in enumerate(durations):
+            routine_tenmin += [map_func(tus_date.iloc[i]['loc1_num_f'],
+                                        tus_date.iloc[i]['act1b_f'])] * int(duration)
+        routine_tenmin += [end_activity] * int(DAY_LENGTH_10MIN - sum(durations) - start_time)
+
+        clock.reset()
+        routine = [routine_tenmin[int(clock.seconds_elapsed() / (10 * 60))] for _ in clock]
+        days.append(tuple(tus_date.iloc[0][x] for x in ['id_ind', 'age', 'jours_f', 'poids_ind'])
+                    + (routine, ))
+    return days
+
+def draw_routines(ages, seed=1):
+    """Draw routines for the ages given, as the simple activity model does"""
+
+    # pylint: disable=protected-access
+    model = SimpleNamespace(age_bracket_length=10, routine_entropy=seed)
+    return SimpleActivityModel._draw_routines(model, ROUTINES, np.array(ages))
+
+class TestSimpleActivityModel:
+    """Tests the simple activity model"""
+
+    def test_routines_from_nearest_bracket(self):
+        """Ages are given routines from their bracket, or the nearest bracket having weeks"""
+
+        assert list(draw_routines([0, 5, 19, 25])) == [0, 0, 0, 0]
+        assert set(draw_routines([30, 39] * 50)) == {1, 2}
+        assert list(draw_routines([40, 80])) == [3, 3]
+
+    def test_routines_follow_weights(self):
+        """Routines are drawn in proportion to the weights of their weeks"""
+
+        drawn = draw_routines([35] * 10000)
+        assert abs(np.mean(drawn == 2) - 0.75) < 0.02
+
+    def test_draws_reproducible_by_bracket(self):
+        """Draws depend on the seed and the ages in each bracket, not those in other brackets"""
+
+        ages = [31, 32, 33, 34, 35, 36]
+        assert list(draw_routines(ages)) == list(draw_routines(ages))
+        assert list(draw_routines([1, 2, 45] + ages)[3:]) == list(draw_routines(ages))
+        assert list(draw_routines(ages * 5, seed=2)) != list(draw_routines(ages * 5))
+
+    def test_parse_days_matches_loop(self):
+        """Diaries parsed in one pass should give the same days and routines as parsing them one
+        line at a time"""
+
+        # pylint: disable=protected-access
+        model = SimpleNamespace(activity_manager=ActivityManager(ACTIVITY_CODE_MAP))
+        mapping = SimpleActivityModel._get_tus_code_mapping(model, ACTIVITY_CODE_MAP)
+        tus = pd.read_csv(TUS_FILENAME).dropna()
+
+        for tick_length_s in (300, 600, 1800, 3600):
+            days = SimpleActivityModel._parse_days(model, tus, mapping, tick_length_s)
+            assert [(d.identity, d.age, d.day, d.weight, d.daily_routine.tolist()) for d in days] \
+                   == loop_parse_days(tus, tick_length_s)
+            assert len(days) == 6
+
+    def test_batched_changes_follow_routines(self):
+        """Each tick, one request.agents.activity event should carry exactly the changes implied
+        by each agent's routine, including those on wrapping to the next week, and the simulator
+        should enact them and notify them together with the old activities"""
+
+        # Hourly routines changing every six hours, one changing as the week wraps, one with the
+        # same activity at either end of the week and one never changing
+        rng = np.random.default_rng(3)
+        weeks = np.repeat(rng.integers(3, size=(4, 28)), 6, axis=1).astype(np.uint8)
+        weeks[0, -6:] = (weeks[0, 0] + 1) % 3
+        weeks[1, -6:] = weeks[1, 0]
+        weeks[3]      = 2
+        clock = SimClock(3600, 9, "1st March 2020")
+        location = Location("House", (4000000, 3000000))
+        world = SimpleNamespace(agents=[Agent(30, "Luxembourg", location) for _ in range(40)])
+
+        # pylint: disable=protected-access
+        model = SimpleActivityModel.__new__(SimpleActivityModel)
+        model.routines, model.routine_by_agent = RunLengthRoutines.encode(weeks), \
+                                                 rng.integers(4, size=40)
+        for agent, activity in zip(world.agents, model.activities_at(clock.epoch_week_offset)):
+            agent.set_activity(int(activity))
+
+        sim = SimpleNamespace(bus=MessageBus(), clock=clock, world=world, region="Luxembourg",
+                              telemetry_bus=MessageBus(), agent_updates=defaultdict(dict),
+                              attendees_by_health={location: defaultdict(list)},
+                              _health_state_counts_by_name=dict)
+        sim.attendees_by_health[location][None] = list(world.agents)
+        model.init_sim(sim)
+        requests = []
+        sim.bus.subscribe("request.agents.activity",
+                          lambda agents, activities: requests.append((agents, activities)), None)
+        sim.bus.subscribe("request.agents.activity",
+                          lambda *args: Simulator.record_activity_changes(sim, *args), None)
+
+        wrapped = False
+        for t in clock:
+            if t == 0:
+                continue
+            week_tick = clock.ticks_through_week()
+            wrapped |= week_tick == 0
+            previous = weeks[model.routine_by_agent, week_tick - 1]
+            current  = weeks[model.routine_by_agent, week_tick]
+            changing = np.flatnonzero(previous != current)
+
+            requests.clear()
+            sim.bus.publish("notify.time.tick", clock, t)
+            notifications = Simulator._update_agents(sim)
+
+            assert len(requests) == (1 if len(changing) > 0 else 0)
+            if len(changing) > 0:
+                agents, activities = requests[0]
+                assert sorted(world.agents.index(a) for a in agents) == list(changing)
+                assert [int(activities[list(agents).index(world.agents[row])])
+                        for row in changing] == list(current[changing])
+                [(topic, agents, old_activities)] = notifications
+                assert topic == "notify.agents.activity"
+                assert sorted(world.agents.index(a) for a in agents) == list(changing)
+                assert [old_activities[agents.index(world.agents[row])] for row in changing] \
+                       == list(previous[changing])
+            else:
+                assert notifications == []
+            assert [a.current_activity for a in world.agents] == list(current)
+
+        assert wrapped
+        assert np.any(model.routine_by_agent == 0)
@@ -0,0 +1,92 @@
+"""Tests the choice of locations by the simple movement model"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from ms_abmlux.activity_model.activity_manager import ActivityManager
+from ms_abmlux.agent import Agent
+from ms_abmlux.location import Location
+from ms_abmlux.messagebus import MessageBus
+from ms_abmlux.movement_model.simple_movement_model import SimpleMovementModel
+from ms_abmlux.registry import Registry
+from ms_abmlux.world import World
+
+ACTIVITIES = {"House": ["House"], "Work": ["Office"], "Outdoor": ["Outdoor"],
+              "Public Transport": ["Public Transport"]}
+CONFIG     = {"__prng_seed__": 1, "no_move_health_states": ["DEAD"],
+              "pt_activity_type": "Public Transport", "pt_location_type": "Public Transport"}
+
+def make_world(rng, num_agents):
+    """Return a world in which agents have between one and four houses and offices, and a single
+    outdoor location, with every agent at home"""
+
+    world = World(None)
+    for typ, count in [("House", 6), ("Office", 8), ("Outdoor", 1), ("Public Transport", 4)]:
+        for i in range(count):
+            world.add_location(Location(typ, (1000 * i, 1000 * i)))
+
+    activity_manager = ActivityManager(ACTIVITIES)
+    for _ in range(num_agents):
+        agent = Agent(30, "Luxembourg")
+        for activity, typ in [("House", "House"), ("Work", "Office")]:
+            options = world.locations_for_types(typ)
+            for i in rng.choice(len(options), size=rng.integers(1, 5), replace=False):
+                agent.add_activity_location(activity_manager.as_int(activity), options[i])
+        agent.add_activity_location(activity_manager.as_int("Outdoor"),
+                                    world.locations_for_types("Outdoor")[0])
+        agent.set_activity(activity_manager.as_int("House"))
+        agent.set_health(0)
+        world.add_agent(agent)
+
+    return world, activity_manager
+
+class TestSimpleMovementModel:
+    """Tests the locations requested in response to batched activity changes"""
+
+    def test_batched_choices_are_allowable(self):
+        """Every location requested is among the agent's options for its new activity, or the
+        public transport units available, agents with one option always get it, and agents in
+        states that do not move make no request"""
+
+        rng                     = np.random.default_rng(1)
+        world, activity_manager = make_world(rng, 200)
+        model                   = SimpleMovementModel(CONFIG, activity_manager, world)
+        sim = SimpleNamespace(bus=MessageBus(), world=world,
+                              disease_model=SimpleNamespace(health_states=Registry(["HEALTHY",
+                                                                                    "DEAD"])),
+                              transport_model=SimpleNamespace(units_available=2))
+        model.init_sim(sim)
+
+        requests = []
+        sim.bus.subscribe("request.agent.location",
+                          lambda agent, location: requests.append((agent, location)), None)
+        dead = set(world.agents[::7])
+        for agent in dead:
+            agent.set_health(1)
+
+        pt_units = world.locations_for_types("Public Transport")[:2]
+        chosen   = {}
+        for _ in range(20):
+            activities = rng.choice(activity_manager.types_as_int(), size=len(world.agents))
+            requests.clear()
+            model.handle_activity_changes(world.agents, activities)
+
+            assert [agent for agent, _ in requests] \
+                   == [agent for agent in world.agents if agent not in dead]
+            by_agent = dict(requests)
+            for agent, activity in zip(world.agents, activities.tolist()):
+                if agent in dead:
+                    continue
+                location = by_agent[agent]
+                if activity == activity_manager.as_int("Public Transport"):
+                    assert location in pt_units
+                    continue
+                options = agent.locations_for_activity(activity)
+                assert location in options
+                if len(options) == 1:
+                    assert location is options[0]
+                chosen.setdefault((agent, activity), set()).add(location)
+
+        # Choices among several options are random, rather than always the same
+        assert any(len(locations) > 1 for locations in chosen.values())